@@ -0,0 +1,359 @@
+"""
+Scaling pipeline benchmark.
+Runs the scaling pipeline against the in-process AWS fakes (tests/aws_fakes)
+across fleet sizes, and measures for each scenario its duration, throughput,
+Kinesis/CloudWatch calls per scaling decision and peak memory (tracemalloc).
+Scenarios:
+- single_scale_up: a single scale-up alarm event, scaled by KinesisAutoscaler.scale()
+- batch_scale_up: a scale-up SNS batch of the fleet's alarm events (handler)
+- batch_scale_down: a scale-down SNS batch of the fleet's alarm events (handler)
+- fleet_sweep: a fleet sweep of all the subscribed streams (handler)
+- usage_reduction: the downscale usage percentile and target calculation
+  of each stream's daily usage factor data points
+
+Results are compared against a baseline, and regressions beyond the threshold
+fail the benchmark. AWS call counts are deterministic, so any increase is
+a regression.
+
+Usage (from the project root):
+python -m benchmarks.pipeline [--fleet-sizes N ...] [--runs N] [--aws-latency-ms MS]
+    [--baseline PATH] [--update-baseline] [--threshold RATIO]
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import statistics
+import tracemalloc
+from typing import Callable, Dict, List, NamedTuple
+
+# the fakes never reach AWS, but botocore and moto require credentials
+for env_key in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+    os.environ.setdefault(env_key, "testing")
+os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+
+import handler  # noqa: E402
+from kinesis_autoscaler import (  # noqa: E402
+    usage_history,
+    usage_forecast,
+    scaling_history,
+    scaling_policies,
+    shard_quota,
+)
+from kinesis_autoscaler.alarm_event import AlarmEvent  # noqa: E402
+from kinesis_autoscaler.kinesis_upscaler import KinesisUpscaler  # noqa: E402
+from kinesis_autoscaler.kinesis_downscaler import KinesisDownscaler  # noqa: E402
+from kinesis_autoscaler.scaling_policies import DEFAULT_SCALING_POLICY  # noqa: E402
+from kinesis_autoscaler.metrics_logger import set_metrics_sink  # noqa: E402
+from tests.aws_fakes import FakeAWS, fake_dynamodb  # noqa: E402
+
+DEFAULT_FLEET_SIZES = (1, 10, 100, 1000, 5000)
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+DEFAULT_THRESHOLD = 0.25
+DAILY_DATA_POINTS = 288
+MB = 1024 * 1024
+
+# the metrics where a higher value is an improvement
+HIGHER_IS_BETTER_METRICS = {"streams_per_second"}
+EXACT_METRICS = {"aws_calls_per_decision"}
+
+
+class DiscardMetricsSink:
+    """
+    Metrics sink serializing the EMF documents without writing them
+    """
+
+    @staticmethod
+    def emit(document: dict) -> None:
+        json.dumps(document, default=str)
+
+
+class Scenario(NamedTuple):
+    """
+    Benchmark scenario
+    """
+
+    name: str
+    # creates the fleet's state, returns the measured function
+    setup: Callable[[FakeAWS, int], Callable[[], None]]
+    # whether the scenario depends on the fleet size
+    fleet: bool = True
+
+
+def create_fleet(
+    aws: FakeAWS, fleet_size: int, shard_count: int, usage_factor: float
+) -> List[str]:
+    """
+    Creates streams subscribed to the autoscaler with a constant usage factor.
+    :return: the stream names
+    """
+    stream_names = [f"stream-{index}" for index in range(fleet_size)]
+    for stream_name in stream_names:
+        aws.create_stream(
+            stream_name,
+            shard_count=shard_count,
+            incoming_bytes_per_second=usage_factor * shard_count * MB,
+        )
+    return stream_names
+
+
+def get_alarm_messages(aws: FakeAWS, alarm_names: List[str]) -> List[dict]:
+    """
+    Returns the ALARM state notification messages of alarms.
+    """
+    messages = []
+    for alarm_name in alarm_names:
+        alarm = aws.cloudwatch.alarms[alarm_name]
+        alarm.update(StateValue="ALARM", StateReason="Threshold crossed")
+        messages.append(aws.cloudwatch.to_notification_message(alarm, "OK"))
+    return messages
+
+
+def to_sns_event(messages: List[dict]) -> dict:
+    """
+    Wraps alarm notification messages in a single SNS Lambda event.
+    """
+    return {
+        "Records": [{"Sns": {"Message": json.dumps(message)}} for message in messages]
+    }
+
+
+def setup_single_scale_up(aws: FakeAWS, _fleet_size: int) -> Callable[[], None]:
+    (stream_name,) = create_fleet(aws, 1, shard_count=2, usage_factor=0.9)
+    (message,) = get_alarm_messages(aws, [f"{stream_name}-scale-up"])
+    return KinesisUpscaler(AlarmEvent.parse(message)).scale
+
+
+def setup_batch_scale_up(aws: FakeAWS, fleet_size: int) -> Callable[[], None]:
+    stream_names = create_fleet(aws, fleet_size, shard_count=2, usage_factor=0.9)
+    event = to_sns_event(
+        get_alarm_messages(aws, [f"{name}-scale-up" for name in stream_names])
+    )
+    return lambda: handler.scale_up(event, None)
+
+
+def setup_batch_scale_down(aws: FakeAWS, fleet_size: int) -> Callable[[], None]:
+    stream_names = create_fleet(aws, fleet_size, shard_count=4, usage_factor=0.1)
+    event = to_sns_event(
+        get_alarm_messages(aws, [f"{name}-scale-down" for name in stream_names])
+    )
+    return lambda: handler.scale_down(event, None)
+
+
+def setup_fleet_sweep(aws: FakeAWS, fleet_size: int) -> Callable[[], None]:
+    # one in ten streams is hot, and the rest are steady
+    for index in range(fleet_size):
+        aws.create_stream(
+            f"stream-{index}",
+            shard_count=4,
+            incoming_bytes_per_second=(3.5 if index % 10 == 0 else 2) * MB,
+        )
+    return lambda: handler.sweep({}, None)
+
+
+def setup_usage_reduction(_aws: FakeAWS, fleet_size: int) -> Callable[[], None]:
+    generator = random.Random(0)
+    fleet_usage_factors = [
+        [generator.uniform(0, 0.25) for _ in range(DAILY_DATA_POINTS)]
+        for _ in range(fleet_size)
+    ]
+
+    def reduce_usage() -> None:
+        for usage_factors in fleet_usage_factors:
+            KinesisDownscaler.calculate_target_shard_count(
+                8,
+                usage_history.get_percentile(
+                    usage_factors, DEFAULT_SCALING_POLICY.usage_percentile
+                ),
+                DEFAULT_SCALING_POLICY,
+            )
+
+    return reduce_usage
+
+
+SCENARIOS = (
+    Scenario("single_scale_up", setup_single_scale_up, fleet=False),
+    Scenario("batch_scale_up", setup_batch_scale_up),
+    Scenario("batch_scale_down", setup_batch_scale_down),
+    Scenario("fleet_sweep", setup_fleet_sweep),
+    Scenario("usage_reduction", setup_usage_reduction),
+)
+
+
+def run_scenario(
+    scenario: Scenario, fleet_size: int, aws_latency: float, trace_memory: bool
+) -> Dict[str, float]:
+    """
+    Runs a scenario once, in a fresh fake AWS environment.
+    :param scenario: the benchmark scenario
+    :param fleet_size: number of streams
+    :param aws_latency: latency of each Kinesis/CloudWatch call in seconds
+    :param trace_memory: whether to measure the peak memory, which slows
+        down the run, so its duration isn't measured
+    :return: the run measurements
+    """
+    usage_history.reset_cache()
+    scaling_history.reset_cache()
+    scaling_policies.reset_cache()
+    usage_forecast.reset_cache()
+    shard_quota.reset_cache()
+    aws = FakeAWS(resharding_seconds=3600)
+    aws.kinesis.inject_latency(aws_latency)
+    aws.cloudwatch.inject_latency(aws_latency)
+
+    with fake_dynamodb(), aws.install():
+        function = scenario.setup(aws, fleet_size)
+        calls_before = sum(aws.kinesis.call_counts.values()) + sum(
+            aws.cloudwatch.call_counts.values()
+        )
+        if trace_memory:
+            tracemalloc.start()
+            function()
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            return {"peak_memory_kb": round(peak_memory / 1024, 1)}
+
+        start = time.perf_counter()
+        function()
+        duration = time.perf_counter() - start
+        calls = (
+            sum(aws.kinesis.call_counts.values())
+            + sum(aws.cloudwatch.call_counts.values())
+            - calls_before
+        )
+
+    return {
+        "duration_ms": round(duration * 1000, 2),
+        "streams_per_second": round(fleet_size / duration, 1),
+        "aws_calls_per_decision": round(calls / fleet_size, 2),
+    }
+
+
+def run_benchmark(
+    fleet_sizes: List[int], runs: int, aws_latency: float
+) -> Dict[str, Dict[str, float]]:
+    """
+    Runs all the scenarios across the fleet sizes.
+    :return: dict of "scenario/fleet size" to its median measurements
+    """
+    results = {}
+    for scenario in SCENARIOS:
+        for fleet_size in fleet_sizes if scenario.fleet else (1,):
+            measurements = [
+                run_scenario(scenario, fleet_size, aws_latency, False)
+                for _ in range(runs)
+            ]
+            result = {
+                metric: statistics.median(
+                    measurement[metric] for measurement in measurements
+                )
+                for metric in measurements[0]
+            }
+            result.update(run_scenario(scenario, fleet_size, aws_latency, True))
+            results[f"{scenario.name}/{fleet_size}"] = result
+            print(f"{scenario.name}/{fleet_size}: {result}", file=sys.stderr)
+
+    return results
+
+
+def find_regressions(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    threshold: float,
+) -> List[str]:
+    """
+    Compares the results against the baseline.
+    :param results: the current results
+    :param baseline: the baseline results
+    :param threshold: max relative degradation allowed for the timing and
+        memory metrics
+    :return: a description of each regression
+    """
+    regressions = []
+    for key, result in results.items():
+        for metric, value in result.items():
+            baseline_value = baseline.get(key, {}).get(metric)
+            if baseline_value is None:
+                continue
+
+            if metric in EXACT_METRICS:
+                regressed = value > baseline_value
+            elif metric in HIGHER_IS_BETTER_METRICS:
+                regressed = value < baseline_value * (1 - threshold)
+            else:
+                regressed = value > baseline_value * (1 + threshold)
+            if regressed:
+                regressions.append(
+                    f"{key} {metric}: baseline={baseline_value} current={value}"
+                )
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--fleet-sizes", type=int, nargs="+", default=list(DEFAULT_FLEET_SIZES)
+    )
+    parser.add_argument("--runs", type=int, default=3, help="timed runs per scenario")
+    parser.add_argument(
+        "--aws-latency-ms",
+        type=float,
+        default=0,
+        help="latency of each Kinesis/CloudWatch call",
+    )
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_PATH)
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="write the results as the new baseline instead of comparing",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="max relative degradation of the timing and memory metrics",
+    )
+    args = parser.parse_args()
+
+    # the scalers logs and metrics documents are still formatted as in Lambda,
+    # but aren't part of the benchmark output
+    logging.getLogger().handlers = [logging.StreamHandler(open(os.devnull, "w"))]
+    set_metrics_sink(DiscardMetricsSink())
+    results = run_benchmark(args.fleet_sizes, args.runs, args.aws_latency_ms / 1000)
+    document = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "aws_latency_ms": args.aws_latency_ms,
+        },
+        "results": results,
+    }
+    print(json.dumps(document, indent=2))
+
+    if args.update_baseline:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(document, baseline_file, indent=2)
+            baseline_file.write("\n")
+        return
+
+    if not os.path.exists(args.baseline):
+        return
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    regressions = find_regressions(results, baseline["results"], args.threshold)
+    for regression in regressions:
+        print(f"Regression: {regression}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Cold start benchmark.
+Measures, in fresh interpreter processes, the handler import time, the AWS
+clients creation time and the first (cold) and second (warm) scale-up
+invocation latencies against stubbed AWS responses.
+
+Usage (from the project root): python -m benchmarks.startup [--runs N]
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+PHASES = ("import_handler", "create_clients", "first_invocation", "warm_invocation")
+
+# executed in a fresh interpreter, prints the phases durations as JSON
+BENCHMARK_SCRIPT = """
+import json
+import time
+from unittest.mock import patch
+
+durations = {}
+start = time.perf_counter()
+import handler
+durations["import_handler"] = time.perf_counter() - start
+
+from kinesis_autoscaler.aws_clients import get_client
+
+start = time.perf_counter()
+cw_client = get_client("cloudwatch")
+kinesis_client = get_client("kinesis")
+durations["create_clients"] = time.perf_counter() - start
+
+from moto import mock_dynamodb2
+
+with mock_dynamodb2():
+    from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+    from kinesis_autoscaler.models.scaling_policy import KinesisScalingPolicy
+
+    KinesisAutoscalerLog.create_table(wait=True)
+    KinesisScalingPolicy.create_table(wait=True)
+    patches = (
+        patch.object(
+            kinesis_client,
+            "describe_stream_summary",
+            return_value={
+                "StreamDescriptionSummary": {
+                    "OpenShardCount": 2,
+                    "StreamStatus": "ACTIVE",
+                }
+            },
+        ),
+        patch.object(
+            kinesis_client,
+            "update_shard_count",
+            return_value={
+                "StreamName": "benchmark",
+                "CurrentShardCount": 2,
+                "TargetShardCount": 4,
+            },
+        ),
+        patch.object(
+            cw_client,
+            "describe_alarms",
+            return_value={
+                "MetricAlarms": [
+                    {"AlarmName": name, "Metrics": [{"Id": "shardCount"}]}
+                    for name in ("benchmark-scale-up", "benchmark-scale-down")
+                ]
+            },
+        ),
+        patch.object(cw_client, "put_metric_alarm"),
+        patch.object(cw_client, "set_alarm_state"),
+    )
+    for stub in patches:
+        stub.start()
+
+    for phase in ("first_invocation", "warm_invocation"):
+        # each invocation scales a different stream, avoiding the scale-up cooldown
+        message = {
+            "AlarmName": "benchmark-scale-up",
+            "Trigger": {
+                "Metrics": [
+                    {"Id": "shardCount", "Expression": "2"},
+                    {
+                        "Id": "incomingBytes",
+                        "MetricStat": {
+                            "Metric": {
+                                "Dimensions": [{"name": "StreamName", "value": phase}]
+                            }
+                        },
+                    },
+                ]
+            },
+        }
+        event = {"Records": [{"Sns": {"Message": json.dumps(message)}}]}
+        start = time.perf_counter()
+        handler.scale_up(event, None)
+        durations[phase] = time.perf_counter() - start
+
+print(json.dumps(durations))
+"""
+
+
+def run_once() -> dict:
+    """
+    Runs the benchmark script in a fresh interpreter.
+    :return: the phases durations in seconds
+    """
+    env = dict(
+        os.environ,
+        AWS_ACCESS_KEY_ID="testing",
+        AWS_SECRET_ACCESS_KEY="testing",
+        AWS_DEFAULT_REGION="us-east-1",
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", BENCHMARK_SCRIPT],
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5, help="number of processes")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.runs)]
+    results = {
+        phase: {
+            "median_ms": round(statistics.median(run[phase] for run in runs) * 1000, 2),
+            "max_ms": round(max(run[phase] for run in runs) * 1000, 2),
+        }
+        for phase in PHASES
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,42 +4,159 @@ Handler functions for Kinesis autoscaler
 
 import json
 import logging
+from typing import List
+from kinesis_autoscaler.alarm_event import ALARM_STATE_CHANGE_DETAIL_TYPE
 from kinesis_autoscaler.kinesis_upscaler import KinesisUpscaler
 from kinesis_autoscaler.kinesis_downscaler import KinesisDownscaler
+from kinesis_autoscaler.kinesis_emergency_upscaler import KinesisEmergencyUpscaler
+from kinesis_autoscaler.batch_scaler import KinesisBatchScaler
+from kinesis_autoscaler.fleet_sweeper import KinesisFleetSweeper
+from kinesis_autoscaler.scaling_tracker import KinesisScalingTracker
+from kinesis_autoscaler.forecaster import KinesisForecaster
+from kinesis_autoscaler.capacity_mode_advisor import KinesisCapacityModeAdvisor
+from kinesis_autoscaler.alarm_reconciler import KinesisAlarmReconciler
+from kinesis_autoscaler.profiling import profiled
+from kinesis_autoscaler.invocation_deadline import set_invocation_deadline
 
 logging.getLogger().setLevel(logging.INFO)
 
 
-def parse_sns_message(event: dict) -> dict:
+def parse_alarm_messages(event: dict) -> List[dict]:
     """
-    Parses SNS record and returns its message.
-    :param event: SNS event that triggered the lambda
-    :return: parsed SNS message
+    Returns the alarm messages of a Lambda event, which is either an SNS event
+    of alarm notifications, or a single alarm state change event delivered
+    by EventBridge.
+    :param event: SNS or EventBridge event that triggered the lambda
+    :return: SNS messages, or the EventBridge event itself
     """
-    return json.loads(event["Records"][0]["Sns"]["Message"])
+    if event.get("detail-type") == ALARM_STATE_CHANGE_DETAIL_TYPE:
+        return [event]
+    return [json.loads(record["Sns"]["Message"]) for record in event["Records"]]
 
 
-def scale_up(event: dict, _context) -> None:
+@profiled
+def scale_up(event: dict, context) -> List[dict]:
     """
     Lambda handler for scaling up Kinesis streams.
     :param event: Lambda triggering event
+    :param context: Lambda invocation context
+    :return: scaling report containing an entry for each alarm event
     """
     try:
-        event_message = parse_sns_message(event)
-        KinesisUpscaler(event_message).scale()
+        set_invocation_deadline(context)
+        event_messages = parse_alarm_messages(event)
+        return KinesisBatchScaler(KinesisUpscaler, event_messages).scale()
     except Exception:
         logging.exception("stream scale-up process failed")
         raise
 
 
-def scale_down(event: dict, _context) -> None:
+@profiled
+def scale_down(event: dict, context) -> List[dict]:
     """
     Lambda handler for scaling down Kinesis streams.
     :param event: Lambda triggering event
+    :param context: Lambda invocation context
+    :return: scaling report containing an entry for each alarm event
     """
     try:
-        event_message = parse_sns_message(event)
-        KinesisDownscaler(event_message).scale()
+        set_invocation_deadline(context)
+        event_messages = parse_alarm_messages(event)
+        return KinesisBatchScaler(KinesisDownscaler, event_messages).scale()
     except Exception:
         logging.exception("stream scale-down process failed")
         raise
+
+
+@profiled
+def emergency_scale_up(event: dict, context) -> List[dict]:
+    """
+    Lambda handler for scaling up write throttled Kinesis streams.
+    :param event: Lambda triggering event
+    :param context: Lambda invocation context
+    :return: scaling report containing an entry for each alarm event
+    """
+    try:
+        set_invocation_deadline(context)
+        event_messages = parse_alarm_messages(event)
+        return KinesisBatchScaler(KinesisEmergencyUpscaler, event_messages).scale()
+    except Exception:
+        logging.exception("stream emergency scale-up process failed")
+        raise
+
+
+@profiled
+def sweep(_event: dict, context) -> List[dict]:
+    """
+    Scheduled Lambda handler for evaluating and scaling all subscribed streams.
+    :param context: Lambda invocation context
+    :return: scaling report containing an entry for each scaled stream
+    """
+    try:
+        set_invocation_deadline(context)
+        return KinesisFleetSweeper().sweep()
+    except Exception:
+        logging.exception("fleet sweep process failed")
+        raise
+
+
+@profiled
+def forecast(_event: dict, context) -> List[dict]:
+    """
+    Scheduled Lambda handler for refitting the streams usage forecasts and
+    pre-scaling streams ahead of their forecast peaks.
+    :param context: Lambda invocation context
+    :return: scaling report containing an entry for each pre-scaled stream
+    """
+    try:
+        set_invocation_deadline(context)
+        return KinesisForecaster().forecast()
+    except Exception:
+        logging.exception("forecasting process failed")
+        raise
+
+
+@profiled
+def advise_capacity_mode(_event: dict, _context) -> List[dict]:
+    """
+    Scheduled Lambda handler for switching Kinesis streams to their cheaper
+    capacity mode.
+    :return: report containing an entry for each stream with a different
+        recommended capacity mode
+    """
+    try:
+        return KinesisCapacityModeAdvisor().advise()
+    except Exception:
+        logging.exception("capacity mode advising process failed")
+        raise
+
+
+@profiled
+def reconcile_alarms(event: dict, _context) -> List[dict]:
+    """
+    Lambda handler for creating or repairing the scaling alarms of streams,
+    selected by the event's stream_names list or tags dict. Passing
+    "dry_run": true only reports the alarms that should be written.
+    :param event: Lambda invocation event
+    :return: report containing an entry for each written alarm
+    """
+    try:
+        return KinesisAlarmReconciler(dry_run=event.get("dry_run", False)).reconcile(
+            stream_names=event.get("stream_names"), tags=event.get("tags")
+        )
+    except Exception:
+        logging.exception("alarms reconciliation process failed")
+        raise
+
+
+@profiled
+def track_scaling(_event: dict, _context) -> List[dict]:
+    """
+    Scheduled Lambda handler for tracking in progress scaling operations.
+    :return: report containing an entry for each completed scaling operation
+    """
+    try:
+        return KinesisScalingTracker().track()
+    except Exception:
+        logging.exception("scaling tracking process failed")
+        raise
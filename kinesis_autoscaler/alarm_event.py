@@ -0,0 +1,225 @@
+"""
+Kinesis stream scaling alarm events
+"""
+from typing import Dict, Iterable, Optional, Tuple
+
+ALARM_STATE_CHANGE_DETAIL_TYPE = "CloudWatch Alarm State Change"
+SCALE_UP_ALARM_TYPE = "scale-up"
+SCALE_DOWN_ALARM_TYPE = "scale-down"
+EMERGENCY_SCALE_UP_ALARM_TYPE = "emergency-scale-up"
+# the emergency alarm type contains the scale-up alarm type,
+# so it is matched first
+ALARM_TYPES = (
+    EMERGENCY_SCALE_UP_ALARM_TYPE,
+    SCALE_UP_ALARM_TYPE,
+    SCALE_DOWN_ALARM_TYPE,
+)
+SHARD_COUNT_METRIC_ID = "shardCount"
+STREAM_NAME_DIMENSION = "StreamName"
+
+# (metric id, dimensions dict, math expression) of an alarm metric
+AlarmMetric = Tuple[Optional[str], Dict[str, str], Optional[str]]
+
+
+class AlarmEvent:
+    """
+    Scaling alarm state change, normalized once from either the alarm
+    notification delivered by SNS or the alarm state change event delivered
+    by EventBridge.
+    """
+
+    __slots__ = (
+        "alarm_name",
+        "alarm_type",
+        "stream_name",
+        "shard_count",
+        "state_change_time",
+    )
+
+    def __init__(
+        self,
+        alarm_name: str,
+        stream_name: str,
+        shard_count: Optional[int] = None,
+        state_change_time: Optional[str] = None,
+    ):
+        """
+        Initializes AlarmEvent instance.
+        :param alarm_name: name of the triggered alarm, containing its alarm type
+            (scale-up/scale-down/emergency-scale-up)
+        :param stream_name: name of the stream to scale
+        :param shard_count: the shard count the alarm is based on, None for
+            alarms which aren't based on the shard count
+        :param state_change_time: the alarm state change time, in its ISO 8601
+            format which is sortable
+        """
+        if not stream_name:
+            raise ValueError("Could not parse stream name from alarm metrics")
+
+        self.alarm_name = alarm_name
+        self.alarm_type = self.get_alarm_type(alarm_name)
+        self.stream_name = stream_name
+        self.shard_count = shard_count
+        self.state_change_time = state_change_time
+
+    @property
+    def alarm_names(self) -> Dict[str, str]:
+        """
+        Returns the stream scaling alarm names, based on the integration
+        requirement that the stream alarms have the same name but with alarm
+        type difference (scale-up/scale-down/emergency-scale-up) in their name.
+        :return: dict containing the stream alarm names
+        """
+        return {
+            "scale_up": self.alarm_name.replace(self.alarm_type, SCALE_UP_ALARM_TYPE),
+            "scale_down": self.alarm_name.replace(
+                self.alarm_type, SCALE_DOWN_ALARM_TYPE
+            ),
+        }
+
+    @classmethod
+    def parse(cls, message: dict) -> "AlarmEvent":
+        """
+        Parses an alarm event from either of its delivery formats.
+        :param message: SNS alarm notification message, or EventBridge alarm
+            state change event
+        :return: the parsed alarm event
+        """
+        if message.get("detail-type") == ALARM_STATE_CHANGE_DETAIL_TYPE:
+            return cls.from_eventbridge_event(message)
+        return cls.from_sns_message(message)
+
+    @classmethod
+    def from_sns_message(cls, message: dict) -> "AlarmEvent":
+        """
+        Parses an alarm notification message delivered by SNS.
+        Metric math alarms have their metric definitions in the trigger metrics,
+        and single metric alarms have their dimensions in the trigger itself.
+        :param message: the decoded SNS message
+        :return: the parsed alarm event
+        """
+        trigger = message["Trigger"]
+        metrics = [
+            (
+                metric.get("Id"),
+                cls.to_dimensions_dict(
+                    metric.get("MetricStat", {}).get("Metric", {}).get("Dimensions", [])
+                ),
+                metric.get("Expression"),
+            )
+            for metric in trigger.get("Metrics", [])
+        ]
+        metrics.append(
+            (None, cls.to_dimensions_dict(trigger.get("Dimensions", [])), None)
+        )
+        return cls.from_metrics(
+            message["AlarmName"], metrics, message.get("StateChangeTime")
+        )
+
+    @classmethod
+    def from_eventbridge_event(cls, event: dict) -> "AlarmEvent":
+        """
+        Parses an alarm state change event delivered by EventBridge.
+        Both metric math and single metric alarms have their metric definitions
+        in the configuration metrics, with the dimensions as a dict.
+        :param event: the EventBridge event
+        :return: the parsed alarm event
+        """
+        detail = event["detail"]
+        metrics = [
+            (
+                metric.get("id"),
+                metric.get("metricStat", {}).get("metric", {}).get("dimensions", {}),
+                metric.get("expression"),
+            )
+            for metric in detail.get("configuration", {}).get("metrics", [])
+        ]
+        return cls.from_metrics(
+            detail["alarmName"], metrics, detail.get("state", {}).get("timestamp")
+        )
+
+    @classmethod
+    def from_alarm(cls, alarm: dict) -> "AlarmEvent":
+        """
+        Creates an alarm event from an alarm as returned from describe operation,
+        for scaling operations which aren't triggered by an alarm state change.
+        :param alarm: alarm configuration as returned from describe operation
+        :return: alarm event without a state change time
+        """
+        metrics = [
+            (
+                metric.get("Id"),
+                {
+                    dimension["Name"]: dimension["Value"]
+                    for dimension in metric.get("MetricStat", {})
+                    .get("Metric", {})
+                    .get("Dimensions", [])
+                },
+                metric.get("Expression"),
+            )
+            for metric in alarm.get("Metrics", [])
+        ]
+        metrics.append(
+            (
+                None,
+                {
+                    dimension["Name"]: dimension["Value"]
+                    for dimension in alarm.get("Dimensions", [])
+                },
+                None,
+            )
+        )
+        return cls.from_metrics(alarm["AlarmName"], metrics)
+
+    @classmethod
+    def from_metrics(
+        cls,
+        alarm_name: str,
+        metrics: Iterable[AlarmMetric],
+        state_change_time: Optional[str] = None,
+    ) -> "AlarmEvent":
+        """
+        Creates an alarm event from the normalized alarm metrics.
+        The stream name is taken from the first metric with a stream dimension,
+        and the shard count from the required shardCount math expression.
+        :param alarm_name: name of the triggered alarm
+        :param metrics: the alarm metrics
+        :param state_change_time: the alarm state change time
+        :return: the alarm event
+        """
+        stream_name = None
+        shard_count = None
+        for metric_id, dimensions, expression in metrics:
+            if stream_name is None:
+                stream_name = dimensions.get(STREAM_NAME_DIMENSION)
+            if metric_id == SHARD_COUNT_METRIC_ID and expression is not None:
+                shard_count = int(expression)
+
+        return cls(alarm_name, stream_name, shard_count, state_change_time)
+
+    @staticmethod
+    def get_alarm_type(alarm_name: str) -> str:
+        """
+        Returns the type of a stream alarm by its name.
+        :param alarm_name: name of the stream alarm
+        :return: scale-up, scale-down or emergency-scale-up
+        """
+        for alarm_type in ALARM_TYPES:
+            if alarm_type in alarm_name:
+                return alarm_type
+
+        raise ValueError(
+            "Triggered alarm should contain scale-up/scale-down in its name"
+        )
+
+    @staticmethod
+    def to_dimensions_dict(dimensions: Iterable[dict]) -> Dict[str, str]:
+        """
+        Converts dimensions in the lowercase keys format of alarm notifications
+        to a dict of dimension name to its value.
+        :param dimensions: the alarm notification dimensions
+        :return: dict of dimension name to its value
+        """
+        return {
+            dimension.get("name"): dimension.get("value") for dimension in dimensions
+        }
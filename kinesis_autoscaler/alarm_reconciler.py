@@ -0,0 +1,341 @@
+"""
+Kinesis streams scaling alarms reconciler
+"""
+import logging
+from typing import Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from kinesis_autoscaler.aws_clients import get_client
+from kinesis_autoscaler.kinesis_autoscaler import (
+    ON_DEMAND_STREAM_MODE,
+    KinesisAutoscaler,
+)
+from kinesis_autoscaler.usage_metrics import (
+    METRIC_PERIOD_SECONDS,
+    build_usage_factor_queries,
+)
+from kinesis_autoscaler.constants import (
+    BATCH_MAX_WORKERS,
+    SCALE_UP_USAGE_THRESHOLD,
+    SCALE_DOWN_USAGE_THRESHOLD,
+    SCALE_UP_TOPIC_ARN,
+    SCALE_DOWN_TOPIC_ARN,
+    ALARM_NAME_TEMPLATE,
+)
+
+MAX_DESCRIBE_ALARM_NAMES = 100
+SCALE_DOWN_EVALUATION_PERIODS = 24 * 3600 // METRIC_PERIOD_SECONDS
+# alarm fields rendered from the template, other fields of existing alarms
+# (e.g. their state) are ignored
+ALARM_TEMPLATE_FIELDS = (
+    "AlarmActions",
+    "Threshold",
+    "ComparisonOperator",
+    "TreatMissingData",
+    "EvaluationPeriods",
+    "Metrics",
+)
+
+
+class KinesisAlarmReconciler:
+    """
+    Subscribes streams to the autoscaler in bulk, by creating or repairing
+    their scale-up/scale-down alarms from the alarms template.
+    Existing alarms are described in batches, and only the alarms that differ
+    from the template are written.
+    The shard count and actions state of existing alarms are kept, since
+    they are synced by the scaling operations and the capacity mode advisor.
+    """
+
+    def __init__(
+        self,
+        scale_up_topic_arn: Optional[str] = SCALE_UP_TOPIC_ARN,
+        scale_down_topic_arn: Optional[str] = SCALE_DOWN_TOPIC_ARN,
+        alarm_name_template: str = ALARM_NAME_TEMPLATE,
+        dry_run: bool = False,
+        max_workers: int = BATCH_MAX_WORKERS,
+    ):
+        """
+        Initializes KinesisAlarmReconciler instance.
+        :param scale_up_topic_arn: the scale-up alarms action topic ARN
+        :param scale_down_topic_arn: the scale-down alarms action topic ARN
+        :param alarm_name_template: alarm names format, with {stream_name}
+            and {alarm_type} (scale-up/scale-down) fields
+        :param dry_run: whether to only report the alarms that should be written
+        :param max_workers: max number of alarms written concurrently
+        """
+        if not scale_up_topic_arn or not scale_down_topic_arn:
+            raise ValueError("Scale-up and scale-down topic ARNs are required")
+        if "{alarm_type}" not in alarm_name_template:
+            raise ValueError("Alarm name template should contain {alarm_type}")
+
+        self.scale_up_topic_arn = scale_up_topic_arn
+        self.scale_down_topic_arn = scale_down_topic_arn
+        self.alarm_name_template = alarm_name_template
+        self.dry_run = dry_run
+        self.max_workers = max_workers
+
+    def reconcile(
+        self,
+        stream_names: Optional[List[str]] = None,
+        tags: Optional[Dict[str, str]] = None,
+    ) -> List[dict]:
+        """
+        Creates or repairs the scaling alarms of the selected streams.
+        :param stream_names: names of the streams to subscribe
+        :param tags: tags of the streams to subscribe, streams having all the
+            tags are selected
+        :return: report containing an entry for each written alarm, and for
+            each selected stream that couldn't be subscribed
+        """
+        if stream_names is None and not tags:
+            raise ValueError("Either stream names or tags should be selected")
+
+        selected_streams = set(stream_names or [])
+        if tags:
+            selected_streams.update(self.list_tagged_streams(tags))
+        selected_streams = sorted(selected_streams)
+
+        alarm_names = [
+            self.get_alarm_name(stream_name, alarm_type)
+            for stream_name in selected_streams
+            for alarm_type in ("scale-up", "scale-down")
+        ]
+        existing_alarms = self.describe_alarms(alarm_names)
+
+        report = []
+        outdated_alarms = []
+        for stream_name in selected_streams:
+            try:
+                outdated_alarms.extend(
+                    self.get_outdated_alarms(stream_name, existing_alarms)
+                )
+            except Exception as exception:
+                logging.exception(
+                    f"Failed rendering stream alarms. stream={stream_name}"
+                )
+                report.append(
+                    {
+                        "stream_name": stream_name,
+                        "status": "FAILED",
+                        "error": str(exception),
+                    }
+                )
+
+        logging.info(
+            "Reconciled stream alarms. "
+            f"streams={len(selected_streams)} alarms={len(alarm_names)} "
+            f"existing_alarms={len(existing_alarms)} "
+            f"outdated_alarms={len(outdated_alarms)}"
+        )
+
+        if outdated_alarms:
+            workers = min(self.max_workers, len(outdated_alarms))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                report.extend(executor.map(self.write_alarm, outdated_alarms))
+
+        return report
+
+    @staticmethod
+    def list_tagged_streams(tags: Dict[str, str]) -> List[str]:
+        """
+        Lists the streams having all the tags, using the tagging API.
+        :param tags: dict of tag key to its value
+        :return: names of the tagged streams
+        """
+        stream_names = []
+        request = {
+            "ResourceTypeFilters": ["kinesis:stream"],
+            "TagFilters": [
+                {"Key": key, "Values": [value]} for key, value in tags.items()
+            ],
+        }
+        while True:
+            response = get_client("resourcegroupstaggingapi").get_resources(**request)
+            stream_names.extend(
+                resource["ResourceARN"].split("/")[-1]
+                for resource in response["ResourceTagMappingList"]
+            )
+
+            if not response.get("PaginationToken"):
+                return stream_names
+            request["PaginationToken"] = response["PaginationToken"]
+
+    @staticmethod
+    def describe_alarms(alarm_names: List[str]) -> Dict[str, dict]:
+        """
+        Describes the existing alarms in batches of the max alarm names
+        of a single request.
+        :param alarm_names: names of the alarms to describe
+        :return: dict of alarm name to its configuration, for existing alarms
+        """
+        alarms = {}
+        for chunk_start in range(0, len(alarm_names), MAX_DESCRIBE_ALARM_NAMES):
+            chunk_end = chunk_start + MAX_DESCRIBE_ALARM_NAMES
+            request = {
+                "AlarmNames": alarm_names[chunk_start:chunk_end],
+                "AlarmTypes": ["MetricAlarm"],
+            }
+            while True:
+                response = get_client("cloudwatch").describe_alarms(**request)
+                for alarm in response["MetricAlarms"]:
+                    alarms[alarm["AlarmName"]] = alarm
+
+                if not response.get("NextToken"):
+                    break
+                request["NextToken"] = response["NextToken"]
+
+        return alarms
+
+    def get_outdated_alarms(
+        self, stream_name: str, existing_alarms: Dict[str, dict]
+    ) -> List[dict]:
+        """
+        Renders the stream alarms and returns the ones that differ from the
+        existing alarms.
+        The stream is described only if an alarm doesn't exist yet, or its
+        shard count can't be parsed.
+        :param stream_name: name of the stream
+        :param existing_alarms: dict of alarm name to its configuration
+        :return: the alarms to write, as required for the alarm update operation
+        """
+        scale_up_alarm = existing_alarms.get(
+            self.get_alarm_name(stream_name, "scale-up")
+        )
+        scale_down_alarm = existing_alarms.get(
+            self.get_alarm_name(stream_name, "scale-down")
+        )
+        shard_count = self.get_alarm_shard_count(scale_up_alarm)
+        actions_enabled = True
+        if scale_up_alarm is None or scale_down_alarm is None or shard_count is None:
+            stream_summary = get_client("kinesis").describe_stream_summary(
+                StreamName=stream_name
+            )["StreamDescriptionSummary"]
+            shard_count = stream_summary["OpenShardCount"]
+            # the alarms of on-demand streams are created with disabled actions
+            stream_mode = stream_summary.get("StreamModeDetails", {}).get("StreamMode")
+            actions_enabled = stream_mode != ON_DEMAND_STREAM_MODE
+
+        outdated_alarms = []
+        for alarm_type, existing_alarm in (
+            ("scale-up", scale_up_alarm),
+            ("scale-down", scale_down_alarm),
+        ):
+            alarm = self.render_alarm(stream_name, alarm_type, shard_count)
+            if existing_alarm is None:
+                alarm["ActionsEnabled"] = actions_enabled and alarm["ActionsEnabled"]
+            elif self.is_alarm_in_sync(existing_alarm, alarm):
+                continue
+            else:
+                alarm["ActionsEnabled"] = existing_alarm.get("ActionsEnabled", True)
+            outdated_alarms.append(
+                {
+                    "stream_name": stream_name,
+                    "alarm": alarm,
+                    "exists": bool(existing_alarm),
+                }
+            )
+
+        return outdated_alarms
+
+    def render_alarm(self, stream_name: str, alarm_type: str, shard_count: int) -> dict:
+        """
+        Renders a stream alarm from the alarms template.
+        :param stream_name: name of the stream
+        :param alarm_type: scale-up or scale-down
+        :param shard_count: the stream shard count
+        :return: the alarm, as required for the alarm update operation
+        """
+        alarm_name = self.get_alarm_name(stream_name, alarm_type)
+        alarm = {
+            "AlarmName": alarm_name,
+            "ActionsEnabled": KinesisAutoscaler.should_enable_alarm_actions(
+                alarm_name, shard_count
+            ),
+            "TreatMissingData": "ignore",
+            "Metrics": build_usage_factor_queries(stream_name, shard_count),
+        }
+        if alarm_type == "scale-up":
+            alarm.update(
+                AlarmActions=[self.scale_up_topic_arn],
+                Threshold=SCALE_UP_USAGE_THRESHOLD,
+                ComparisonOperator="GreaterThanOrEqualToThreshold",
+                EvaluationPeriods=1,
+            )
+        else:
+            alarm.update(
+                AlarmActions=[self.scale_down_topic_arn],
+                Threshold=SCALE_DOWN_USAGE_THRESHOLD,
+                ComparisonOperator="LessThanOrEqualToThreshold",
+                EvaluationPeriods=SCALE_DOWN_EVALUATION_PERIODS,
+            )
+        return alarm
+
+    @staticmethod
+    def is_alarm_in_sync(existing_alarm: dict, alarm: dict) -> bool:
+        """
+        Checks whether an existing alarm matches its rendered template.
+        :param existing_alarm: alarm configuration as returned from describe operation
+        :param alarm: the rendered alarm
+        :return: True if the alarm doesn't require an update
+        """
+        return all(
+            existing_alarm.get(field) == alarm[field] for field in ALARM_TEMPLATE_FIELDS
+        )
+
+    @staticmethod
+    def get_alarm_shard_count(alarm: Optional[dict]) -> Optional[int]:
+        """
+        Parses the shard count of an existing alarm.
+        :param alarm: alarm configuration as returned from describe operation
+        :return: the alarm shard count, or None if it can't be parsed
+        """
+        for metric in (alarm or {}).get("Metrics", []):
+            if metric.get("Id") == "shardCount":
+                try:
+                    return int(metric["Expression"])
+                except (KeyError, ValueError):
+                    return None
+        return None
+
+    def get_alarm_name(self, stream_name: str, alarm_type: str) -> str:
+        """
+        Formats the name of a stream alarm.
+        :param stream_name: name of the stream
+        :param alarm_type: scale-up or scale-down
+        :return: the alarm name
+        """
+        return self.alarm_name_template.format(
+            stream_name=stream_name, alarm_type=alarm_type
+        )
+
+    def write_alarm(self, outdated_alarm: dict) -> dict:
+        """
+        Creates or repairs a single alarm.
+        :param outdated_alarm: the outdated alarm, as returned from
+            get_outdated_alarms
+        :return: report entry of the alarm
+        """
+        alarm = outdated_alarm["alarm"]
+        report_entry = {
+            "stream_name": outdated_alarm["stream_name"],
+            "alarm_name": alarm["AlarmName"],
+            "action": "REPAIR" if outdated_alarm["exists"] else "CREATE",
+        }
+        if self.dry_run:
+            report_entry["status"] = "DRY_RUN"
+            return report_entry
+
+        try:
+            get_client("cloudwatch").put_metric_alarm(**alarm)
+            report_entry["status"] = "SUCCEEDED"
+            logging.info(
+                f"Wrote stream alarm. alarm={alarm['AlarmName']} "
+                f"action={report_entry['action']}"
+            )
+        except Exception as exception:
+            logging.exception(
+                f"Failed writing stream alarm. alarm={alarm['AlarmName']}"
+            )
+            report_entry.update(status="FAILED", error=str(exception))
+
+        return report_entry
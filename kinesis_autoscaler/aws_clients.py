@@ -0,0 +1,106 @@
+"""
+Lazily initialized AWS clients registry
+"""
+import threading
+from kinesis_autoscaler.constants import (
+    REGION,
+    AWS_MAX_ATTEMPTS,
+    AWS_MUTATING_MAX_ATTEMPTS,
+    AWS_MAX_POOL_CONNECTIONS,
+)
+from kinesis_autoscaler.metrics_logger import (
+    record_aws_call_start,
+    record_aws_call_metrics,
+)
+from kinesis_autoscaler.aws_throttling import (
+    acquire_rate_limit_token,
+    record_throttling,
+)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(service_name: str, mutating: bool = False):
+    """
+    Returns the cached client of an AWS service, creating it on first use.
+    Clients are created lazily (including the boto3 import itself) in order
+    to keep cold starts short, and are reused across warm invocations.
+    Each call latency and retry attempts are recorded in the current metrics scope.
+    Clients use the adaptive retry mode, which backs off on throttling errors,
+    are rate limited per operation across the process, and share a connection
+    pool large enough for the concurrent scaling workers.
+    Mutating calls (e.g. UpdateShardCount) use a separate client with fewer
+    attempts, since their limit errors aren't resolved by retrying.
+    :param service_name: name of the AWS service (e.g. kinesis)
+    :param mutating: whether the client is used for mutating calls
+    :return: the service client
+    """
+    client_key = get_client_key(service_name, mutating)
+    client = _clients.get(client_key)
+    if client is None:
+        # boto3 sessions aren't thread safe, so clients are created under lock
+        with _clients_lock:
+            client = _clients.get(client_key)
+            if client is None:
+                import boto3
+                from botocore.config import Config
+
+                retries = (
+                    {
+                        "mode": "adaptive",
+                        "total_max_attempts": AWS_MUTATING_MAX_ATTEMPTS,
+                    }
+                    if mutating
+                    else {"mode": "adaptive", "max_attempts": AWS_MAX_ATTEMPTS}
+                )
+                client = boto3.client(
+                    service_name,
+                    region_name=REGION,
+                    config=Config(
+                        retries=retries,
+                        max_pool_connections=AWS_MAX_POOL_CONNECTIONS,
+                    ),
+                )
+                client.meta.events.register_first(
+                    "before-call.*.*", acquire_rate_limit_token
+                )
+                client.meta.events.register_first(
+                    "before-call.*.*", record_aws_call_start
+                )
+                client.meta.events.register("after-call", record_aws_call_metrics)
+                client.meta.events.register("needs-retry", record_throttling)
+                _clients[client_key] = client
+
+    return client
+
+
+def get_client_key(service_name: str, mutating: bool) -> str:
+    """
+    Returns the registry key of an AWS service client.
+    :param service_name: name of the AWS service (e.g. kinesis)
+    :param mutating: whether the client is used for mutating calls
+    :return: the client key
+    """
+    return f"{service_name}.mutating" if mutating else service_name
+
+
+def set_client(service_name: str, client) -> None:
+    """
+    Overrides the cached clients of an AWS service, for both its mutating
+    and other calls.
+    Used for injecting local stand-ins of the AWS services.
+    :param service_name: name of the AWS service (e.g. kinesis)
+    :param client: the client to use for the service
+    """
+    with _clients_lock:
+        for mutating in (False, True):
+            _clients[get_client_key(service_name, mutating)] = client
+
+
+def reset_clients() -> None:
+    """
+    Clears all the cached clients.
+    """
+    with _clients_lock:
+        _clients.clear()
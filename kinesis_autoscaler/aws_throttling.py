@@ -0,0 +1,141 @@
+"""
+Process-wide AWS calls rate limiting and throttling tracking
+"""
+import time
+import threading
+from typing import Callable, Dict
+from kinesis_autoscaler.metrics_logger import put_metric
+from kinesis_autoscaler.constants import AWS_OPERATIONS_RATE_LIMITS
+
+THROTTLING_ERROR_CODES = {
+    "Throttling",
+    "ThrottlingException",
+    "ThrottledException",
+    "RequestThrottled",
+    "RequestThrottledException",
+    "TooManyRequestsException",
+    "LimitExceededException",
+    "ProvisionedThroughputExceededException",
+    "RequestLimitExceeded",
+}
+# Kinesis resharding operations fail with LimitExceededException when the
+# stream or account shard limits are reached, which isn't throttling
+LIMIT_EXCEEDED_ERROR_CODE = "LimitExceededException"
+RESHARDING_CALL_NAMES = {
+    "kinesis.UpdateShardCount",
+    "kinesis.SplitShard",
+    "kinesis.MergeShards",
+    "kinesis.UpdateStreamMode",
+}
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket rate limiter
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        capacity: float = None,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        """
+        Initializes TokenBucket instance.
+        :param rate: tokens added per second
+        :param capacity: max tokens (burst size), defaults to the rate
+        :param clock: monotonic clock function
+        :param sleep: sleep function
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.last_refill_time = clock()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Takes a token, waiting for one to be available if needed.
+        :return: the time waited in seconds
+        """
+        with self.lock:
+            now = self.clock()
+            self.tokens = min(
+                self.capacity, self.tokens + (now - self.last_refill_time) * self.rate
+            )
+            self.last_refill_time = now
+            self.tokens -= 1
+            wait_time = -self.tokens / self.rate if self.tokens < 0 else 0
+
+        # the token is reserved, so waiting for it doesn't block other threads
+        if wait_time:
+            self.sleep(wait_time)
+        return wait_time
+
+
+_rate_limiters: Dict[str, TokenBucket] = {
+    call_name: TokenBucket(rate)
+    for call_name, rate in AWS_OPERATIONS_RATE_LIMITS.items()
+}
+_throttle_counts: Dict[str, int] = {}
+_throttle_counts_lock = threading.Lock()
+
+
+def get_call_name(operation_model) -> str:
+    """
+    Returns the AWS call name of an operation (e.g. kinesis.UpdateShardCount).
+    :param operation_model: the AWS call operation model
+    :return: the AWS call name
+    """
+    return f"{operation_model.service_model.service_name}.{operation_model.name}"
+
+
+def acquire_rate_limit_token(model, **_kwargs) -> None:
+    """
+    botocore before-call event handler, waits for the operation's process-wide
+    rate limit (if any) before each call.
+    :param model: the AWS call operation model
+    """
+    rate_limiter = _rate_limiters.get(get_call_name(model))
+    if rate_limiter:
+        wait_time = rate_limiter.acquire()
+        if wait_time:
+            put_metric("RateLimitWait", wait_time * 1000, "Milliseconds")
+
+
+def record_throttling(response, operation, **_kwargs) -> None:
+    """
+    botocore needs-retry event handler, counts throttled call attempts.
+    Retrying is left for the client's retry mode.
+    Limit errors of Kinesis resharding operations aren't counted.
+    :param response: the AWS call attempt (http response, parsed response),
+        or None if the attempt raised an exception
+    :param operation: the AWS call operation model
+    """
+    if not response:
+        return
+
+    error_code = response[1].get("Error", {}).get("Code")
+    if error_code not in THROTTLING_ERROR_CODES:
+        return
+
+    call_name = get_call_name(operation)
+    if error_code == LIMIT_EXCEEDED_ERROR_CODE and call_name in RESHARDING_CALL_NAMES:
+        return
+
+    with _throttle_counts_lock:
+        _throttle_counts[call_name] = _throttle_counts.get(call_name, 0) + 1
+    put_metric(f"{call_name}.Throttles", 1, "Count")
+
+
+def get_throttle_counts() -> Dict[str, int]:
+    """
+    Returns the number of throttled call attempts of each AWS operation
+    since the process started.
+    :return: dict of AWS call name to its throttled attempts count
+    """
+    with _throttle_counts_lock:
+        return dict(_throttle_counts)
@@ -0,0 +1,143 @@
+"""
+Kinesis stream batch scaler
+"""
+import logging
+from typing import List, Type
+from concurrent.futures import ThreadPoolExecutor
+from kinesis_autoscaler.alarm_event import AlarmEvent
+from kinesis_autoscaler.kinesis_autoscaler import KinesisAutoscaler
+from kinesis_autoscaler.constants import BATCH_MAX_WORKERS
+
+STATUS_SUCCEEDED = "SUCCEEDED"
+STATUS_FAILED = "FAILED"
+STATUS_DUPLICATE = "DUPLICATE"
+STATUS_SKIPPED = "SKIPPED"
+
+
+class BatchScalingError(Exception):
+    """
+    Raised when every scaled record of a batch failed
+    """
+
+
+class KinesisBatchScaler:
+    """
+    Scales the streams of multiple alarm events concurrently.
+    Alarm events of the same stream are coalesced, and only the newest
+    event of each stream is processed.
+    Alarm events of other alarm types (e.g. emergency scale-up events
+    matched by the scale-up EventBridge rule) are skipped.
+    """
+
+    def __init__(
+        self,
+        scaler_class: Type[KinesisAutoscaler],
+        event_messages: List[dict],
+        max_workers: int = BATCH_MAX_WORKERS,
+    ):
+        """
+        Initializes KinesisBatchScaler instance.
+        :param scaler_class: the autoscaler class used for scaling each stream
+        :param event_messages: triggering alarm events, as SNS alarm
+            notification messages or EventBridge alarm state change events
+        :param max_workers: max number of streams scaled concurrently
+        """
+        self.scaler_class = scaler_class
+        self.event_messages = event_messages
+        self.max_workers = max_workers
+
+    def scale(self) -> List[dict]:
+        """
+        Scales the streams of all the batch alarm events.
+        :return: scaling report containing an entry for each alarm event
+        """
+        report = [
+            {"alarm_name": None, "stream_name": None} for _ in self.event_messages
+        ]
+        latest_scalers = self.coalesce_scalers(report)
+
+        if latest_scalers:
+            workers = min(self.max_workers, len(latest_scalers))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                executor.map(
+                    lambda item: self.scale_stream(item[1], report[item[0]]),
+                    latest_scalers.values(),
+                )
+
+        failed_count = sum(entry["status"] == STATUS_FAILED for entry in report)
+        logging.info(
+            "Batch scaling process finished. "
+            f"records={len(report)} streams={len(latest_scalers)} "
+            f"failed={failed_count}"
+        )
+        # duplicate and skipped records aren't scaled, so they can't fail
+        scaled_count = sum(
+            entry["status"] not in (STATUS_DUPLICATE, STATUS_SKIPPED)
+            for entry in report
+        )
+        if scaled_count and failed_count == scaled_count:
+            raise BatchScalingError("All batch records failed to scale")
+
+        return report
+
+    def coalesce_scalers(self, report: List[dict]) -> dict:
+        """
+        Parses each record once and keeps a scaler of the newest event per stream.
+        Events are ordered by their alarm state change time, and in case of a tie
+        the later record in the batch is considered newer.
+        :param report: the batch scaling report, updated in place
+        :return: dict of stream name to (record index, scaler) of its newest event
+        """
+        latest_events = {}
+        for index, message in enumerate(self.event_messages):
+            try:
+                alarm_event = AlarmEvent.parse(message)
+            except Exception as exception:
+                logging.exception("Failed parsing batch record")
+                report[index].update(status=STATUS_FAILED, error=str(exception))
+                continue
+
+            stream_name = alarm_event.stream_name
+            report[index].update(
+                alarm_name=alarm_event.alarm_name, stream_name=stream_name
+            )
+            if alarm_event.alarm_type != self.scaler_class.alarm_type:
+                logging.info(
+                    "Alarm type isn't handled by the scaler. Record skipped. "
+                    f"alarm={alarm_event.alarm_name}"
+                )
+                report[index]["status"] = STATUS_SKIPPED
+                continue
+
+            if stream_name in latest_events:
+                latest_index, latest_event = latest_events[stream_name]
+                if (alarm_event.state_change_time or "") < (
+                    latest_event.state_change_time or ""
+                ):
+                    report[index]["status"] = STATUS_DUPLICATE
+                    continue
+
+                report[latest_index]["status"] = STATUS_DUPLICATE
+
+            latest_events[stream_name] = (index, alarm_event)
+
+        return {
+            stream_name: (index, self.scaler_class(alarm_event))
+            for stream_name, (index, alarm_event) in latest_events.items()
+        }
+
+    @staticmethod
+    def scale_stream(scaler: KinesisAutoscaler, report_entry: dict) -> None:
+        """
+        Scales a single stream and records the result in its report entry.
+        :param scaler: the stream scaler
+        :param report_entry: the report entry of the stream's alarm event
+        """
+        try:
+            scaler.scale()
+            report_entry["status"] = STATUS_SUCCEEDED
+        except Exception as exception:
+            logging.exception(
+                f"stream scaling process failed. stream={report_entry['stream_name']}"
+            )
+            report_entry.update(status=STATUS_FAILED, error=str(exception))
@@ -0,0 +1,334 @@
+"""
+Kinesis streams capacity mode advisor
+"""
+import math
+import logging
+from typing import List, NamedTuple, Optional
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from kinesis_autoscaler.aws_clients import get_client
+from kinesis_autoscaler.kinesis_autoscaler import ON_DEMAND_STREAM_MODE
+from kinesis_autoscaler.alarm_event import AlarmEvent
+from kinesis_autoscaler.kinesis_upscaler import KinesisUpscaler
+from kinesis_autoscaler.usage_history import update_usage_history
+from kinesis_autoscaler.scaling_history import LatestScaling, set_latest_scaling
+from kinesis_autoscaler.scaling_policies import ScalingPolicy, get_scaling_policy
+from kinesis_autoscaler.fleet_sweeper import KinesisFleetSweeper, SubscribedStream
+from kinesis_autoscaler.constants import (
+    BATCH_MAX_WORKERS,
+    LOGS_RETENTION_DAYS,
+    SCALE_UP_USAGE_THRESHOLD,
+    SCALING_HYSTERESIS_MARGIN,
+    PROVISIONED_SHARD_HOUR_PRICE,
+    ON_DEMAND_STREAM_HOUR_PRICE,
+    ON_DEMAND_INGEST_GB_PRICE,
+    CAPACITY_MODE_SWITCH_MARGIN,
+    MAX_CAPACITY_MODE_SWITCHES_PER_DAY,
+    CAPACITY_MODE_DRY_RUN,
+)
+
+PROVISIONED_STREAM_MODE = "PROVISIONED"
+CAPACITY_MODE_SWITCH = "CAPACITY_MODE_SWITCH"
+SHARD_WRITE_BYTES_PER_SECOND = 1024 * 1024
+
+
+class CapacityModeCosts(NamedTuple):
+    """
+    Estimated hourly costs of a stream in each capacity mode
+    """
+
+    provisioned: float
+    on_demand: float
+
+    def get_recommended_stream_mode(self, current_stream_mode: str) -> str:
+        """
+        Recommends the cheaper capacity mode, keeping the current mode unless
+        the other mode is cheaper by the switch margin.
+        :param current_stream_mode: the stream's current capacity mode
+        :return: the recommended capacity mode
+        """
+        if self.on_demand < self.provisioned * (1 - CAPACITY_MODE_SWITCH_MARGIN):
+            return ON_DEMAND_STREAM_MODE
+        if self.provisioned < self.on_demand * (1 - CAPACITY_MODE_SWITCH_MARGIN):
+            return PROVISIONED_STREAM_MODE
+        return current_stream_mode
+
+
+class KinesisCapacityModeAdvisor:
+    """
+    Periodically compares the provisioned and on-demand capacity mode costs of
+    all the subscribed streams, and switches the streams whose cheaper mode is
+    clear (unless running in dry run mode).
+    Alarm actions are disabled while a stream is on-demand, so the scalers
+    don't act on a stream whose shards are managed by Kinesis.
+    """
+
+    def __init__(
+        self,
+        dry_run: bool = CAPACITY_MODE_DRY_RUN,
+        max_workers: int = BATCH_MAX_WORKERS,
+    ):
+        """
+        Initializes KinesisCapacityModeAdvisor instance.
+        :param dry_run: whether to only report the recommendations
+        :param max_workers: max number of streams evaluated concurrently
+        """
+        self.dry_run = dry_run
+        self.max_workers = max_workers
+
+    def advise(self) -> List[dict]:
+        """
+        Evaluates all the subscribed streams and switches the ones whose
+        recommended capacity mode differs from their current mode.
+        :return: report containing an entry for each stream with a different
+            recommended capacity mode
+        """
+        streams = KinesisFleetSweeper.list_subscribed_streams()
+        report = []
+        if streams:
+            workers = min(self.max_workers, len(streams))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                report = [
+                    entry
+                    for entry in executor.map(self.evaluate_stream, streams)
+                    if entry
+                ]
+
+        logging.info(
+            "Capacity mode advisor evaluated streams. "
+            f"streams={len(streams)} recommendations={len(report)} "
+            f"dry_run={self.dry_run}"
+        )
+        return report
+
+    def evaluate_stream(self, stream: SubscribedStream) -> Optional[dict]:
+        """
+        Evaluates a single stream, and switches its capacity mode if required.
+        :param stream: the evaluated stream
+        :return: report entry of the stream, or None if its current capacity
+            mode is the recommended mode
+        """
+        report_entry = {"stream_name": stream.stream_name}
+        try:
+            stream_summary = get_client("kinesis").describe_stream_summary(
+                StreamName=stream.stream_name
+            )["StreamDescriptionSummary"]
+            stream_mode = stream_summary.get("StreamModeDetails", {}).get(
+                "StreamMode", PROVISIONED_STREAM_MODE
+            )
+            costs = self.get_capacity_mode_costs(
+                stream, get_scaling_policy(stream.stream_name)
+            )
+            if costs is None:
+                return None
+
+            recommended_stream_mode = costs.get_recommended_stream_mode(stream_mode)
+            if recommended_stream_mode == stream_mode:
+                return None
+
+            report_entry.update(
+                stream_mode=stream_mode,
+                recommended_stream_mode=recommended_stream_mode,
+                provisioned_hourly_cost=round(costs.provisioned, 4),
+                on_demand_hourly_cost=round(costs.on_demand, 4),
+            )
+            report_entry["status"] = self.switch_stream_mode(
+                stream, stream_summary, recommended_stream_mode
+            )
+        except Exception as exception:
+            logging.exception(
+                f"stream capacity mode evaluation failed. stream={stream.stream_name}"
+            )
+            report_entry.update(status="FAILED", error=str(exception))
+
+        return report_entry
+
+    @staticmethod
+    def get_capacity_mode_costs(
+        stream: SubscribedStream, policy: ScalingPolicy
+    ) -> Optional[CapacityModeCosts]:
+        """
+        Estimates the stream's hourly cost in each capacity mode from its used
+        shard count data points in the policy's usage window, the same usage
+        history the scale-down operations are based on.
+        In provisioned mode, the stream is charged for the shard count the
+        scale-down operations keep it at, sized by its peak usage.
+        In on-demand mode, it is charged per stream hour and per ingested GB,
+        estimated as if all of its usage were incoming bytes. This over-estimates
+        the on-demand cost of streams bound by their records or read usage,
+        so they aren't switched to on-demand by an under-estimate.
+        The provisioned PUT payload units and the on-demand read charges are
+        left out of the estimates.
+        :param stream: the evaluated stream
+        :param policy: the stream scaling policy
+        :return: the estimated hourly costs, or None if the stream has no data points
+        """
+        usage_history = update_usage_history(
+            stream.stream_name,
+            stream.alarm_shard_count,
+            timedelta(hours=policy.usage_window_hours),
+        )
+        peak_used_shard_count = usage_history.percentile(policy.usage_percentile)
+        if peak_used_shard_count is None:
+            return None
+
+        provisioned_shard_count = policy.clamp(
+            max(
+                math.ceil(
+                    peak_used_shard_count
+                    / min(
+                        policy.target_usage_factor,
+                        SCALE_UP_USAGE_THRESHOLD - SCALING_HYSTERESIS_MARGIN,
+                    )
+                ),
+                1,
+            )
+        )
+        used_shard_counts = usage_history.used_shard_counts
+        mean_used_shard_count = sum(used_shard_counts) / len(used_shard_counts)
+        ingested_gb_per_hour = (
+            mean_used_shard_count * SHARD_WRITE_BYTES_PER_SECOND * 3600 / 1024 ** 3
+        )
+        return CapacityModeCosts(
+            provisioned=provisioned_shard_count * PROVISIONED_SHARD_HOUR_PRICE,
+            on_demand=ON_DEMAND_STREAM_HOUR_PRICE
+            + ingested_gb_per_hour * ON_DEMAND_INGEST_GB_PRICE,
+        )
+
+    def switch_stream_mode(
+        self, stream: SubscribedStream, stream_summary: dict, stream_mode: str
+    ) -> str:
+        """
+        Switches a stream's capacity mode, within the API's switches limit.
+        Switching to on-demand disables the stream alarm actions before the
+        switch. Switching to provisioned syncs the stream alarms with its
+        current shard count and re-enables their actions after the switch.
+        :param stream: the switched stream
+        :param stream_summary: the stream summary as returned from describe operation
+        :param stream_mode: the capacity mode to switch to
+        :return: the switch status
+        """
+        if self.dry_run:
+            logging.info(
+                "Dry run. Capacity mode switch skipped. "
+                f"stream={stream.stream_name} stream_mode={stream_mode}"
+            )
+            return "DRY_RUN"
+
+        if stream_summary["StreamStatus"] != "ACTIVE":
+            logging.info(
+                "Stream is not active. Capacity mode switch skipped. "
+                f"stream={stream.stream_name}"
+            )
+            return "SKIPPED"
+
+        if self.count_recent_switches(stream.stream_name) >= (
+            MAX_CAPACITY_MODE_SWITCHES_PER_DAY
+        ):
+            logging.info(
+                "Stream capacity mode switches limit reached. "
+                f"Capacity mode switch skipped. stream={stream.stream_name}"
+            )
+            return "LIMITED"
+
+        alarm_names = self.get_alarm_names(stream)
+        cloudwatch_client = get_client("cloudwatch")
+        if stream_mode == ON_DEMAND_STREAM_MODE:
+            cloudwatch_client.disable_alarm_actions(AlarmNames=alarm_names)
+            try:
+                self.update_stream_mode(stream_summary["StreamARN"], stream_mode)
+            except Exception:
+                cloudwatch_client.enable_alarm_actions(AlarmNames=alarm_names)
+                raise
+        else:
+            self.update_stream_mode(stream_summary["StreamARN"], stream_mode)
+            current_shard_count = stream_summary["OpenShardCount"]
+            scaler = KinesisUpscaler(AlarmEvent.from_alarm(stream.scale_up_alarm))
+            scaler.stream_name = stream.stream_name
+            scaler.update_stream_alarms(current_shard_count)
+            # the emergency alarm isn't based on the shard count
+            cloudwatch_client.enable_alarm_actions(AlarmNames=alarm_names[2:])
+
+        self.write_switch_log_to_db(stream.stream_name, stream_summary, stream_mode)
+        return "SWITCHED"
+
+    @staticmethod
+    def get_alarm_names(stream: SubscribedStream) -> List[str]:
+        """
+        Returns the stream's scale-up, scale-down and emergency scale-up
+        alarm names, according to the integration requirements.
+        :param stream: the subscribed stream
+        :return: list of the stream alarm names
+        """
+        scale_up_alarm_name = stream.scale_up_alarm["AlarmName"]
+        return [
+            scale_up_alarm_name,
+            scale_up_alarm_name.replace("scale-up", "scale-down"),
+            scale_up_alarm_name.replace("scale-up", "emergency-scale-up"),
+        ]
+
+    @staticmethod
+    def update_stream_mode(stream_arn: str, stream_mode: str) -> None:
+        """
+        Updates the stream capacity mode using the UpdateStreamMode API.
+        :param stream_arn: ARN of the stream
+        :param stream_mode: the capacity mode to switch to
+        """
+        get_client("kinesis", mutating=True).update_stream_mode(
+            StreamARN=stream_arn, StreamModeDetails={"StreamMode": stream_mode}
+        )
+        logging.info(
+            "Updated stream capacity mode successfully. "
+            f"stream_arn={stream_arn} stream_mode={stream_mode}"
+        )
+
+    @staticmethod
+    def count_recent_switches(stream_name: str) -> int:
+        """
+        Counts the stream capacity mode switches in the last 24 hours,
+        according to the scaling logs.
+        :param stream_name: name of the stream
+        :return: number of capacity mode switches
+        """
+        from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+
+        since_datetime = datetime.now(timezone.utc) - timedelta(days=1)
+        return sum(
+            1
+            for _ in KinesisAutoscalerLog.query(
+                stream_name,
+                KinesisAutoscalerLog.scaling_datetime > since_datetime,
+                filter_condition=KinesisAutoscalerLog.scaling_type
+                == CAPACITY_MODE_SWITCH,
+            )
+        )
+
+    @staticmethod
+    def write_switch_log_to_db(
+        stream_name: str, stream_summary: dict, stream_mode: str
+    ) -> None:
+        """
+        Writes a capacity mode switch log to DB.
+        The switch doesn't change the stream shard count, so it isn't tracked
+        as a resharding operation.
+        :param stream_name: name of the stream
+        :param stream_summary: the stream summary as returned from describe operation
+        :param stream_mode: the capacity mode the stream switched to
+        """
+        from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+
+        scaling_datetime = datetime.now(timezone.utc)
+        shard_count = stream_summary["OpenShardCount"]
+        KinesisAutoscalerLog(
+            stream_name=stream_name,
+            scaling_datetime=scaling_datetime,
+            shard_count=shard_count,
+            target_shard_count=shard_count,
+            scaling_type=CAPACITY_MODE_SWITCH,
+            stream_mode=stream_mode,
+            expiration_datetime=timedelta(days=LOGS_RETENTION_DAYS),
+        ).save()
+        set_latest_scaling(
+            stream_name,
+            LatestScaling(scaling_datetime, CAPACITY_MODE_SWITCH, shard_count),
+        )
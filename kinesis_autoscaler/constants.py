@@ -10,3 +10,163 @@ DEFAULT_STAGE = "dev"
 STAGE = os.getenv("STAGE", DEFAULT_STAGE)
 
 LOGS_RETENTION_DAYS = 14
+USAGE_HISTORY_RETENTION_DAYS = 2
+USAGE_FORECAST_RETENTION_DAYS = 30
+EVENTS_RETENTION_DAYS = 1
+
+DEFAULT_BATCH_MAX_WORKERS = 8
+BATCH_MAX_WORKERS = int(os.getenv("BATCH_MAX_WORKERS", DEFAULT_BATCH_MAX_WORKERS))
+
+SCALE_UP_USAGE_THRESHOLD = 0.75
+SCALE_DOWN_USAGE_THRESHOLD = 0.25
+
+# min time since the latest scaling operation before scaling up/down again,
+# scale-up waits only for a previous scale-up, scale-down waits for any scaling
+DEFAULT_SCALE_UP_COOLDOWN_MINUTES = 5
+SCALE_UP_COOLDOWN_MINUTES = int(
+    os.getenv("SCALE_UP_COOLDOWN_MINUTES", DEFAULT_SCALE_UP_COOLDOWN_MINUTES)
+)
+DEFAULT_SCALE_DOWN_COOLDOWN_MINUTES = 60
+SCALE_DOWN_COOLDOWN_MINUTES = int(
+    os.getenv("SCALE_DOWN_COOLDOWN_MINUTES", DEFAULT_SCALE_DOWN_COOLDOWN_MINUTES)
+)
+# emergency scale-ups wait only for a previous scale-up whose added capacity
+# should already show in the throttling metrics
+DEFAULT_EMERGENCY_SCALE_UP_COOLDOWN_MINUTES = 2
+EMERGENCY_SCALE_UP_COOLDOWN_MINUTES = int(
+    os.getenv(
+        "EMERGENCY_SCALE_UP_COOLDOWN_MINUTES",
+        DEFAULT_EMERGENCY_SCALE_UP_COOLDOWN_MINUTES,
+    )
+)
+SCALING_HISTORY_CACHE_TTL_SECONDS = 60
+SCALING_POLICIES_CACHE_TTL_SECONDS = 300
+
+# scale-down keeps the projected peak usage below the scale-up threshold
+# minus this margin, so a scale-down never triggers the next scale-up
+SCALING_HYSTERESIS_MARGIN = 0.15
+
+# scale-down is blocked while the consumers lag behind more than this
+DEFAULT_SCALE_DOWN_MAX_ITERATOR_AGE_MS = 60000
+SCALE_DOWN_MAX_ITERATOR_AGE_MS = int(
+    os.getenv("SCALE_DOWN_MAX_ITERATOR_AGE_MS", DEFAULT_SCALE_DOWN_MAX_ITERATOR_AGE_MS)
+)
+ITERATOR_AGE_LOOKBACK_MINUTES = 30
+
+# seasonal usage forecasts, fitted from hourly peaks with exponential smoothing
+# (weekly hour-of-week profile, and a daily hour-of-day fallback profile)
+FORECAST_BOOTSTRAP_DAYS = 7
+FORECAST_WEEKLY_SMOOTHING = 0.5
+FORECAST_DAILY_SMOOTHING = 0.3
+USAGE_FORECAST_CACHE_TTL_SECONDS = 300
+# streams are pre-scaled when their forecast peak in the lead time crosses the
+# scale-up threshold, and scale-downs keep the forecast peak of the hold-off
+# window below the hysteresis band
+DEFAULT_FORECAST_PRESCALE_LEAD_MINUTES = 30
+FORECAST_PRESCALE_LEAD_MINUTES = int(
+    os.getenv("FORECAST_PRESCALE_LEAD_MINUTES", DEFAULT_FORECAST_PRESCALE_LEAD_MINUTES)
+)
+FORECAST_HOLD_OFF_MINUTES = 60
+
+# STEP - scale-up by fixed increments, PROPORTIONAL - scale-up according to usage
+DEFAULT_UPSCALE_MODE = "STEP"
+UPSCALE_MODE = os.getenv("UPSCALE_MODE", DEFAULT_UPSCALE_MODE)
+
+DEFAULT_UPSCALE_TARGET_USAGE_FACTOR = 0.5
+UPSCALE_TARGET_USAGE_FACTOR = float(
+    os.getenv("UPSCALE_TARGET_USAGE_FACTOR", DEFAULT_UPSCALE_TARGET_USAGE_FACTOR)
+)
+
+# UNIFORM - reshard all shards evenly, TARGETED - split hot shards/merge cold shards
+UNIFORM_RESHARDING_STRATEGY = "UNIFORM"
+TARGETED_RESHARDING_STRATEGY = "TARGETED"
+DEFAULT_RESHARDING_STRATEGY = UNIFORM_RESHARDING_STRATEGY
+RESHARDING_STRATEGY = os.getenv("RESHARDING_STRATEGY", DEFAULT_RESHARDING_STRATEGY)
+
+# max ratio of hot shards for which targeted resharding is preferred
+TARGETED_RESHARDING_MAX_HOT_SHARDS_RATIO = 0.5
+TARGETED_RESHARDING_WAIT_SECONDS = 20
+# invocation time left after the targeted resharding waits, for syncing the
+# alarms and writing the scaling log before the function times out
+TARGETED_RESHARDING_TIME_MARGIN_SECONDS = 10
+
+# UpdateShardCount API limits (per stream)
+MAX_SCALING_OPERATIONS_PER_DAY = 10
+MAX_SCALE_UP_FACTOR = 2
+MAX_SCALE_DOWN_FACTOR = 2
+
+# daily scaling operations that scale-down operations can't use
+DEFAULT_RESERVED_SCALE_UP_OPERATIONS = 2
+RESERVED_SCALE_UP_OPERATIONS = int(
+    os.getenv("RESERVED_SCALE_UP_OPERATIONS", DEFAULT_RESERVED_SCALE_UP_OPERATIONS)
+)
+
+# alarms reconciler template, alarm names must contain the alarm type
+# (scale-up/scale-down) as required by the scalers
+SCALE_UP_TOPIC_ARN = os.getenv("SCALE_UP_TOPIC_ARN")
+SCALE_DOWN_TOPIC_ARN = os.getenv("SCALE_DOWN_TOPIC_ARN")
+DEFAULT_ALARM_NAME_TEMPLATE = "{stream_name}-{alarm_type}"
+ALARM_NAME_TEMPLATE = os.getenv("ALARM_NAME_TEMPLATE", DEFAULT_ALARM_NAME_TEMPLATE)
+
+# account shard limit (DescribeLimits) cache, scale-ups reserve shards from
+# the account headroom until the limits are described again
+SHARD_QUOTA_CACHE_TTL_SECONDS = 60
+# share of the account shard limit reserved for the scale-ups of critical
+# priority streams and emergency scale-ups
+DEFAULT_CRITICAL_SHARD_RESERVE_RATIO = 0.05
+CRITICAL_SHARD_RESERVE_RATIO = float(
+    os.getenv("CRITICAL_SHARD_RESERVE_RATIO", DEFAULT_CRITICAL_SHARD_RESERVE_RATIO)
+)
+CRITICAL_STREAM_PRIORITY = 10
+
+# capacity mode advisor cost model, us-east-1 prices (USD)
+PROVISIONED_SHARD_HOUR_PRICE = 0.015
+ON_DEMAND_STREAM_HOUR_PRICE = 0.04
+ON_DEMAND_INGEST_GB_PRICE = 0.08
+# streams switch capacity mode only when the other mode is cheaper by this ratio
+CAPACITY_MODE_SWITCH_MARGIN = 0.2
+# UpdateStreamMode API limit (per stream)
+MAX_CAPACITY_MODE_SWITCHES_PER_DAY = 2
+# the advisor only reports its recommendations unless dry run is disabled
+CAPACITY_MODE_DRY_RUN = os.getenv("CAPACITY_MODE_DRY_RUN", "true").lower() == "true"
+
+# AWS clients retry and connection pool configuration
+DEFAULT_AWS_MAX_ATTEMPTS = 10
+AWS_MAX_ATTEMPTS = int(os.getenv("AWS_MAX_ATTEMPTS", DEFAULT_AWS_MAX_ATTEMPTS))
+# Kinesis rejects resharding operations beyond its shard limits with
+# LimitExceededException, which the retry modes treat as throttling,
+# so the mutating calls are retried only once
+DEFAULT_AWS_MUTATING_MAX_ATTEMPTS = 2
+AWS_MUTATING_MAX_ATTEMPTS = int(
+    os.getenv("AWS_MUTATING_MAX_ATTEMPTS", DEFAULT_AWS_MUTATING_MAX_ATTEMPTS)
+)
+AWS_MAX_POOL_CONNECTIONS = 50
+
+# process-wide rate limits (calls per second) of AWS operations with low quotas
+AWS_OPERATIONS_RATE_LIMITS = {
+    "cloudwatch.PutMetricAlarm": 3,
+    "cloudwatch.SetAlarmState": 3,
+    "cloudwatch.DescribeAlarms": 9,
+    "cloudwatch.GetMetricData": 50,
+    "kinesis.DescribeLimits": 1,
+    "kinesis.DescribeStreamSummary": 20,
+    "kinesis.ListShards": 100,
+}
+
+# opt-in per-invocation profiling, comma separated modes:
+# CPU - cProfile top functions, MEMORY - tracemalloc allocation hotspots
+PROFILING_MODES = {
+    mode.strip().upper()
+    for mode in os.getenv("PROFILING_MODES", "").split(",")
+    if mode.strip()
+}
+# profiles one in N invocations, and optionally every cold start invocation
+DEFAULT_PROFILING_SAMPLE_RATE = 100
+PROFILING_SAMPLE_RATE = int(
+    os.getenv("PROFILING_SAMPLE_RATE", DEFAULT_PROFILING_SAMPLE_RATE)
+)
+PROFILING_COLD_START = os.getenv("PROFILING_COLD_START", "false").lower() == "true"
+PROFILING_TOP_ENTRIES = 20
+# local directory or s3://bucket/prefix path the full profiles are written to
+PROFILING_OUTPUT_PATH = os.getenv("PROFILING_OUTPUT_PATH")
+PROFILING_S3_ENDPOINT_URL = os.getenv("PROFILING_S3_ENDPOINT_URL")
@@ -0,0 +1,470 @@
+"""
+Kinesis streams fleet sweeper
+"""
+import logging
+from typing import Dict, List, NamedTuple, Optional, Tuple, Type
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from kinesis_autoscaler.alarm_event import AlarmEvent, SCALE_UP_ALARM_TYPE
+from kinesis_autoscaler.kinesis_autoscaler import KinesisAutoscaler
+from kinesis_autoscaler.aws_clients import get_client
+from kinesis_autoscaler.kinesis_upscaler import KinesisUpscaler
+from kinesis_autoscaler.kinesis_downscaler import KinesisDownscaler
+from kinesis_autoscaler.metrics_logger import metrics_scope, set_property
+from kinesis_autoscaler.usage_history import get_percentile
+from kinesis_autoscaler.usage_forecast import get_forecast_used_shard_count
+from kinesis_autoscaler.scaling_policies import get_scaling_policy
+from kinesis_autoscaler.shard_quota import get_shard_headroom
+from kinesis_autoscaler.usage_metrics import (
+    METRIC_PERIOD_SECONDS,
+    USAGE_FACTOR_METRIC_ID,
+    build_usage_factor_queries,
+    get_complete_periods_end_time,
+)
+from kinesis_autoscaler.constants import (
+    BATCH_MAX_WORKERS,
+    UPSCALE_MODE,
+    SCALE_UP_USAGE_THRESHOLD,
+    SCALE_DOWN_USAGE_THRESHOLD,
+    FORECAST_HOLD_OFF_MINUTES,
+)
+
+MAX_METRIC_DATA_QUERIES = 500
+USAGE_WINDOW = timedelta(days=1)
+
+
+class SubscribedStream(NamedTuple):
+    """
+    Stream subscribed to the autoscaler using a scale-up/scale-down alarms pair
+    """
+
+    stream_name: str
+    alarm_shard_count: int
+    scale_up_alarm: dict
+
+
+class ScalingDecision(NamedTuple):
+    """
+    Scaling decision of a single stream
+    """
+
+    stream: SubscribedStream
+    scaler_class: Type[KinesisAutoscaler]
+    target_shard_count: int
+
+
+class KinesisFleetSweeper:
+    """
+    Periodically evaluates all the subscribed streams using bulk metric
+    queries, and scales only the streams that require it.
+    """
+
+    def __init__(self, max_workers: int = BATCH_MAX_WORKERS):
+        """
+        Initializes KinesisFleetSweeper instance.
+        :param max_workers: max number of streams scaled concurrently
+        """
+        self.max_workers = max_workers
+
+    def sweep(self) -> List[dict]:
+        """
+        Evaluates all the subscribed streams and scales the ones that require it.
+        :return: scaling report containing an entry for each scaled stream
+        """
+        streams = self.list_subscribed_streams()
+        usage_factors = self.get_usage_factors(streams)
+        decisions = [
+            decision
+            for decision in (
+                self.get_scaling_decision(stream, usage_factors[stream.stream_name])
+                for stream in streams
+            )
+            if decision
+        ]
+        decisions, report = self.allocate_shard_headroom(
+            streams, decisions, usage_factors
+        )
+        logging.info(
+            "Fleet sweep evaluated streams. "
+            f"streams={len(streams)} scaling_decisions={len(decisions)} "
+            f"quota_limited={len(report)}"
+        )
+
+        if decisions:
+            workers = min(self.max_workers, len(decisions))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                report.extend(executor.map(self.apply_scaling_decision, decisions))
+
+        return report
+
+    @staticmethod
+    def list_subscribed_streams() -> List[SubscribedStream]:
+        """
+        Lists the subscribed streams by their scale-up alarms.
+        Alarms that don't follow the integration requirements are ignored.
+        :return: list of the subscribed streams
+        """
+        streams = []
+        request = {"AlarmTypes": ["MetricAlarm"]}
+        while True:
+            response = get_client("cloudwatch").describe_alarms(**request)
+            for alarm in response["MetricAlarms"]:
+                stream = KinesisFleetSweeper.parse_subscribed_stream(alarm)
+                if stream:
+                    streams.append(stream)
+
+            if not response.get("NextToken"):
+                return streams
+            request["NextToken"] = response["NextToken"]
+
+    @staticmethod
+    def parse_subscribed_stream(alarm: dict) -> Optional[SubscribedStream]:
+        """
+        Parses the subscribed stream from a scale-up alarm definition.
+        :param alarm: alarm configuration as returned from describe operation
+        :return: the subscribed stream, or None if the alarm isn't a scale-up alarm
+        """
+        try:
+            alarm_event = AlarmEvent.from_alarm(alarm)
+        except ValueError:
+            return None
+
+        if (
+            alarm_event.alarm_type != SCALE_UP_ALARM_TYPE
+            or alarm_event.shard_count is None
+        ):
+            return None
+
+        return SubscribedStream(alarm_event.stream_name, alarm_event.shard_count, alarm)
+
+    @staticmethod
+    def get_usage_factors(streams: List[SubscribedStream]) -> Dict[str, List[float]]:
+        """
+        Queries for the usage factor data points of all the streams in the last
+        24 hours (5m aggregation), packing as many streams as possible in each
+        request. The current partial period is left out, so the newest data
+        point is of a complete period.
+        :param streams: the streams to query
+        :return: dict of stream name to its usage factor data points,
+            ordered from the newest to the oldest
+        """
+        streams_per_request = MAX_METRIC_DATA_QUERIES // len(
+            build_usage_factor_queries("", 0)
+        )
+        current_datetime = get_complete_periods_end_time(datetime.now())
+        usage_factors = {stream.stream_name: [] for stream in streams}
+
+        for chunk_start in range(0, len(streams), streams_per_request):
+            chunk_end = chunk_start + streams_per_request
+            chunk = streams[chunk_start:chunk_end]
+            queries = []
+            for index, stream in enumerate(chunk):
+                queries.extend(
+                    build_usage_factor_queries(
+                        stream.stream_name,
+                        stream.alarm_shard_count,
+                        id_prefix=f"s{index}",
+                    )
+                )
+
+            request = {
+                "StartTime": current_datetime - USAGE_WINDOW,
+                "EndTime": current_datetime,
+                "MetricDataQueries": queries,
+            }
+            while True:
+                response = get_client("cloudwatch").get_metric_data(**request)
+                for result in response["MetricDataResults"]:
+                    index = int(result["Id"][1:].removesuffix(USAGE_FACTOR_METRIC_ID))
+                    usage_factors[chunk[index].stream_name].extend(result["Values"])
+
+                if not response.get("NextToken"):
+                    break
+                request["NextToken"] = response["NextToken"]
+
+        return usage_factors
+
+    @staticmethod
+    def get_scaling_decision(
+        stream: SubscribedStream, usage_factors: List[float]
+    ) -> Optional[ScalingDecision]:
+        """
+        Decides whether a stream should be scaled according to the same
+        thresholds used by the scaling alarms.
+        :param stream: the evaluated stream
+        :param usage_factors: the stream usage factor data points,
+            ordered from the newest to the oldest
+        :return: the scaling decision, or None if the stream shouldn't be scaled
+        """
+        if not usage_factors:
+            return None
+
+        shard_count = stream.alarm_shard_count
+        policy = get_scaling_policy(stream.stream_name)
+        if usage_factors[0] >= SCALE_UP_USAGE_THRESHOLD:
+            scaler_class = KinesisUpscaler
+            target_shard_count = KinesisUpscaler.calculate_target_shard_count(
+                shard_count,
+                usage_factors[0] if UPSCALE_MODE == "PROPORTIONAL" else None,
+                policy,
+            )
+        elif max(usage_factors) <= SCALE_DOWN_USAGE_THRESHOLD and shard_count > 1:
+            scaler_class = KinesisDownscaler
+            target_shard_count = KinesisFleetSweeper.get_scale_down_target_shard_count(
+                stream, usage_factors
+            )
+        else:
+            return None
+
+        if target_shard_count == shard_count:
+            return None
+
+        return ScalingDecision(stream, scaler_class, target_shard_count)
+
+    @staticmethod
+    def get_scale_down_target_shard_count(
+        stream: SubscribedStream, usage_factors: List[float]
+    ) -> int:
+        """
+        Calculates the scale-down target of a stream according to its policy.
+        :param stream: the evaluated stream
+        :param usage_factors: the stream usage factor data points,
+            ordered from the newest to the oldest
+        :return: the shard count the stream can scale down to
+        """
+        policy = get_scaling_policy(stream.stream_name)
+        # the policy's lookback window is limited by the queried usage window
+        window_data_points = policy.usage_window_hours * 3600 // METRIC_PERIOD_SECONDS
+        return KinesisDownscaler.calculate_target_shard_count(
+            stream.alarm_shard_count,
+            get_percentile(usage_factors[:window_data_points], policy.usage_percentile),
+            policy,
+            get_forecast_used_shard_count(
+                stream.stream_name, timedelta(minutes=FORECAST_HOLD_OFF_MINUTES)
+            ),
+        )
+
+    @staticmethod
+    def allocate_shard_headroom(
+        streams: List[SubscribedStream],
+        decisions: List[ScalingDecision],
+        usage_factors: Dict[str, List[float]],
+    ) -> Tuple[List[ScalingDecision], List[dict]]:
+        """
+        Shares the account shard headroom between the scale-up decisions.
+        Streams with a higher priority, and then streams closer to throttling,
+        get their shards first, and only critical streams get the critical
+        shard reserve. Scale-ups that don't fit are limited to the remaining
+        headroom or skipped, and lower priority streams are trimmed to free
+        shards for the skipped shards of the following sweeps.
+        :param streams: the subscribed streams
+        :param decisions: the scaling decisions of the streams
+        :param usage_factors: dict of stream name to its usage factor data
+            points, ordered from the newest to the oldest
+        :return: the allocated scaling decisions, and scaling report entries
+            of the scale-ups skipped for lack of shards
+        """
+        scale_ups = sorted(
+            (
+                decision
+                for decision in decisions
+                if decision.target_shard_count > decision.stream.alarm_shard_count
+            ),
+            key=lambda decision: (
+                -get_scaling_policy(decision.stream.stream_name).priority,
+                -usage_factors[decision.stream.stream_name][0],
+            ),
+        )
+        if not scale_ups:
+            return decisions, []
+
+        headroom = get_shard_headroom(critical=True)
+        critical_shard_reserve = headroom - get_shard_headroom(critical=False)
+        allocated_decisions = [
+            decision
+            for decision in decisions
+            if decision.target_shard_count < decision.stream.alarm_shard_count
+        ]
+        report = []
+        # priority of the highest priority stream missing shards
+        starved_priority = None
+        missing_shard_count = 0
+        for decision in scale_ups:
+            policy = get_scaling_policy(decision.stream.stream_name)
+            available_shard_count = headroom
+            if not policy.is_critical():
+                available_shard_count -= critical_shard_reserve
+            shard_count = decision.stream.alarm_shard_count
+            requested_shard_count = decision.target_shard_count - shard_count
+            allocated_shard_count = max(
+                min(requested_shard_count, available_shard_count), 0
+            )
+            headroom -= allocated_shard_count
+
+            if allocated_shard_count < requested_shard_count:
+                missing_shard_count += requested_shard_count - allocated_shard_count
+                if starved_priority is None:
+                    starved_priority = policy.priority
+            if allocated_shard_count:
+                allocated_decisions.append(
+                    decision._replace(
+                        target_shard_count=shard_count + allocated_shard_count
+                    )
+                )
+            else:
+                logging.info(
+                    "Account shard limit reached. Scaling skipped. "
+                    f"stream={decision.stream.stream_name}"
+                )
+                report.append(
+                    {
+                        "stream_name": decision.stream.stream_name,
+                        "scaling_type": decision.scaler_class.scaling_type,
+                        "target_shard_count": decision.target_shard_count,
+                        "status": "QUOTA_LIMITED",
+                    }
+                )
+
+        if missing_shard_count:
+            decided_streams = {decision.stream.stream_name for decision in decisions}
+            allocated_decisions.extend(
+                KinesisFleetSweeper.get_trimming_decisions(
+                    [
+                        stream
+                        for stream in streams
+                        if stream.stream_name not in decided_streams
+                    ],
+                    usage_factors,
+                    starved_priority,
+                    missing_shard_count,
+                )
+            )
+
+        return allocated_decisions, report
+
+    @staticmethod
+    def get_trimming_decisions(
+        streams: List[SubscribedStream],
+        usage_factors: Dict[str, List[float]],
+        max_priority: int,
+        shard_count: int,
+    ) -> List[ScalingDecision]:
+        """
+        Decides which lower priority streams should be scaled down to free
+        shards for higher priority streams.
+        Streams are trimmed to their scale-down target regardless of the
+        scale-down threshold, so they stay within the hysteresis band.
+        The lowest priority and least used streams are trimmed first.
+        :param streams: the streams without a scaling decision
+        :param usage_factors: dict of stream name to its usage factor data
+            points, ordered from the newest to the oldest
+        :param max_priority: only streams below this priority are trimmed
+        :param shard_count: the number of shards to free
+        :return: the scale-down decisions of the trimmed streams
+        """
+        candidates = sorted(
+            (
+                stream
+                for stream in streams
+                if usage_factors[stream.stream_name]
+                and get_scaling_policy(stream.stream_name).priority < max_priority
+            ),
+            key=lambda stream: (
+                get_scaling_policy(stream.stream_name).priority,
+                max(usage_factors[stream.stream_name]),
+            ),
+        )
+        decisions = []
+        for stream in candidates:
+            if shard_count <= 0:
+                break
+
+            target_shard_count = KinesisFleetSweeper.get_scale_down_target_shard_count(
+                stream, usage_factors[stream.stream_name]
+            )
+            if target_shard_count < stream.alarm_shard_count:
+                logging.info(
+                    "Trimming stream to free shards for higher priority streams. "
+                    f"stream={stream.stream_name} "
+                    f"target_shard_count={target_shard_count}"
+                )
+                decisions.append(
+                    ScalingDecision(stream, KinesisDownscaler, target_shard_count)
+                )
+                shard_count -= stream.alarm_shard_count - target_shard_count
+
+        return decisions
+
+    @staticmethod
+    def apply_scaling_decision(decision: ScalingDecision) -> dict:
+        """
+        Applies a scaling decision of a single stream.
+        If the stream shard count changed since its alarms were last updated,
+        the alarms are synced instead.
+        :param decision: the stream scaling decision
+        :return: scaling report entry of the stream
+        """
+        stream = decision.stream
+        report_entry = {
+            "stream_name": stream.stream_name,
+            "scaling_type": decision.scaler_class.scaling_type,
+            "target_shard_count": decision.target_shard_count,
+        }
+        try:
+            with metrics_scope({"ScalingType": decision.scaler_class.scaling_type}):
+                set_property("StreamName", stream.stream_name)
+                KinesisFleetSweeper.apply_decision_scaling(decision, report_entry)
+        except Exception as exception:
+            logging.exception(
+                f"stream scaling process failed. stream={stream.stream_name}"
+            )
+            report_entry.update(status="FAILED", error=str(exception))
+
+        return report_entry
+
+    @staticmethod
+    def apply_decision_scaling(decision: ScalingDecision, report_entry: dict) -> None:
+        """
+        Scales a single stream according to its scaling decision.
+        :param decision: the stream scaling decision
+        :param report_entry: scaling report entry of the stream, updated in place
+        """
+        stream = decision.stream
+        scaler = decision.scaler_class(AlarmEvent.from_alarm(stream.scale_up_alarm))
+        scaler.stream_name = stream.stream_name
+        current_shard_count = scaler.get_current_shard_count()
+        if current_shard_count is None:
+            logging.info(
+                "Stream is not active or not provisioned. Scaling skipped. "
+                f"stream={stream.stream_name}"
+            )
+            report_entry["status"] = "SKIPPED"
+            return
+
+        if current_shard_count != stream.alarm_shard_count:
+            logging.info(
+                "Alarm shard count out of sync. Syncing alarms. "
+                f"stream={stream.stream_name}"
+            )
+            scaler.update_stream_alarms(current_shard_count)
+            report_entry["status"] = "SYNCED"
+            return
+
+        if scaler.is_in_cooldown():
+            logging.info(
+                "Stream was scaled recently. Scaling skipped. "
+                f"stream={stream.stream_name}"
+            )
+            report_entry["status"] = "COOLDOWN"
+            return
+
+        scaling_block_reason = scaler.get_scaling_block_reason()
+        if scaling_block_reason:
+            logging.info(
+                f"{scaling_block_reason}. Scaling skipped. stream={stream.stream_name}"
+            )
+            report_entry["status"] = "BLOCKED"
+            return
+
+        scaler.scale_to(current_shard_count, decision.target_shard_count)
+        report_entry["status"] = "SUCCEEDED"
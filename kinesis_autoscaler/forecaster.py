@@ -0,0 +1,231 @@
+"""
+Kinesis streams seasonal forecaster
+"""
+import logging
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from kinesis_autoscaler.aws_clients import get_client
+from kinesis_autoscaler.kinesis_upscaler import KinesisUpscaler
+from kinesis_autoscaler.kinesis_forecast_upscaler import KinesisForecastUpscaler
+from kinesis_autoscaler.scaling_policies import get_scaling_policy
+from kinesis_autoscaler.fleet_sweeper import (
+    MAX_METRIC_DATA_QUERIES,
+    KinesisFleetSweeper,
+    ScalingDecision,
+    SubscribedStream,
+)
+from kinesis_autoscaler.usage_metrics import (
+    METRIC_PERIOD_SECONDS,
+    USAGE_FACTOR_METRIC_ID,
+    build_usage_factor_queries,
+)
+from kinesis_autoscaler.usage_forecast import (
+    HOUR_SECONDS,
+    SeasonalProfile,
+    load_usage_forecasts,
+    save_usage_forecast,
+)
+from kinesis_autoscaler.constants import (
+    BATCH_MAX_WORKERS,
+    SCALE_UP_USAGE_THRESHOLD,
+    FORECAST_BOOTSTRAP_DAYS,
+    FORECAST_PRESCALE_LEAD_MINUTES,
+)
+
+MAX_METRIC_DATA_POINTS = 100800
+
+
+class KinesisForecaster:
+    """
+    Periodically refits the seasonal usage forecasts of all the subscribed
+    streams using bulk metric queries, and pre-scales the streams whose
+    forecast peak crosses the scale-up threshold within the lead time.
+    """
+
+    def __init__(self, max_workers: int = BATCH_MAX_WORKERS):
+        """
+        Initializes KinesisForecaster instance.
+        :param max_workers: max number of streams scaled concurrently
+        """
+        self.max_workers = max_workers
+
+    def forecast(self) -> List[dict]:
+        """
+        Refits the forecasts and pre-scales the streams that require it.
+        :return: scaling report containing an entry for each pre-scaled stream
+        """
+        streams = KinesisFleetSweeper.list_subscribed_streams()
+        current_timestamp = int(datetime.now(timezone.utc).timestamp())
+        profiles = load_usage_forecasts()
+        fitted_streams = self.fit_profiles(streams, profiles, current_timestamp)
+        for stream in fitted_streams:
+            save_usage_forecast(stream.stream_name, profiles[stream.stream_name])
+
+        decisions = [
+            decision
+            for decision in (
+                self.get_scaling_decision(
+                    stream, profiles.get(stream.stream_name), current_timestamp
+                )
+                for stream in streams
+            )
+            if decision
+        ]
+        logging.info(
+            "Forecaster evaluated streams. "
+            f"streams={len(streams)} fitted_streams={len(fitted_streams)} "
+            f"scaling_decisions={len(decisions)}"
+        )
+
+        report = []
+        if decisions:
+            workers = min(self.max_workers, len(decisions))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                report = list(
+                    executor.map(KinesisFleetSweeper.apply_scaling_decision, decisions)
+                )
+
+        return report
+
+    @staticmethod
+    def fit_profiles(
+        streams: List[SubscribedStream],
+        profiles: Dict[str, SeasonalProfile],
+        current_timestamp: int,
+    ) -> List[SubscribedStream]:
+        """
+        Fits the hours completed since each stream's profile was last fitted.
+        Profiles are fitted once an hour, and streams fitted until the same
+        hour are queried together.
+        New streams are bootstrapped with the last FORECAST_BOOTSTRAP_DAYS days.
+        :param streams: the subscribed streams
+        :param profiles: dict of stream name to its profile, updated in place
+        :param current_timestamp: current epoch timestamp
+        :return: the streams whose profiles were fitted
+        """
+        end_timestamp = current_timestamp - current_timestamp % HOUR_SECONDS
+        bootstrap_timestamp = end_timestamp - FORECAST_BOOTSTRAP_DAYS * 24 * 3600
+        streams_by_start: Dict[int, List[SubscribedStream]] = {}
+        for stream in streams:
+            profile = profiles.setdefault(stream.stream_name, SeasonalProfile.empty())
+            start_timestamp = max(profile.fitted_timestamp, bootstrap_timestamp)
+            if start_timestamp < end_timestamp:
+                streams_by_start.setdefault(start_timestamp, []).append(stream)
+
+        fitted_streams = []
+        for start_timestamp, start_streams in streams_by_start.items():
+            data_points = KinesisForecaster.get_used_shard_counts(
+                start_streams, start_timestamp, end_timestamp
+            )
+            for stream in start_streams:
+                profiles[stream.stream_name].fit(
+                    data_points[stream.stream_name], end_timestamp
+                )
+                fitted_streams.append(stream)
+
+        return fitted_streams
+
+    @staticmethod
+    def get_used_shard_counts(
+        streams: List[SubscribedStream], start_timestamp: int, end_timestamp: int
+    ) -> Dict[str, List[Tuple[int, float]]]:
+        """
+        Queries for the used shard count data points of streams in a time range
+        (5m aggregation), packing as many streams as the request's queries and
+        data points limits allow in each request.
+        :param streams: the streams to query
+        :param start_timestamp: time range start epoch timestamp
+        :param end_timestamp: time range end epoch timestamp
+        :return: dict of stream name to its (epoch timestamp, used shard count)
+            data points
+        """
+        stream_data_points = (end_timestamp - start_timestamp) // METRIC_PERIOD_SECONDS
+        streams_per_request = max(
+            min(
+                MAX_METRIC_DATA_QUERIES // len(build_usage_factor_queries("", 0)),
+                MAX_METRIC_DATA_POINTS // max(stream_data_points, 1),
+            ),
+            1,
+        )
+        used_shard_counts = {stream.stream_name: [] for stream in streams}
+
+        for chunk_start in range(0, len(streams), streams_per_request):
+            chunk_end = chunk_start + streams_per_request
+            chunk = streams[chunk_start:chunk_end]
+            queries = []
+            for index, stream in enumerate(chunk):
+                queries.extend(
+                    build_usage_factor_queries(
+                        stream.stream_name,
+                        stream.alarm_shard_count,
+                        id_prefix=f"s{index}",
+                    )
+                )
+
+            request = {
+                "StartTime": datetime.fromtimestamp(start_timestamp, timezone.utc),
+                "EndTime": datetime.fromtimestamp(end_timestamp, timezone.utc),
+                "MetricDataQueries": queries,
+            }
+            while True:
+                response = get_client("cloudwatch").get_metric_data(**request)
+                for result in response["MetricDataResults"]:
+                    stream = chunk[
+                        int(result["Id"][1:].removesuffix(USAGE_FACTOR_METRIC_ID))
+                    ]
+                    used_shard_counts[stream.stream_name].extend(
+                        (
+                            int(timestamp.timestamp()),
+                            usage_factor * stream.alarm_shard_count,
+                        )
+                        for timestamp, usage_factor in zip(
+                            result["Timestamps"], result["Values"]
+                        )
+                    )
+
+                if not response.get("NextToken"):
+                    break
+                request["NextToken"] = response["NextToken"]
+
+        return used_shard_counts
+
+    @staticmethod
+    def get_scaling_decision(
+        stream: SubscribedStream,
+        profile: Optional[SeasonalProfile],
+        current_timestamp: int,
+    ) -> Optional[ScalingDecision]:
+        """
+        Decides whether a stream should be pre-scaled, according to its
+        forecast peak within the lead time and the scale-up alarm threshold.
+        The stream is scaled straight to the shard count that brings its
+        forecast peak to the policy's target usage factor.
+        :param stream: the evaluated stream
+        :param profile: the stream seasonal profile
+        :param current_timestamp: current epoch timestamp
+        :return: the scaling decision, or None if the stream shouldn't be scaled
+        """
+        if profile is None:
+            return None
+
+        forecast_used_shard_count = profile.peak(
+            current_timestamp,
+            current_timestamp
+            + int(timedelta(minutes=FORECAST_PRESCALE_LEAD_MINUTES).total_seconds()),
+        )
+        if forecast_used_shard_count is None:
+            return None
+
+        shard_count = stream.alarm_shard_count
+        forecast_usage_factor = forecast_used_shard_count / shard_count
+        if forecast_usage_factor < SCALE_UP_USAGE_THRESHOLD:
+            return None
+
+        target_shard_count = KinesisUpscaler.calculate_target_shard_count(
+            shard_count, forecast_usage_factor, get_scaling_policy(stream.stream_name)
+        )
+        if target_shard_count == shard_count:
+            return None
+
+        return ScalingDecision(stream, KinesisForecastUpscaler, target_shard_count)
@@ -0,0 +1,44 @@
+"""
+Lambda invocation deadline, bounding the waits of the invocation
+"""
+import time
+from typing import Optional
+
+# each Lambda process serves a single invocation at a time,
+# so the deadline is shared by all the invocation threads
+_deadline: Optional[float] = None
+
+
+def set_invocation_deadline(context) -> None:
+    """
+    Sets the current invocation deadline from its Lambda context.
+    Contexts without the remaining time (e.g. local invocations) clear it.
+    :param context: the Lambda invocation context
+    """
+    global _deadline
+    get_remaining_time_in_millis = getattr(
+        context, "get_remaining_time_in_millis", None
+    )
+    _deadline = (
+        time.monotonic() + get_remaining_time_in_millis() / 1000
+        if get_remaining_time_in_millis
+        else None
+    )
+
+
+def get_remaining_seconds() -> Optional[float]:
+    """
+    Returns the time remaining until the current invocation times out.
+    :return: the remaining time in seconds, or None if there is no deadline
+    """
+    if _deadline is None:
+        return None
+    return _deadline - time.monotonic()
+
+
+def clear_invocation_deadline() -> None:
+    """
+    Clears the current invocation deadline.
+    """
+    global _deadline
+    _deadline = None
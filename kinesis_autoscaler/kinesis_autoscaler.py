@@ -1,15 +1,48 @@
 """
 Kinesis stream base autoscaler
 """
+import time
 import logging
+from typing import Optional, Tuple
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from abc import ABC, abstractmethod
-import boto3
-from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
-from kinesis_autoscaler.constants import REGION, LOGS_RETENTION_DAYS
+from kinesis_autoscaler.aws_clients import get_client
+from kinesis_autoscaler.alarm_event import AlarmEvent
+from kinesis_autoscaler.shard_resharder import KinesisShardResharder
+from kinesis_autoscaler.scaling_planner import KinesisScalingPlanner
+from kinesis_autoscaler.scaling_tracker import RESHARDING_IN_PROGRESS
+from kinesis_autoscaler.scaling_policies import get_scaling_policy
+from kinesis_autoscaler.shard_quota import (
+    reserve_shards,
+    commit_shards,
+    release_shards,
+)
+from kinesis_autoscaler.scaling_history import (
+    LatestScaling,
+    get_latest_scaling,
+    set_latest_scaling,
+)
+from kinesis_autoscaler.scaling_events import (
+    get_event_id,
+    claim_event,
+    release_event,
+)
+from kinesis_autoscaler.metrics_logger import (
+    metrics_scope,
+    put_metric,
+    set_property,
+    timer,
+)
+from kinesis_autoscaler.constants import (
+    LOGS_RETENTION_DAYS,
+    RESHARDING_STRATEGY,
+    UNIFORM_RESHARDING_STRATEGY,
+    TARGETED_RESHARDING_STRATEGY,
+)
 
-CW_CLIENT = boto3.client("cloudwatch", region_name=REGION)
-KINESIS_CLIENT = boto3.client("kinesis", region_name=REGION)
+ON_DEMAND_STREAM_MODE = "ON_DEMAND"
 
 
 class KinesisAutoscaler(ABC):
@@ -17,29 +50,92 @@ class KinesisAutoscaler(ABC):
     Kinesis stream base autoscaler
     """
 
-    def __init__(self, event_message: dict):
+    def __init__(self, alarm_event: AlarmEvent):
         """
         Initializes base KinesisAutoscaler instance.
-        :param event_message: triggering alarm event
+        :param alarm_event: triggering alarm event
         """
         self.stream_name = None
-        self.event_message = event_message
+        self.alarm_event = alarm_event
+        self.stream_resharded = False
+        self.resharding_strategy = UNIFORM_RESHARDING_STRATEGY
 
     def scale(self) -> None:
         """
         Scales Kinesis stream according to the triggered alarm.
+        Each alarm event is processed once, duplicate deliveries of the same
+        alarm state change are skipped.
         """
-        self.stream_name = self.parse_stream_name()
-        logging.info(f"Started stream scaling process. stream={self.stream_name}")
+        with metrics_scope({"ScalingType": self.scaling_type}):
+            with timer("Parse"):
+                self.stream_name = self.parse_stream_name()
+                alarm_shard_count = self.parse_alarm_shard_count()
+            set_property("StreamName", self.stream_name)
+            logging.info(f"Started stream scaling process. stream={self.stream_name}")
 
-        alarm_shard_count = self.parse_alarm_shard_count()
-        current_shard_count = self.get_current_shard_count()
+            event_id = get_event_id(self.alarm_event)
+            if event_id:
+                with timer("Claim"):
+                    claimed = claim_event(event_id, self.stream_name, self.scaling_type)
+                if not claimed:
+                    put_metric("DuplicateEvents", 1, "Count")
+                    logging.info(
+                        "Alarm event already processed. Autoscaling canceled. "
+                        f"stream={self.stream_name} event_id={event_id}"
+                    )
+                    return
+
+            try:
+                self.scale_stream(alarm_shard_count)
+            except Exception:
+                # a failed event can be processed by its redelivery,
+                # unless the stream was already resharded
+                if event_id and not self.stream_resharded:
+                    release_event(event_id)
+                raise
+
+    def scale_stream(self, alarm_shard_count: int) -> None:
+        """
+        Scales the stream according to its current and target shard counts.
+        :param alarm_shard_count: the shard count the triggered alarm is based on
+        """
+        with timer("Describe"):
+            current_shard_count = self.get_current_shard_count()
+        if current_shard_count is None:
+            logging.info(
+                "Stream is not active or not provisioned. Autoscaling canceled. "
+                f"stream={self.stream_name}"
+            )
+            return
+
+        put_metric("CurrentShardCount", current_shard_count, "Count")
         if alarm_shard_count != current_shard_count:
             logging.info("Alarm shard count out of sync. Syncing alarms")
-            self.update_stream_alarms(current_shard_count)
+            with timer("AlarmSync"):
+                self.update_stream_alarms(current_shard_count)
+            return
+
+        with timer("Cooldown"):
+            in_cooldown = self.is_in_cooldown()
+        if in_cooldown:
+            put_metric("Cooldowns", 1, "Count")
+            logging.info(
+                "Stream was scaled recently. Autoscaling canceled. "
+                f"stream={self.stream_name}"
+            )
             return
 
-        target_shard_count = self.get_target_shard_count(current_shard_count)
+        scaling_block_reason = self.get_scaling_block_reason()
+        if scaling_block_reason:
+            put_metric("BlockedScalings", 1, "Count")
+            logging.info(
+                f"{scaling_block_reason}. Autoscaling canceled. "
+                f"stream={self.stream_name}"
+            )
+            return
+
+        with timer("TargetComputation"):
+            target_shard_count = self.get_target_shard_count(current_shard_count)
         if current_shard_count == target_shard_count:
             logging.info(
                 "Current and target shard counts are equal. Autoscaling canceled. "
@@ -47,54 +143,177 @@ class KinesisAutoscaler(ABC):
             )
             return
 
-        self.update_shard_count(target_shard_count)
-        self.update_stream_alarms(target_shard_count)
-        self.write_scaling_log_to_db(current_shard_count, target_shard_count)
+        self.scale_to(current_shard_count, target_shard_count)
+
+    def scale_to(self, current_shard_count: int, target_shard_count: int) -> None:
+        """
+        Scales the stream towards the target shard count, syncs its alarms
+        and writes the scaling log.
+        Targets that can't be reached in a single operation are reached
+        by the following scaling operations.
+        :param current_shard_count: the stream's current shard count
+        :param target_shard_count: the shard count the stream should scale to
+        """
+        with timer("Planning"):
+            target_shard_count = KinesisScalingPlanner(
+                self.stream_name
+            ).get_next_target_shard_count(current_shard_count, target_shard_count)
+        if target_shard_count == current_shard_count:
+            logging.info(
+                "No scaling operations allowed by the daily limit. "
+                f"Autoscaling canceled. stream={self.stream_name}"
+            )
+            return
+
+        reserved_shard_count = 0
+        if target_shard_count > current_shard_count:
+            with timer("Quota"):
+                target_shard_count = self.reserve_shard_quota(
+                    current_shard_count, target_shard_count
+                )
+            if target_shard_count == current_shard_count:
+                logging.info(
+                    "Account shard limit reached. Autoscaling canceled. "
+                    f"stream={self.stream_name}"
+                )
+                return
+            reserved_shard_count = target_shard_count - current_shard_count
+
+        try:
+            with timer("Update"):
+                resharded_shard_count = self.reshard_stream(
+                    current_shard_count, target_shard_count
+                )
+        except Exception:
+            release_shards(reserved_shard_count)
+            raise
+        # targeted resharding may add fewer shards than reserved
+        added_shard_count = min(
+            max(resharded_shard_count - current_shard_count, 0), reserved_shard_count
+        )
+        commit_shards(added_shard_count)
+        release_shards(reserved_shard_count - added_shard_count)
+        target_shard_count = resharded_shard_count
+        self.stream_resharded = True
+        put_metric("TargetShardCount", target_shard_count, "Count")
+        with timer("AlarmSync"):
+            self.update_stream_alarms(target_shard_count)
+        with timer("DbWrite"):
+            self.write_scaling_log_to_db(current_shard_count, target_shard_count)
         logging.info(
             f"Scaling process finished successfully. stream={self.stream_name}"
         )
 
+    def reserve_shard_quota(
+        self, current_shard_count: int, target_shard_count: int
+    ) -> int:
+        """
+        Reserves the shards a scale-up adds from the account shard headroom,
+        limiting the scale-up to the headroom left by the other streams.
+        :param current_shard_count: the stream's current shard count
+        :param target_shard_count: the shard count the stream should scale to
+        :return: the target shard count within the account shard headroom
+        """
+        shard_count = target_shard_count - current_shard_count
+        reserved_shard_count = reserve_shards(shard_count, self.is_critical())
+        if reserved_shard_count < shard_count:
+            put_metric(
+                "QuotaLimitedShards", shard_count - reserved_shard_count, "Count"
+            )
+            logging.info(
+                "Scale-up limited by the account shard limit. "
+                f"stream={self.stream_name} requested={shard_count} "
+                f"reserved={reserved_shard_count}"
+            )
+        return current_shard_count + reserved_shard_count
+
+    def is_critical(self) -> bool:
+        """
+        Checks whether the stream's scale-ups can use the critical shard reserve.
+        :return: True if the stream has the critical priority
+        """
+        return get_scaling_policy(self.stream_name).is_critical()
+
     def parse_stream_name(self) -> str:
         """
-        Parses the stream name from the required metric definitions of the alarm.
+        Returns the stream name parsed from the metric definitions of the alarm.
         :return: name of the stream to scale
         """
-        alarm_metrics = self.event_message["Trigger"]["Metrics"]
-        for metric in alarm_metrics:
-            if metric["Id"] in ("incomingBytes", "incomingRecords"):
-                return metric["MetricStat"]["Metric"]["Dimensions"][0]["value"]
-
-        raise ValueError("Could not parse stream name from alarm metrics")
+        return self.alarm_event.stream_name
 
     def parse_alarm_shard_count(self) -> int:
         """
-        Parses the alarm shard count from the required math definition of the alarm.
+        Returns the alarm shard count parsed from the required math definition
+        of the alarm.
         :return: stream's current shard count
         """
-        alarm_metrics = self.event_message["Trigger"]["Metrics"]
-        for metric in alarm_metrics:
-            if metric["Id"] == "shardCount":
-                return int(metric["Expression"])
+        if self.alarm_event.shard_count is None:
+            raise ValueError("Could not parse current shard count from alarm metrics")
+        return self.alarm_event.shard_count
 
-        raise ValueError("Could not parse current shard count from alarm metrics")
+    def is_in_cooldown(self) -> bool:
+        """
+        Checks whether the stream's latest scaling operation is recent enough
+        to prevent the current scaling operation.
+        Only scaling operations of the cooldown scaling types are considered,
+        so a scale-up isn't delayed by a previous scale-down.
+        :return: True if the stream shouldn't be scaled yet
+        """
+        latest_scaling = get_latest_scaling(self.stream_name)
+        if (
+            latest_scaling is None
+            or latest_scaling.scaling_type not in self.cooldown_scaling_types
+        ):
+            return False
+
+        now = datetime.utcnow().replace(tzinfo=timezone.utc)
+        return now - latest_scaling.scaling_datetime < self.cooldown_period
+
+    def get_scaling_block_reason(self) -> Optional[str]:
+        """
+        Checks whether the stream's current state prevents the scaling operation,
+        regardless of its target shard count.
+        :return: the reason the stream shouldn't be scaled, or None if it can be
+        """
+        return None
 
-    def get_current_shard_count(self) -> int:
+    def get_current_shard_count(self) -> Optional[int]:
         """
         Queries and returns the current open shard count of the stream.
-        :return: stream's open shard count
+        The open shard count of a stream that isn't ACTIVE (e.g. during
+        resharding) doesn't reflect its final shard count, so it isn't returned.
+        The shards of on-demand streams are managed by Kinesis, so they aren't
+        scaled either.
+        :return: stream's open shard count, or None if the stream isn't ACTIVE
+            or isn't in provisioned capacity mode
         """
-        response = KINESIS_CLIENT.describe_stream_summary(StreamName=self.stream_name)
-        return response["StreamDescriptionSummary"]["OpenShardCount"]
+        response = get_client("kinesis").describe_stream_summary(
+            StreamName=self.stream_name
+        )
+        stream_summary = response["StreamDescriptionSummary"]
+        if stream_summary["StreamStatus"] != "ACTIVE":
+            return None
+        stream_mode = stream_summary.get("StreamModeDetails", {}).get("StreamMode")
+        if stream_mode == ON_DEMAND_STREAM_MODE:
+            return None
+
+        return stream_summary["OpenShardCount"]
 
     def update_stream_alarms(self, target_shard_count: int) -> None:
         """
         Updates the scaled stream alarms (scale-up and scale-down).
         Required after each scaling operation in order to sync the alarms
         thresholds, which are based on the current shard count of the stream.
+        Alarms that are already in sync are skipped, and the rest are
+        updated concurrently.
         :param target_shard_count: the stream target shard count after the scale
         """
+        describe_start_time = time.perf_counter()
         alarm_names = self.get_alarm_names()
-        response = CW_CLIENT.describe_alarms(AlarmNames=list(alarm_names.values()))
+        response = get_client("cloudwatch").describe_alarms(
+            AlarmNames=list(alarm_names.values())
+        )
+        describe_duration = time.perf_counter() - describe_start_time
 
         if len(response["MetricAlarms"]) != 2:
             alarm_names = [alarm["AlarmName"] for alarm in response["MetricAlarms"]]
@@ -103,9 +322,73 @@ class KinesisAutoscaler(ABC):
                 f"Found {len(alarm_names)} alarms. alarm_names={alarm_names}"
             )
 
-        for alarm in response["MetricAlarms"]:
-            self.update_existing_alarm(alarm, target_shard_count)
-            self.reset_alarm_state(alarm["AlarmName"])
+        update_start_time = time.perf_counter()
+        outdated_alarms = [
+            alarm
+            for alarm in response["MetricAlarms"]
+            if not self.is_alarm_in_sync(alarm, target_shard_count)
+        ]
+        if outdated_alarms:
+            # each alarm is synced in a copy of the current context,
+            # so its AWS calls are recorded in the current metrics scope
+            alarm_contexts = [(copy_context(), alarm) for alarm in outdated_alarms]
+            with ThreadPoolExecutor(max_workers=len(outdated_alarms)) as executor:
+                list(
+                    executor.map(
+                        lambda item: item[0].run(
+                            self.sync_alarm, item[1], target_shard_count
+                        ),
+                        alarm_contexts,
+                    )
+                )
+        update_duration = time.perf_counter() - update_start_time
+
+        logging.info(
+            f"Synced stream alarms. stream={self.stream_name} "
+            f"updated={len(outdated_alarms)} "
+            f"skipped={len(response['MetricAlarms']) - len(outdated_alarms)} "
+            f"describe_ms={describe_duration * 1000:.1f} "
+            f"update_ms={update_duration * 1000:.1f}"
+        )
+
+    def sync_alarm(self, alarm: dict, target_shard_count: int) -> None:
+        """
+        Updates a stream alarm with the new shard count and resets its state.
+        :param alarm: stream alarm configuration
+        :param target_shard_count: the stream target shard count after the scale
+        """
+        self.update_existing_alarm(alarm, target_shard_count)
+        self.reset_alarm_state(alarm["AlarmName"])
+
+    @classmethod
+    def is_alarm_in_sync(cls, alarm: dict, target_shard_count: int) -> bool:
+        """
+        Checks whether a stream alarm is already updated with the shard count.
+        :param alarm: stream alarm configuration as returned from describe operation
+        :param target_shard_count: the stream target shard count after the scale
+        :return: True if the alarm doesn't require an update
+        """
+        if alarm.get("ActionsEnabled") != cls.should_enable_alarm_actions(
+            alarm["AlarmName"], target_shard_count
+        ):
+            return False
+
+        return any(
+            metric["Id"] == "shardCount"
+            and metric.get("Expression") == str(target_shard_count)
+            for metric in alarm["Metrics"]
+        )
+
+    @staticmethod
+    def should_enable_alarm_actions(alarm_name: str, target_shard_count: int) -> bool:
+        """
+        Checks whether a stream alarm actions should be enabled.
+        Scale-down alarm actions are disabled for streams with a single shard.
+        :param alarm_name: name of the stream alarm
+        :param target_shard_count: the stream target shard count after the scale
+        :return: True if the alarm actions should be enabled
+        """
+        return not ("scale-down" in alarm_name and target_shard_count == 1)
 
     def get_alarm_names(self) -> dict:
         """
@@ -114,21 +397,7 @@ class KinesisAutoscaler(ABC):
         (scale-up/scale-down) in their name.
         :return: dict containing the stream alarm names
         """
-        triggered_alarm_name = self.event_message["AlarmName"]
-        if "scale-up" in triggered_alarm_name:
-            return {
-                "scale_up": triggered_alarm_name,
-                "scale_down": triggered_alarm_name.replace("scale-up", "scale-down"),
-            }
-        elif "scale-down" in triggered_alarm_name:
-            return {
-                "scale_up": triggered_alarm_name.replace("scale-down", "scale-up"),
-                "scale_down": triggered_alarm_name,
-            }
-
-        raise ValueError(
-            "Triggered alarm should contain scale-up/scale-down in its name"
-        )
+        return self.alarm_event.alarm_names
 
     def update_existing_alarm(self, alarm: dict, target_shard_count: int) -> None:
         """
@@ -139,16 +408,15 @@ class KinesisAutoscaler(ABC):
         """
         updated_alarm = self.copy_updateable_alarm_fields(alarm)
 
-        should_disable_alarm = (
-            "scale-down" in updated_alarm["AlarmName"] and target_shard_count == 1
+        updated_alarm["ActionsEnabled"] = self.should_enable_alarm_actions(
+            updated_alarm["AlarmName"], target_shard_count
         )
-        updated_alarm["ActionsEnabled"] = not should_disable_alarm
 
         for metric in updated_alarm["Metrics"]:
             if metric["Id"] == "shardCount":
                 metric["Expression"] = str(target_shard_count)
 
-        CW_CLIENT.put_metric_alarm(**updated_alarm)
+        get_client("cloudwatch").put_metric_alarm(**updated_alarm)
         logging.info(f"Updated stream alarm. alarm={alarm['AlarmName']}")
 
     @staticmethod
@@ -192,7 +460,7 @@ class KinesisAutoscaler(ABC):
         twice without state change.
         :param alarm_name: name of the alarm to reset its state
         """
-        CW_CLIENT.set_alarm_state(
+        get_client("cloudwatch").set_alarm_state(
             AlarmName=alarm_name,
             StateValue="INSUFFICIENT_DATA",
             StateReason="Shard count metric updated",
@@ -207,12 +475,32 @@ class KinesisAutoscaler(ABC):
         """
         pass
 
+    def reshard_stream(self, current_shard_count: int, target_shard_count: int) -> int:
+        """
+        Reshards the stream according to the configured resharding strategy.
+        The TARGETED strategy splits/merges only the hot/cold shards when the
+        stream load is skewed, and falls back to uniform scaling otherwise.
+        :param current_shard_count: the stream's current shard count
+        :param target_shard_count: the shard count the stream should scale to
+        :return: the stream shard count after resharding
+        """
+        if RESHARDING_STRATEGY == TARGETED_RESHARDING_STRATEGY:
+            resharded_shard_count = KinesisShardResharder(self.stream_name).reshard(
+                current_shard_count, target_shard_count
+            )
+            if resharded_shard_count is not None:
+                self.resharding_strategy = TARGETED_RESHARDING_STRATEGY
+                return resharded_shard_count
+
+        self.update_shard_count(target_shard_count)
+        return target_shard_count
+
     def update_shard_count(self, target_shard_count: int) -> None:
         """
         Updates the stream shard count using the UpdateShardCount API.
         :param target_shard_count: the shard count the stream should scale to
         """
-        response = KINESIS_CLIENT.update_shard_count(
+        response = get_client("kinesis", mutating=True).update_shard_count(
             StreamName=self.stream_name,
             TargetShardCount=target_shard_count,
             ScalingType="UNIFORM_SCALING",
@@ -231,14 +519,24 @@ class KinesisAutoscaler(ABC):
         :param current_shard_count: the stream current shard count
         :param target_shard_count: the stream target shard count after the scale
         """
+        # imported on first use, keeping pynamodb out of the cold start path
+        from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+
+        scaling_datetime = datetime.utcnow().replace(tzinfo=timezone.utc)
         KinesisAutoscalerLog(
             stream_name=self.stream_name,
-            scaling_datetime=datetime.utcnow().replace(tzinfo=timezone.utc),
+            scaling_datetime=scaling_datetime,
             shard_count=current_shard_count,
             target_shard_count=target_shard_count,
             scaling_type=self.scaling_type,
             expiration_datetime=timedelta(days=LOGS_RETENTION_DAYS),
+            resharding_status=RESHARDING_IN_PROGRESS,
+            resharding_strategy=self.resharding_strategy,
         ).save()
+        set_latest_scaling(
+            self.stream_name,
+            LatestScaling(scaling_datetime, self.scaling_type, target_shard_count),
+        )
 
     @property
     @abstractmethod
@@ -248,3 +546,20 @@ class KinesisAutoscaler(ABC):
         Used for writing the scaling type in the DB logs.
         """
         pass
+
+    @property
+    @abstractmethod
+    def cooldown_period(self) -> timedelta:
+        """
+        The min time since the latest scaling operation of the cooldown
+        scaling types before scaling again.
+        """
+        pass
+
+    @property
+    @abstractmethod
+    def cooldown_scaling_types(self) -> Tuple[str, ...]:
+        """
+        The scaling types of the operations which start a cooldown period.
+        """
+        pass
@@ -2,8 +2,27 @@
 Kinesis stream downscaler
 """
 import math
+from typing import Optional
 from datetime import datetime, timedelta
-from kinesis_autoscaler.kinesis_autoscaler import KinesisAutoscaler, CW_CLIENT
+from kinesis_autoscaler.alarm_event import SCALE_DOWN_ALARM_TYPE
+from kinesis_autoscaler.kinesis_autoscaler import KinesisAutoscaler
+from kinesis_autoscaler.usage_history import get_used_shard_count
+from kinesis_autoscaler.usage_forecast import get_forecast_used_shard_count
+from kinesis_autoscaler.usage_metrics import get_max_iterator_age
+from kinesis_autoscaler.metrics_logger import put_metric
+from kinesis_autoscaler.scaling_policies import (
+    DEFAULT_SCALING_POLICY,
+    ScalingPolicy,
+    get_scaling_policy,
+)
+from kinesis_autoscaler.constants import (
+    SCALE_UP_USAGE_THRESHOLD,
+    SCALE_DOWN_COOLDOWN_MINUTES,
+    SCALING_HYSTERESIS_MARGIN,
+    SCALE_DOWN_MAX_ITERATOR_AGE_MS,
+    ITERATOR_AGE_LOOKBACK_MINUTES,
+    FORECAST_HOLD_OFF_MINUTES,
+)
 
 
 class KinesisDownscaler(KinesisAutoscaler):
@@ -12,97 +31,117 @@ class KinesisDownscaler(KinesisAutoscaler):
     """
 
     scaling_type = "SCALE_DOWN"
+    alarm_type = SCALE_DOWN_ALARM_TYPE
+    cooldown_period = timedelta(minutes=SCALE_DOWN_COOLDOWN_MINUTES)
+    # a capacity mode switch back to provisioned changes the stream capacity
+    # as well, so the stream isn't scaled down right after it
+    cooldown_scaling_types = (
+        "SCALE_UP",
+        "SCALE_DOWN",
+        "EMERGENCY_SCALE_UP",
+        "FORECAST_SCALE_UP",
+        "CAPACITY_MODE_SWITCH",
+    )
+
+    def get_scaling_block_reason(self) -> Optional[str]:
+        """
+        Blocks the scale-down while the stream's consumers are falling behind,
+        as reducing the stream's read throughput would starve them further.
+        :return: the reason the stream shouldn't be scaled, or None if it can be
+        """
+        current_datetime = datetime.now()
+        max_iterator_age = get_max_iterator_age(
+            self.stream_name,
+            current_datetime - timedelta(minutes=ITERATOR_AGE_LOOKBACK_MINUTES),
+            current_datetime,
+        )
+        if max_iterator_age is None:
+            return None
+
+        put_metric("MaxIteratorAge", max_iterator_age, "Milliseconds")
+        if max_iterator_age > SCALE_DOWN_MAX_ITERATOR_AGE_MS:
+            return f"Stream consumers are behind. iterator_age_ms={max_iterator_age}"
+        return None
 
     def get_target_shard_count(self, current_shard_count: int) -> int:
         """
         Calculates the scale-down operation target shard count.
-        This is done by quering for the max usage factor and calculating
-        the shard count that will result in a usage factor of 50% at the end
-        of the scaling operation.
+        This is done by quering for the max usage factor (or the usage factor
+        percentile set by the stream's policy) and calculating the shard count
+        that will result in the policy's target usage factor (50% by default)
+        at the end of the scaling operation.
+        The stream's forecast peak in the next hour is included, so the stream
+        isn't scaled down right before a forecast peak.
         :param current_shard_count: the current shard count of the stream
         :return: the shard count the stream should scale to
         """
-        max_usage_factor = self.get_max_usage_factor(current_shard_count)
-        used_shard_count = current_shard_count * max_usage_factor
-        target_shard_count = math.ceil(used_shard_count * 2)
-        min_possible_shard_count = math.ceil(current_shard_count / 2)
-        return max(min_possible_shard_count, target_shard_count)
+        policy = get_scaling_policy(self.stream_name)
+        max_usage_factor = self.get_max_usage_factor(current_shard_count, policy)
+        put_metric("MaxUsageFactor", max_usage_factor)
+        forecast_used_shard_count = get_forecast_used_shard_count(
+            self.stream_name, timedelta(minutes=FORECAST_HOLD_OFF_MINUTES)
+        )
+        if forecast_used_shard_count is not None:
+            put_metric("ForecastUsedShardCount", forecast_used_shard_count)
+        return self.calculate_target_shard_count(
+            current_shard_count, max_usage_factor, policy, forecast_used_shard_count
+        )
 
-    def get_max_usage_factor(self, current_shard_count: int) -> float:
+    @staticmethod
+    def calculate_target_shard_count(
+        current_shard_count: int,
+        max_usage_factor: float,
+        policy: ScalingPolicy = DEFAULT_SCALING_POLICY,
+        forecast_used_shard_count: Optional[float] = None,
+    ) -> int:
         """
-        Queries for the stream max usage factor in the last 24 hours
-        (5m aggregation) and returns the max data point value.
+        Calculates the shard count that will result in the policy's target
+        usage factor.
+        The target is bounded by the hysteresis band, keeping the projected
+        max usage factor below the scale-up threshold minus a margin, and by
+        the policy's min shard count, and never exceeds the current shard count.
+        The max shard count reduction of a single scaling operation is applied
+        by the scaling planner.
         :param current_shard_count: the current shard count of the stream
-        :return: the maximum usage factor of the stream
+        :param max_usage_factor: the maximum usage factor of the stream
+        :param policy: the stream scaling policy
+        :param forecast_used_shard_count: the stream's forecast peak used shard
+            count, projected the same way as its max usage
+        :return: the shard count the stream should scale to
         """
-        current_datetime = datetime.now()
+        used_shard_count = max(
+            current_shard_count * max_usage_factor, forecast_used_shard_count or 0
+        )
+        hysteresis_shard_count = math.ceil(
+            used_shard_count / (SCALE_UP_USAGE_THRESHOLD - SCALING_HYSTERESIS_MARGIN)
+        )
+        target_shard_count = max(
+            math.ceil(used_shard_count / policy.target_usage_factor),
+            hysteresis_shard_count,
+        )
+        return min(policy.clamp(target_shard_count), current_shard_count)
 
-        response = CW_CLIENT.get_metric_data(
-            StartTime=current_datetime - timedelta(days=1),
-            EndTime=current_datetime,
-            MetricDataQueries=[
-                {
-                    "Id": "shardCount",
-                    "Expression": str(current_shard_count),
-                    "ReturnData": False,
-                },
-                {
-                    "Id": "incomingBytes",
-                    "MetricStat": {
-                        "Metric": {
-                            "Namespace": "AWS/Kinesis",
-                            "MetricName": "IncomingBytes",
-                            "Dimensions": [
-                                {"Name": "StreamName", "Value": self.stream_name},
-                            ],
-                        },
-                        "Period": 300,
-                        "Stat": "Sum",
-                    },
-                    "ReturnData": False,
-                },
-                {
-                    "Id": "incomingRecords",
-                    "MetricStat": {
-                        "Metric": {
-                            "Namespace": "AWS/Kinesis",
-                            "MetricName": "IncomingRecords",
-                            "Dimensions": [
-                                {"Name": "StreamName", "Value": self.stream_name},
-                            ],
-                        },
-                        "Period": 300,
-                        "Stat": "Sum",
-                    },
-                    "ReturnData": False,
-                },
-                {
-                    "Id": "incomingBytesFilledWithZeroForMissingDataPoints",
-                    "Expression": "FILL(incomingBytes,0)",
-                    "ReturnData": False,
-                },
-                {
-                    "Id": "incomingRecordsFilledWithZeroForMissingDataPoints",
-                    "Expression": "FILL(incomingRecords,0)",
-                    "ReturnData": False,
-                },
-                {
-                    "Id": "incomingBytesUsageFactor",
-                    "Expression": "incomingBytesFilledWithZeroForMissingDataPoints/(1024*1024*60*5*shardCount)",  # noqa: E501
-                    "ReturnData": False,
-                },
-                {
-                    "Id": "incomingRecordsUsageFactor",
-                    "Expression": "incomingRecordsFilledWithZeroForMissingDataPoints/(1000*60*5*shardCount)",  # noqa: E501
-                    "ReturnData": False,
-                },
-                {
-                    "Id": "maxIncomingUsageFactor",
-                    "Expression": "MAX([incomingBytesUsageFactor,incomingRecordsUsageFactor])",  # noqa: E501
-                    "ReturnData": True,
-                },
-            ],
+    def get_max_usage_factor(
+        self, current_shard_count: int, policy: ScalingPolicy = DEFAULT_SCALING_POLICY
+    ) -> float:
+        """
+        Returns the stream max usage factor in the policy's lookback window
+        (24 hours by default, 5m aggregation), or the policy's usage percentile.
+        The usage history is updated incrementally, so only the data points
+        since the previous scale-down evaluation are queried.
+        :param current_shard_count: the current shard count of the stream
+        :param policy: the stream scaling policy
+        :return: the maximum usage factor of the stream
+        """
+        max_used_shard_count = get_used_shard_count(
+            self.stream_name,
+            current_shard_count,
+            window=timedelta(hours=policy.usage_window_hours),
+            percentile=policy.usage_percentile,
         )
+        if max_used_shard_count is None:
+            raise ValueError(
+                f"Could not find stream usage data points. stream={self.stream_name}"
+            )
 
-        max_usage_factor = max(response["MetricDataResults"][0]["Values"])
-        return max_usage_factor
+        return max_used_shard_count / current_shard_count
@@ -0,0 +1,150 @@
+"""
+Kinesis stream emergency upscaler
+"""
+import logging
+from typing import Optional
+from datetime import timedelta
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor
+from kinesis_autoscaler.alarm_event import EMERGENCY_SCALE_UP_ALARM_TYPE
+from kinesis_autoscaler.kinesis_upscaler import KinesisUpscaler
+from kinesis_autoscaler.scaling_planner import KinesisScalingPlanner
+from kinesis_autoscaler.scaling_policies import get_scaling_policy
+from kinesis_autoscaler.shard_quota import commit_shards, release_shards
+from kinesis_autoscaler.metrics_logger import put_metric, timer
+from kinesis_autoscaler.constants import (
+    MAX_SCALE_UP_FACTOR,
+    EMERGENCY_SCALE_UP_COOLDOWN_MINUTES,
+)
+
+
+class KinesisEmergencyUpscaler(KinesisUpscaler):
+    """
+    Kinesis stream emergency upscaler.
+    Triggered by write throttling (WriteProvisionedThroughputExceeded) alarms,
+    and doubles the stream shard count in a single step without waiting for
+    the usage factor alarm.
+    """
+
+    scaling_type = "EMERGENCY_SCALE_UP"
+    alarm_type = EMERGENCY_SCALE_UP_ALARM_TYPE
+    cooldown_period = timedelta(minutes=EMERGENCY_SCALE_UP_COOLDOWN_MINUTES)
+
+    def scale_stream(self, alarm_shard_count: Optional[int]) -> None:
+        """
+        Scales up the throttled stream as fast as possible.
+        Only the stream summary, the short emergency cooldown and the daily
+        operations budget are checked before updating the shard count,
+        and the stream alarms are synced after the update.
+        :param alarm_shard_count: unused, throttling alarms aren't based
+            on the shard count
+        """
+        with timer("Cooldown"):
+            in_cooldown = self.is_in_cooldown()
+        if in_cooldown:
+            put_metric("Cooldowns", 1, "Count")
+            logging.info(
+                "Stream was scaled up recently. Autoscaling canceled. "
+                f"stream={self.stream_name}"
+            )
+            return
+
+        with timer("Describe"):
+            current_shard_count = self.get_current_shard_count()
+        if current_shard_count is None:
+            logging.info(
+                "Stream is not active or not provisioned. Autoscaling canceled. "
+                f"stream={self.stream_name}"
+            )
+            return
+
+        put_metric("CurrentShardCount", current_shard_count, "Count")
+        target_shard_count = get_scaling_policy(self.stream_name).clamp(
+            current_shard_count * MAX_SCALE_UP_FACTOR
+        )
+        if target_shard_count <= current_shard_count:
+            logging.info(
+                "Stream reached its max shard count. Autoscaling canceled. "
+                f"stream={self.stream_name} shard_count={current_shard_count}"
+            )
+            return
+
+        with timer("Planning"):
+            target_shard_count = KinesisScalingPlanner(
+                self.stream_name
+            ).get_next_target_shard_count(current_shard_count, target_shard_count)
+        if target_shard_count == current_shard_count:
+            logging.info(
+                "No scaling operations allowed by the daily limit. "
+                f"Autoscaling canceled. stream={self.stream_name}"
+            )
+            return
+
+        with timer("Quota"):
+            reserved_target_shard_count = self.reserve_shard_quota(
+                current_shard_count, target_shard_count
+            )
+        if reserved_target_shard_count == current_shard_count:
+            logging.info(
+                "Account shard limit reached. Autoscaling canceled. "
+                f"stream={self.stream_name}"
+            )
+            return
+        target_shard_count = reserved_target_shard_count
+
+        try:
+            with timer("Update"):
+                self.update_shard_count(target_shard_count)
+        except Exception:
+            release_shards(target_shard_count - current_shard_count)
+            raise
+        commit_shards(target_shard_count - current_shard_count)
+        self.stream_resharded = True
+        put_metric("TargetShardCount", target_shard_count, "Count")
+
+        # the stream capacity is already increasing, so the alarms sync
+        # and the scaling log write run concurrently after the update.
+        # the emergency alarm is reset as well, so it triggers again if the
+        # stream is still throttled after the scale-up
+        with timer("PostUpdate"):
+            with ThreadPoolExecutor(max_workers=3) as executor:
+                futures = [
+                    executor.submit(
+                        copy_context().run,
+                        self.update_stream_alarms,
+                        target_shard_count,
+                    ),
+                    executor.submit(
+                        copy_context().run,
+                        self.reset_alarm_state,
+                        self.alarm_event.alarm_name,
+                    ),
+                    executor.submit(
+                        copy_context().run,
+                        self.write_scaling_log_to_db,
+                        current_shard_count,
+                        target_shard_count,
+                    ),
+                ]
+                for future in futures:
+                    future.result()
+
+        logging.info(
+            "Emergency scaling process finished successfully. "
+            f"stream={self.stream_name}"
+        )
+
+    def is_critical(self) -> bool:
+        """
+        The throttled stream already rejects records, so its scale-up can use
+        the critical shard reserve regardless of its priority.
+        :return: True
+        """
+        return True
+
+    def parse_alarm_shard_count(self) -> Optional[int]:
+        """
+        Throttling alarms aren't based on the shard count.
+        :return: None
+        """
+        return None
@@ -0,0 +1,15 @@
+"""
+Kinesis stream forecast upscaler
+"""
+from kinesis_autoscaler.kinesis_upscaler import KinesisUpscaler
+
+
+class KinesisForecastUpscaler(KinesisUpscaler):
+    """
+    Kinesis stream forecast upscaler.
+    Pre-scales streams ahead of their forecast usage peaks (see
+    KinesisForecaster), and shares the scale-up cooldown with the alarm
+    triggered upscalers.
+    """
+
+    scaling_type = "FORECAST_SCALE_UP"
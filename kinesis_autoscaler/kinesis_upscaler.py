@@ -2,7 +2,25 @@
 Kinesis stream upscaler
 """
 import math
+from typing import Optional
+from datetime import datetime, timedelta
+from kinesis_autoscaler.alarm_event import SCALE_UP_ALARM_TYPE
 from kinesis_autoscaler.kinesis_autoscaler import KinesisAutoscaler
+from kinesis_autoscaler.usage_metrics import (
+    get_usage_factors,
+    get_complete_periods_end_time,
+)
+from kinesis_autoscaler.metrics_logger import put_metric
+from kinesis_autoscaler.scaling_policies import (
+    DEFAULT_SCALING_POLICY,
+    ScalingPolicy,
+    get_scaling_policy,
+)
+from kinesis_autoscaler.constants import (
+    UPSCALE_MODE,
+    MAX_SCALE_UP_FACTOR,
+    SCALE_UP_COOLDOWN_MINUTES,
+)
 
 
 class KinesisUpscaler(KinesisAutoscaler):
@@ -11,19 +29,88 @@ class KinesisUpscaler(KinesisAutoscaler):
     """
 
     scaling_type = "SCALE_UP"
+    alarm_type = SCALE_UP_ALARM_TYPE
+    cooldown_period = timedelta(minutes=SCALE_UP_COOLDOWN_MINUTES)
+    # capacity mode switches don't delay scale-ups, a stream switched back to
+    # provisioned may need to scale up right away. Streams aren't scaled while
+    # on-demand, so a switch never hides a recent scale-up from the cooldown.
+    cooldown_scaling_types = ("SCALE_UP", "EMERGENCY_SCALE_UP", "FORECAST_SCALE_UP")
 
     def get_target_shard_count(self, current_shard_count: int) -> int:
         """
         Calculates the scale-up operation target shard count.
         This is done in 25% increments for faster scaling operation
         (as described by AWS in the UpdateShardCount API docs).
+        In PROPORTIONAL upscale mode, the current usage factor is queried and
+        the stream is scaled straight to the shard count that brings its usage
+        back to the target usage factor.
         :param current_shard_count: the current shard count of the stream
         :return: the shard count the stream should scale to
         """
+        usage_factor = None
+        if UPSCALE_MODE == "PROPORTIONAL":
+            usage_factor = self.get_current_usage_factor(current_shard_count)
+            if usage_factor is not None:
+                put_metric("UsageFactor", usage_factor)
+
+        return self.calculate_target_shard_count(
+            current_shard_count, usage_factor, get_scaling_policy(self.stream_name)
+        )
+
+    @staticmethod
+    def calculate_target_shard_count(
+        current_shard_count: int,
+        usage_factor: Optional[float] = None,
+        policy: ScalingPolicy = DEFAULT_SCALING_POLICY,
+    ) -> int:
+        """
+        Calculates the scale-up target shard count using increments of 100%
+        for small streams, 50% for medium streams and 25% for large streams,
+        unless the stream's policy sets its own increment.
+        When the usage factor is given, the target is raised to the shard count
+        that results in the policy's target usage factor, limited by the max
+        shard count increase of a single scaling operation.
+        The target is limited by the policy's max shard count.
+        :param current_shard_count: the current shard count of the stream
+        :param usage_factor: the current usage factor of the stream
+        :param policy: the stream scaling policy
+        :return: the shard count the stream should scale to
+        """
         scale_up_pct = 25
         if current_shard_count <= 3:
             scale_up_pct = 100
         elif current_shard_count <= 50:
             scale_up_pct = 50
+        if policy.scale_up_pct is not None:
+            scale_up_pct = policy.scale_up_pct
 
-        return math.ceil(current_shard_count * (1 + scale_up_pct / 100))
+        target_shard_count = math.ceil(current_shard_count * (1 + scale_up_pct / 100))
+        if usage_factor is not None:
+            proportional_target_shard_count = math.ceil(
+                current_shard_count * usage_factor / policy.target_usage_factor
+            )
+            target_shard_count = max(
+                target_shard_count,
+                min(
+                    proportional_target_shard_count,
+                    current_shard_count * MAX_SCALE_UP_FACTOR,
+                ),
+            )
+
+        return max(policy.clamp(target_shard_count), current_shard_count)
+
+    def get_current_usage_factor(self, current_shard_count: int) -> Optional[float]:
+        """
+        Queries for the stream usage factor in the last 15 minutes
+        (5m aggregation) and returns the newest complete period value.
+        :param current_shard_count: the current shard count of the stream
+        :return: the current usage factor of the stream, or None if missing
+        """
+        current_datetime = get_complete_periods_end_time(datetime.now())
+        usage_factors = get_usage_factors(
+            self.stream_name,
+            current_shard_count,
+            current_datetime - timedelta(minutes=15),
+            current_datetime,
+        )
+        return usage_factors[0] if usage_factors else None
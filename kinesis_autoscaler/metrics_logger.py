@@ -0,0 +1,223 @@
+"""
+CloudWatch embedded metric format (EMF) metrics logger
+"""
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator, Optional
+
+METRICS_NAMESPACE = "KinesisAutoscaler"
+
+
+class StdoutMetricsSink:
+    """
+    Writes EMF documents to stdout, where Lambda ships them to CloudWatch Logs
+    """
+
+    @staticmethod
+    def emit(document: dict) -> None:
+        """
+        Writes a single EMF document.
+        :param document: the EMF document
+        """
+        sys.stdout.write(json.dumps(document) + "\n")
+        sys.stdout.flush()
+
+
+class InMemoryMetricsSink:
+    """
+    Keeps EMF documents in memory, used for capturing metrics in tests
+    """
+
+    def __init__(self):
+        self.documents = []
+
+    def emit(self, document: dict) -> None:
+        """
+        Keeps a single EMF document.
+        :param document: the EMF document
+        """
+        self.documents.append(document)
+
+
+_metrics_sink = StdoutMetricsSink()
+_current_metrics_logger: ContextVar[Optional["MetricsLogger"]] = ContextVar(
+    "current_metrics_logger", default=None
+)
+
+
+def set_metrics_sink(sink) -> None:
+    """
+    Sets the sink all metrics loggers emit their documents to.
+    :param sink: object with an emit(document) method
+    """
+    global _metrics_sink
+    _metrics_sink = sink
+
+
+class MetricsLogger:
+    """
+    Collects metrics and properties of a single scaling process,
+    and emits them as a single EMF document.
+    """
+
+    def __init__(self, dimensions: dict):
+        """
+        Initializes MetricsLogger instance.
+        :param dimensions: the metrics dimensions (name to value)
+        """
+        self.dimensions = dimensions
+        self.metrics = {}
+        self.properties = {}
+        self.lock = threading.Lock()
+
+    def put_metric(self, name: str, value: float, unit: str = "None") -> None:
+        """
+        Adds a metric value. Multiple values of the same metric are kept.
+        :param name: the metric name
+        :param value: the metric value
+        :param unit: the metric CloudWatch unit
+        """
+        with self.lock:
+            self.metrics.setdefault(name, (unit, []))[1].append(value)
+
+    def set_property(self, key: str, value) -> None:
+        """
+        Sets a property, which is logged but isn't a metric.
+        :param key: the property key
+        :param value: the property value
+        """
+        with self.lock:
+            self.properties[key] = value
+
+    def flush(self) -> None:
+        """
+        Emits the collected metrics and properties, and clears them.
+        """
+        with self.lock:
+            document = {
+                "_aws": {
+                    "Timestamp": int(time.time() * 1000),
+                    "CloudWatchMetrics": [
+                        {
+                            "Namespace": METRICS_NAMESPACE,
+                            "Dimensions": [list(self.dimensions)],
+                            "Metrics": [
+                                {"Name": name, "Unit": unit}
+                                for name, (unit, _) in self.metrics.items()
+                            ],
+                        }
+                    ],
+                },
+                **self.properties,
+                **self.dimensions,
+                **{
+                    name: values[0] if len(values) == 1 else values
+                    for name, (_, values) in self.metrics.items()
+                },
+            }
+            self.metrics = {}
+            self.properties = {}
+
+        _metrics_sink.emit(document)
+
+
+@contextmanager
+def metrics_scope(dimensions: dict) -> Iterator[MetricsLogger]:
+    """
+    Opens a metrics logger for the current context (thread or task),
+    which is emitted when the scope ends.
+    :param dimensions: the metrics dimensions (name to value)
+    :return: the scope metrics logger
+    """
+    metrics_logger = MetricsLogger(dimensions)
+    token = _current_metrics_logger.set(metrics_logger)
+    try:
+        yield metrics_logger
+    finally:
+        _current_metrics_logger.reset(token)
+        metrics_logger.flush()
+
+
+def get_metrics_logger() -> Optional[MetricsLogger]:
+    """
+    Returns the metrics logger of the current scope.
+    :return: the current metrics logger, or None outside of a metrics scope
+    """
+    return _current_metrics_logger.get()
+
+
+def put_metric(name: str, value: float, unit: str = "None") -> None:
+    """
+    Adds a metric value to the current scope, if any.
+    :param name: the metric name
+    :param value: the metric value
+    :param unit: the metric CloudWatch unit
+    """
+    metrics_logger = get_metrics_logger()
+    if metrics_logger:
+        metrics_logger.put_metric(name, value, unit)
+
+
+def set_property(key: str, value) -> None:
+    """
+    Sets a property of the current scope, if any.
+    :param key: the property key
+    :param value: the property value
+    """
+    metrics_logger = get_metrics_logger()
+    if metrics_logger:
+        metrics_logger.set_property(key, value)
+
+
+@contextmanager
+def timer(name: str) -> Iterator[None]:
+    """
+    Measures the duration of a scaling process phase as a {name}Duration metric.
+    :param name: the measured phase name
+    """
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        put_metric(
+            f"{name}Duration",
+            (time.perf_counter() - start_time) * 1000,
+            "Milliseconds",
+        )
+
+
+def record_aws_call_start(context: dict, **_kwargs) -> None:
+    """
+    botocore before-call event handler, keeps the AWS call start time.
+    :param context: the AWS call request context
+    """
+    context["metrics_start_time"] = time.perf_counter()
+
+
+def record_aws_call_metrics(parsed: dict, model, context: dict, **_kwargs) -> None:
+    """
+    botocore after-call event handler, records the AWS call latency
+    (including retries) and retry attempts in the current scope.
+    :param parsed: the parsed AWS call response
+    :param model: the AWS call operation model
+    :param context: the AWS call request context
+    """
+    metrics_logger = get_metrics_logger()
+    if not metrics_logger or "metrics_start_time" not in context:
+        return
+
+    call_name = f"{model.service_model.service_name}.{model.name}"
+    metrics_logger.put_metric(
+        f"{call_name}.Latency",
+        (time.perf_counter() - context["metrics_start_time"]) * 1000,
+        "Milliseconds",
+    )
+    metrics_logger.put_metric(
+        f"{call_name}.Retries",
+        parsed.get("ResponseMetadata", {}).get("RetryAttempts", 0),
+        "Count",
+    )
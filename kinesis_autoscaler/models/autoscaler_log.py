@@ -2,6 +2,7 @@
 Autoscaling event log DynamoDB model
 """
 from pynamodb.models import Model
+from pynamodb.indexes import GlobalSecondaryIndex, AllProjection
 from pynamodb.attributes import (
     TTLAttribute,
     NumberAttribute,
@@ -11,6 +12,23 @@ from pynamodb.attributes import (
 from kinesis_autoscaler.constants import REGION, STAGE
 
 
+class ReshardingStatusIndex(GlobalSecondaryIndex):
+    """
+    Autoscaling event logs by their resharding status
+    """
+
+    class Meta:
+        """
+        Index details
+        """
+
+        index_name = "resharding-status-index"
+        projection = AllProjection()
+
+    resharding_status = UnicodeAttribute(hash_key=True)
+    scaling_datetime = UTCDateTimeAttribute(range_key=True)
+
+
 class KinesisAutoscalerLog(Model):
     """
     Represents Kinesis autoscaling event log
@@ -30,3 +48,9 @@ class KinesisAutoscalerLog(Model):
     target_shard_count = NumberAttribute()
     scaling_type = UnicodeAttribute()
     expiration_datetime = TTLAttribute()
+    resharding_status = UnicodeAttribute(null=True)
+    resharding_duration_seconds = NumberAttribute(null=True)
+    final_shard_count = NumberAttribute(null=True)
+    stream_mode = UnicodeAttribute(null=True)
+    resharding_strategy = UnicodeAttribute(null=True)
+    resharding_status_index = ReshardingStatusIndex()
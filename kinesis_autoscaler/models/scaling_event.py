@@ -0,0 +1,30 @@
+"""
+Processed scaling alarm event DynamoDB model
+"""
+from pynamodb.models import Model
+from pynamodb.attributes import (
+    TTLAttribute,
+    UnicodeAttribute,
+    UTCDateTimeAttribute,
+)
+from kinesis_autoscaler.constants import REGION, STAGE
+
+
+class KinesisScalingEvent(Model):
+    """
+    Represents a scaling alarm event claimed by a single scaling process
+    """
+
+    class Meta:
+        """
+        Table details
+        """
+
+        table_name = f"kinesis-autoscaler-events-{STAGE}"
+        region = REGION
+
+    event_id = UnicodeAttribute(hash_key=True)
+    stream_name = UnicodeAttribute()
+    scaling_type = UnicodeAttribute()
+    claim_datetime = UTCDateTimeAttribute()
+    expiration_datetime = TTLAttribute()
@@ -0,0 +1,30 @@
+"""
+Stream scaling policy DynamoDB model
+"""
+from pynamodb.models import Model
+from pynamodb.attributes import NumberAttribute, UnicodeAttribute
+from kinesis_autoscaler.constants import REGION, STAGE
+
+
+class KinesisScalingPolicy(Model):
+    """
+    Represents the scaling policy of a stream.
+    Missing attributes fall back to the service defaults.
+    """
+
+    class Meta:
+        """
+        Table details
+        """
+
+        table_name = f"kinesis-autoscaler-policies-{STAGE}"
+        region = REGION
+
+    stream_name = UnicodeAttribute(hash_key=True)
+    min_shard_count = NumberAttribute(null=True)
+    max_shard_count = NumberAttribute(null=True)
+    target_usage_factor = NumberAttribute(null=True)
+    usage_window_hours = NumberAttribute(null=True)
+    usage_percentile = NumberAttribute(null=True)
+    scale_up_pct = NumberAttribute(null=True)
+    priority = NumberAttribute(null=True)
@@ -0,0 +1,33 @@
+"""
+Stream usage forecast DynamoDB model
+"""
+from pynamodb.models import Model
+from pynamodb.attributes import (
+    TTLAttribute,
+    ListAttribute,
+    NumberAttribute,
+    UnicodeAttribute,
+)
+from kinesis_autoscaler.constants import REGION, STAGE
+
+
+class KinesisUsageForecast(Model):
+    """
+    Represents the seasonal used shard count profiles of a stream
+    """
+
+    class Meta:
+        """
+        Table details
+        """
+
+        table_name = f"kinesis-autoscaler-forecasts-{STAGE}"
+        region = REGION
+
+    stream_name = UnicodeAttribute(hash_key=True)
+    weekly_used_shard_counts = ListAttribute(of=NumberAttribute)
+    weekly_samples = ListAttribute(of=NumberAttribute)
+    daily_used_shard_counts = ListAttribute(of=NumberAttribute)
+    daily_samples = ListAttribute(of=NumberAttribute)
+    fitted_timestamp = NumberAttribute()
+    expiration_datetime = TTLAttribute()
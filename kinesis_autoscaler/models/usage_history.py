@@ -0,0 +1,30 @@
+"""
+Stream usage history DynamoDB model
+"""
+from pynamodb.models import Model
+from pynamodb.attributes import (
+    TTLAttribute,
+    ListAttribute,
+    NumberAttribute,
+    UnicodeAttribute,
+)
+from kinesis_autoscaler.constants import REGION, STAGE
+
+
+class KinesisUsageHistory(Model):
+    """
+    Represents the rolling used shard count data points of a stream
+    """
+
+    class Meta:
+        """
+        Table details
+        """
+
+        table_name = f"kinesis-autoscaler-usage-history-{STAGE}"
+        region = REGION
+
+    stream_name = UnicodeAttribute(hash_key=True)
+    timestamps = ListAttribute(of=NumberAttribute)
+    used_shard_counts = ListAttribute(of=NumberAttribute)
+    expiration_datetime = TTLAttribute()
@@ -0,0 +1,291 @@
+"""
+Opt-in sampled per-invocation profiling of the Lambda handlers
+"""
+import os
+import io
+import sys
+import json
+import time
+import random
+import logging
+import tempfile
+import threading
+import functools
+from datetime import datetime, timezone
+from typing import Callable, List
+from kinesis_autoscaler.constants import (
+    PROFILING_MODES,
+    PROFILING_SAMPLE_RATE,
+    PROFILING_COLD_START,
+    PROFILING_TOP_ENTRIES,
+    PROFILING_OUTPUT_PATH,
+    PROFILING_S3_ENDPOINT_URL,
+)
+
+CPU_PROFILING = "CPU"
+MEMORY_PROFILING = "MEMORY"
+
+_cold_start = True
+_cold_start_lock = threading.Lock()
+
+
+class InvocationProfiler:
+    """
+    Profiles a single invocation, including the threads it starts.
+    cProfile only profiles the thread it is enabled in, so each thread started
+    during the invocation (e.g. the batch scaling workers) is profiled by its
+    own profiler, and their stats are merged.
+    The profiling modules are imported only by profiled invocations, keeping
+    them out of the cold start of the others.
+    """
+
+    def __init__(self, modes: set):
+        """
+        Initializes InvocationProfiler instance.
+        :param modes: the profiling modes (CPU/MEMORY)
+        """
+        self.modes = modes
+        self.profilers = []
+        self.profilers_lock = threading.Lock()
+        self.snapshot = None
+        self.peak_memory = None
+        self.stats = None
+        self.started_tracemalloc = False
+
+    def start(self) -> None:
+        """
+        Starts profiling the current thread and the threads it starts.
+        """
+        import tracemalloc
+
+        if MEMORY_PROFILING in self.modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracemalloc = True
+        if CPU_PROFILING in self.modes:
+            threading.setprofile(self.profile_thread)
+            self.new_profiler().enable()
+
+    def stop(self) -> None:
+        """
+        Stops profiling, and collects the stats.
+        """
+        import pstats
+        import cProfile
+        import tracemalloc
+
+        if CPU_PROFILING in self.modes:
+            threading.setprofile(None)
+            self.profilers[0].disable()
+        if self.started_tracemalloc:
+            self.snapshot = tracemalloc.take_snapshot().filter_traces(
+                [
+                    tracemalloc.Filter(False, module.__file__)
+                    for module in (cProfile, pstats, tracemalloc, sys.modules[__name__])
+                ]
+            )
+            _, self.peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        if CPU_PROFILING in self.modes:
+            self.stats = pstats.Stats(self.profilers[0], stream=io.StringIO())
+            for profiler in self.profilers[1:]:
+                self.stats.add(profiler)
+
+    def new_profiler(self):
+        """
+        Creates a profiler for the current thread.
+        :return: the thread's cProfile profiler
+        """
+        import cProfile
+
+        profiler = cProfile.Profile()
+        with self.profilers_lock:
+            self.profilers.append(profiler)
+        return profiler
+
+    def profile_thread(self, *_args) -> None:
+        """
+        Profile function of the started threads, called on their first event.
+        Replaces itself with a thread profiler.
+        """
+        try:
+            self.new_profiler().enable()
+        except ValueError:
+            # runtimes with a single process-wide profiler (Python 3.12+)
+            # profile the invoking thread only
+            threading.setprofile(None)
+
+    def get_top_functions(self, limit: int = PROFILING_TOP_ENTRIES) -> List[dict]:
+        """
+        Returns the functions with the highest cumulative time.
+        :param limit: max number of functions
+        :return: list of the top functions stats
+        """
+        entries = sorted(
+            self.stats.stats.items(), key=lambda entry: entry[1][3], reverse=True
+        )
+        return [
+            {
+                "function": f"{filename}:{line}({function_name})",
+                "calls": calls,
+                "total_ms": round(total_time * 1000, 3),
+                "cumulative_ms": round(cumulative_time * 1000, 3),
+            }
+            for (filename, line, function_name), (
+                _,
+                calls,
+                total_time,
+                cumulative_time,
+                _,
+            ) in entries[:limit]
+        ]
+
+    def get_top_allocations(self, limit: int = PROFILING_TOP_ENTRIES) -> List[dict]:
+        """
+        Returns the source lines with the most memory allocated by the
+        invocation and still held at its end, excluding the profilers own
+        allocations.
+        :param limit: max number of source lines
+        :return: list of the top allocations stats
+        """
+        return [
+            {
+                "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                "size_kb": round(stat.size / 1024, 1),
+                "count": stat.count,
+            }
+            for stat in self.snapshot.statistics("lineno")[:limit]
+        ]
+
+
+def profiled(handler: Callable) -> Callable:
+    """
+    Lambda handler decorator, profiles sampled invocations according to
+    the profiling configuration.
+    The top functions and allocations are logged as a single JSON document,
+    and the full profiles are written to the output path, if configured.
+    Profiling failures never fail the invocation.
+    :param handler: the Lambda handler function
+    :return: the profiled Lambda handler function
+    """
+
+    @functools.wraps(handler)
+    def wrapper(event, context):
+        if not should_profile():
+            return handler(event, context)
+
+        profiler = InvocationProfiler(PROFILING_MODES)
+        start_time = time.perf_counter()
+        profiler.start()
+        try:
+            return handler(event, context)
+        finally:
+            profiler.stop()
+            duration = time.perf_counter() - start_time
+            try:
+                report_profile(handler.__name__, context, profiler, duration)
+            except Exception:
+                logging.exception("Failed reporting invocation profile")
+
+    return wrapper
+
+
+def should_profile() -> bool:
+    """
+    Samples the current invocation for profiling.
+    :return: True if the invocation should be profiled
+    """
+    global _cold_start
+    if not PROFILING_MODES:
+        return False
+
+    with _cold_start_lock:
+        cold_start = _cold_start
+        _cold_start = False
+    if cold_start and PROFILING_COLD_START:
+        return True
+
+    return random.random() < 1 / max(PROFILING_SAMPLE_RATE, 1)
+
+
+def report_profile(
+    handler_name: str, context, profiler: InvocationProfiler, duration: float
+) -> None:
+    """
+    Logs the invocation profile summary, and writes its full profiles.
+    :param handler_name: the profiled handler name
+    :param context: the Lambda invocation context
+    :param profiler: the invocation profiler
+    :param duration: the invocation duration in seconds
+    """
+    request_id = getattr(context, "aws_request_id", None) or str(int(time.time()))
+    document = {
+        "message": "Invocation profile",
+        "handler": handler_name,
+        "request_id": request_id,
+        "duration_ms": round(duration * 1000, 3),
+    }
+    if profiler.stats:
+        document["top_functions"] = profiler.get_top_functions()
+    if profiler.snapshot:
+        document["peak_memory_kb"] = round(profiler.peak_memory / 1024, 1)
+        document["top_allocations"] = profiler.get_top_allocations()
+
+    if PROFILING_OUTPUT_PATH:
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        file_prefix = f"{handler_name}/{timestamp}-{request_id}"
+        document["profile_files"] = write_profile_files(profiler, file_prefix)
+
+    logging.info(json.dumps(document))
+
+
+def write_profile_files(profiler: InvocationProfiler, file_prefix: str) -> List[str]:
+    """
+    Writes the full profiles (pstats and tracemalloc snapshot files) to the
+    configured output path.
+    :param profiler: the invocation profiler
+    :param file_prefix: the files path prefix, relative to the output path
+    :return: the written files paths
+    """
+    paths = []
+    with tempfile.TemporaryDirectory() as temp_directory:
+        local_files = []
+        if profiler.stats:
+            local_file = os.path.join(temp_directory, "profile.pstats")
+            profiler.stats.dump_stats(local_file)
+            local_files.append((local_file, f"{file_prefix}.pstats"))
+        if profiler.snapshot:
+            local_file = os.path.join(temp_directory, "profile.tracemalloc")
+            profiler.snapshot.dump(local_file)
+            local_files.append((local_file, f"{file_prefix}.tracemalloc"))
+
+        for local_file, relative_path in local_files:
+            with open(local_file, "rb") as profile_file:
+                paths.append(write_output_file(relative_path, profile_file.read()))
+
+    return paths
+
+
+def write_output_file(relative_path: str, content: bytes) -> str:
+    """
+    Writes a file to the output path, either a local directory or
+    an S3 (or S3-compatible) s3://bucket/prefix path.
+    :param relative_path: the file path relative to the output path
+    :param content: the file content
+    :return: the written file path
+    """
+    if PROFILING_OUTPUT_PATH.startswith("s3://"):
+        bucket, _, prefix = PROFILING_OUTPUT_PATH.removeprefix("s3://").partition("/")
+        key = f"{prefix.rstrip('/')}/{relative_path}".lstrip("/")
+        # profiles are rare, so the client isn't cached with the service clients
+        import boto3
+
+        boto3.client("s3", endpoint_url=PROFILING_S3_ENDPOINT_URL).put_object(
+            Bucket=bucket, Key=key, Body=content
+        )
+        return f"s3://{bucket}/{key}"
+
+    path = os.path.join(PROFILING_OUTPUT_PATH, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as output_file:
+        output_file.write(content)
+    return path
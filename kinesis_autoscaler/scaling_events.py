@@ -0,0 +1,67 @@
+"""
+Idempotent processing of scaling alarm events
+"""
+import logging
+from typing import Optional
+from datetime import datetime, timedelta, timezone
+from kinesis_autoscaler.alarm_event import AlarmEvent
+from kinesis_autoscaler.constants import EVENTS_RETENTION_DAYS
+
+
+def get_event_id(alarm_event: AlarmEvent) -> Optional[str]:
+    """
+    Returns the idempotency key of an alarm event, which is shared by all the
+    deliveries of the same alarm state change, by either SNS or EventBridge.
+    :param alarm_event: triggering alarm event
+    :return: the event id, or None if the event has no state change time
+    """
+    if not alarm_event.state_change_time:
+        return None
+
+    return (
+        f"{alarm_event.stream_name}#{alarm_event.alarm_name}"
+        f"#{alarm_event.state_change_time}"
+    )
+
+
+def claim_event(event_id: str, stream_name: str, scaling_type: str) -> bool:
+    """
+    Claims an alarm event for the current scaling process, using a conditional
+    write so only a single delivery of the event can claim it.
+    :param event_id: the alarm event id
+    :param stream_name: name of the stream to scale
+    :param scaling_type: the scaling type of the operation
+    :return: True if claimed, False if the event was already claimed
+    """
+    # imported on first use, keeping pynamodb out of the cold start path
+    from pynamodb.exceptions import PutError
+    from kinesis_autoscaler.models.scaling_event import KinesisScalingEvent
+
+    try:
+        KinesisScalingEvent(
+            event_id=event_id,
+            stream_name=stream_name,
+            scaling_type=scaling_type,
+            claim_datetime=datetime.utcnow().replace(tzinfo=timezone.utc),
+            expiration_datetime=timedelta(days=EVENTS_RETENTION_DAYS),
+        ).save(condition=KinesisScalingEvent.event_id.does_not_exist())
+    except PutError as error:
+        if error.cause_response_code == "ConditionalCheckFailedException":
+            return False
+        raise
+
+    return True
+
+
+def release_event(event_id: str) -> None:
+    """
+    Releases a claimed alarm event, allowing its redelivery to be processed.
+    Failures are logged and not raised, as releasing is best effort.
+    :param event_id: the alarm event id
+    """
+    from kinesis_autoscaler.models.scaling_event import KinesisScalingEvent
+
+    try:
+        KinesisScalingEvent(event_id=event_id).delete()
+    except Exception:
+        logging.exception(f"Failed releasing scaling event. event_id={event_id}")
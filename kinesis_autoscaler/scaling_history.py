@@ -0,0 +1,77 @@
+"""
+Cached latest scaling operation of each stream
+"""
+import time
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+from datetime import datetime
+from kinesis_autoscaler.constants import SCALING_HISTORY_CACHE_TTL_SECONDS
+
+
+class LatestScaling(NamedTuple):
+    """
+    The latest scaling operation of a stream
+    """
+
+    scaling_datetime: datetime
+    scaling_type: str
+    target_shard_count: int
+
+
+# stream name to (cache expiration monotonic time, latest scaling or None)
+_latest_scalings: Dict[str, Tuple[float, Optional[LatestScaling]]] = {}
+_latest_scalings_lock = threading.Lock()
+
+
+def get_latest_scaling(stream_name: str) -> Optional[LatestScaling]:
+    """
+    Returns the latest scaling operation of a stream.
+    The latest scaling log is queried with a descending limit 1 range query,
+    and is cached in memory for warm invocations.
+    :param stream_name: name of the stream
+    :return: the latest scaling operation, or None if the stream wasn't scaled
+    """
+    with _latest_scalings_lock:
+        cached = _latest_scalings.get(stream_name)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+
+    latest_scaling = None
+    for scaling_log in KinesisAutoscalerLog.query(
+        stream_name, scan_index_forward=False, limit=1
+    ):
+        latest_scaling = LatestScaling(
+            scaling_log.scaling_datetime,
+            scaling_log.scaling_type,
+            scaling_log.target_shard_count,
+        )
+
+    set_latest_scaling(stream_name, latest_scaling)
+    return latest_scaling
+
+
+def set_latest_scaling(
+    stream_name: str, latest_scaling: Optional[LatestScaling]
+) -> None:
+    """
+    Caches the latest scaling operation of a stream.
+    Called after each scaling log write, so the cache is never behind the
+    scaling operations of the current process.
+    :param stream_name: name of the stream
+    :param latest_scaling: the latest scaling operation of the stream
+    """
+    with _latest_scalings_lock:
+        _latest_scalings[stream_name] = (
+            time.monotonic() + SCALING_HISTORY_CACHE_TTL_SECONDS,
+            latest_scaling,
+        )
+
+
+def reset_cache() -> None:
+    """
+    Clears the in-memory latest scaling operations.
+    """
+    with _latest_scalings_lock:
+        _latest_scalings.clear()
@@ -0,0 +1,118 @@
+"""
+Kinesis stream quota-aware scaling planner
+"""
+import math
+import logging
+from typing import List
+from datetime import datetime, timedelta, timezone
+from kinesis_autoscaler.constants import (
+    MAX_SCALING_OPERATIONS_PER_DAY,
+    MAX_SCALE_UP_FACTOR,
+    MAX_SCALE_DOWN_FACTOR,
+    RESERVED_SCALE_UP_OPERATIONS,
+    TARGETED_RESHARDING_STRATEGY,
+)
+
+# scaling types resharding the stream with UpdateShardCount, other logged
+# operations (capacity mode switches, targeted split/merge resharding)
+# don't count towards its daily limit
+UPDATE_SHARD_COUNT_SCALING_TYPES = (
+    "SCALE_UP",
+    "SCALE_DOWN",
+    "EMERGENCY_SCALE_UP",
+    "FORECAST_SCALE_UP",
+)
+
+
+class KinesisScalingPlanner:
+    """
+    Plans the scaling operations of a stream within the UpdateShardCount limits:
+    each operation can at most double or halve the shard count, and only a
+    limited number of operations is allowed in a rolling 24 hours period.
+    """
+
+    def __init__(self, stream_name: str):
+        """
+        Initializes KinesisScalingPlanner instance.
+        :param stream_name: name of the planned stream
+        """
+        self.stream_name = stream_name
+
+    def get_next_target_shard_count(
+        self, current_shard_count: int, ideal_shard_count: int
+    ) -> int:
+        """
+        Returns the target shard count of the next scaling operation
+        towards the ideal shard count.
+        :param current_shard_count: the stream's current shard count
+        :param ideal_shard_count: the shard count the stream should reach
+        :return: the next operation target shard count, or the current
+            shard count if no operation is allowed
+        """
+        remaining_operations = self.get_remaining_operations()
+        plan = self.plan(current_shard_count, ideal_shard_count, remaining_operations)
+        logging.info(
+            "Planned stream scaling operations. "
+            f"stream={self.stream_name} plan={plan} "
+            f"remaining_operations={remaining_operations}"
+        )
+        return plan[0] if plan else current_shard_count
+
+    def get_remaining_operations(self) -> int:
+        """
+        Counts the stream's remaining scaling operations in the rolling
+        24 hours period, according to its UpdateShardCount scaling logs.
+        :return: number of remaining scaling operations
+        """
+        from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+
+        period_start = datetime.utcnow().replace(tzinfo=timezone.utc) - timedelta(
+            days=1
+        )
+        used_operations = KinesisAutoscalerLog.count(
+            self.stream_name,
+            KinesisAutoscalerLog.scaling_datetime > period_start,
+            filter_condition=KinesisAutoscalerLog.scaling_type.is_in(
+                *UPDATE_SHARD_COUNT_SCALING_TYPES
+            )
+            & (
+                KinesisAutoscalerLog.resharding_strategy.does_not_exist()
+                | (
+                    KinesisAutoscalerLog.resharding_strategy
+                    != TARGETED_RESHARDING_STRATEGY
+                )
+            ),
+        )
+        return max(MAX_SCALING_OPERATIONS_PER_DAY - used_operations, 0)
+
+    @staticmethod
+    def plan(
+        current_shard_count: int, ideal_shard_count: int, remaining_operations: int
+    ) -> List[int]:
+        """
+        Plans the shortest sequence of scaling operations towards the ideal
+        shard count within the remaining operations budget.
+        Scale-down operations can't use the operations reserved for scale-up,
+        so a scale-down never prevents scaling up during a peak.
+        :param current_shard_count: the stream's current shard count
+        :param ideal_shard_count: the shard count the stream should reach
+        :param remaining_operations: number of remaining scaling operations
+        :return: the target shard count of each planned operation
+        """
+        plan = []
+        shard_count = current_shard_count
+        if ideal_shard_count > current_shard_count:
+            allowed_operations = remaining_operations
+            while shard_count < ideal_shard_count:
+                shard_count = min(ideal_shard_count, shard_count * MAX_SCALE_UP_FACTOR)
+                plan.append(shard_count)
+        else:
+            allowed_operations = remaining_operations - RESERVED_SCALE_UP_OPERATIONS
+            while shard_count > ideal_shard_count:
+                shard_count = max(
+                    ideal_shard_count,
+                    math.ceil(shard_count / MAX_SCALE_DOWN_FACTOR),
+                )
+                plan.append(shard_count)
+
+        return plan[: max(allowed_operations, 0)]
@@ -0,0 +1,127 @@
+"""
+Per-stream scaling policies registry
+"""
+import time
+import logging
+import threading
+from typing import Dict, NamedTuple, Optional
+from kinesis_autoscaler.constants import (
+    UPSCALE_TARGET_USAGE_FACTOR,
+    CRITICAL_STREAM_PRIORITY,
+    SCALING_POLICIES_CACHE_TTL_SECONDS,
+)
+
+
+class ScalingPolicy(NamedTuple):
+    """
+    Scaling policy of a stream
+    """
+
+    # the stream is never scaled below/above these shard counts
+    min_shard_count: int = 1
+    max_shard_count: Optional[int] = None
+    # the usage factor scaling operations bring the stream to
+    target_usage_factor: float = UPSCALE_TARGET_USAGE_FACTOR
+    # the scale-down usage lookback window and statistic (100 for max)
+    usage_window_hours: int = 24
+    usage_percentile: float = 100
+    # scale-up step, None for increments based on the stream size
+    scale_up_pct: Optional[int] = None
+    # streams with higher priority get the account shard headroom first, and
+    # streams with CRITICAL_STREAM_PRIORITY can use the critical shard reserve
+    priority: int = 0
+
+    def clamp(self, shard_count: int) -> int:
+        """
+        Limits a shard count to the policy's shard count range.
+        :param shard_count: the shard count to limit
+        :return: the limited shard count
+        """
+        shard_count = max(shard_count, self.min_shard_count)
+        if self.max_shard_count is not None:
+            shard_count = min(shard_count, self.max_shard_count)
+        return shard_count
+
+    def is_critical(self) -> bool:
+        """
+        Checks whether the stream can use the critical shard reserve.
+        :return: True if the stream has the critical priority
+        """
+        return self.priority >= CRITICAL_STREAM_PRIORITY
+
+
+DEFAULT_SCALING_POLICY = ScalingPolicy()
+INTEGER_POLICY_FIELDS = (
+    "min_shard_count",
+    "max_shard_count",
+    "usage_window_hours",
+    "scale_up_pct",
+    "priority",
+)
+
+_scaling_policies: Dict[str, ScalingPolicy] = {}
+_scaling_policies_expiration = 0.0
+_scaling_policies_lock = threading.Lock()
+
+
+def get_scaling_policy(stream_name: str) -> ScalingPolicy:
+    """
+    Returns the scaling policy of a stream.
+    All the policies are fetched in bulk and cached in memory, so warm
+    invocations read the policies without any request.
+    :param stream_name: name of the stream
+    :return: the stream scaling policy, or the default policy if it has none
+    """
+    return get_scaling_policies().get(stream_name, DEFAULT_SCALING_POLICY)
+
+
+def get_scaling_policies() -> Dict[str, ScalingPolicy]:
+    """
+    Returns the scaling policies of all the streams that have one.
+    :return: dict of stream name to its scaling policy
+    """
+    global _scaling_policies, _scaling_policies_expiration
+
+    # policies are loaded under lock, so concurrent scalers share a single scan
+    with _scaling_policies_lock:
+        if _scaling_policies_expiration <= time.monotonic():
+            _scaling_policies = load_scaling_policies()
+            _scaling_policies_expiration = (
+                time.monotonic() + SCALING_POLICIES_CACHE_TTL_SECONDS
+            )
+
+        return _scaling_policies
+
+
+def load_scaling_policies() -> Dict[str, ScalingPolicy]:
+    """
+    Scans the scaling policies table.
+    :return: dict of stream name to its scaling policy
+    """
+    from kinesis_autoscaler.models.scaling_policy import KinesisScalingPolicy
+
+    scaling_policies = {}
+    for item in KinesisScalingPolicy.scan():
+        policy_fields = {
+            field: getattr(item, field)
+            for field in ScalingPolicy._fields
+            if getattr(item, field) is not None
+        }
+        for field in INTEGER_POLICY_FIELDS:
+            if field in policy_fields:
+                policy_fields[field] = int(policy_fields[field])
+        scaling_policies[item.stream_name] = ScalingPolicy(**policy_fields)
+
+    logging.info(f"Loaded scaling policies. policies={len(scaling_policies)}")
+    return scaling_policies
+
+
+def reset_cache() -> None:
+    """
+    Clears the in-memory scaling policies.
+    """
+    global _scaling_policies, _scaling_policies_expiration
+
+    with _scaling_policies_lock:
+        _scaling_policies = {}
+        _scaling_policies_expiration = 0.0
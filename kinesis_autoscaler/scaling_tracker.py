@@ -0,0 +1,112 @@
+"""
+Kinesis stream scaling progress tracker
+"""
+import logging
+from typing import List, Optional
+from datetime import datetime, timedelta, timezone
+from kinesis_autoscaler.aws_clients import get_client
+
+RESHARDING_IN_PROGRESS = "IN_PROGRESS"
+RESHARDING_COMPLETED = "COMPLETED"
+RESHARDING_TIMED_OUT = "TIMED_OUT"
+RESHARDING_STREAM_DELETED = "STREAM_DELETED"
+
+MAX_RESHARDING_DURATION = timedelta(hours=6)
+
+
+class KinesisScalingTracker:
+    """
+    Tracks the in progress scaling operations until their streams are ACTIVE,
+    and records the measured resharding duration and final shard count in the
+    scaling logs. Invoked periodically instead of waiting for the resharding
+    within the scaling invocation.
+    """
+
+    def track(self) -> List[dict]:
+        """
+        Checks all the in progress scaling operations.
+        :return: report containing an entry for each completed scaling operation
+        """
+        from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+
+        report = []
+        for scaling_log in KinesisAutoscalerLog.resharding_status_index.query(
+            RESHARDING_IN_PROGRESS
+        ):
+            try:
+                report_entry = self.track_scaling_log(scaling_log)
+            except Exception:
+                logging.exception(
+                    "Failed tracking scaling operation. "
+                    f"stream={scaling_log.stream_name}"
+                )
+                continue
+
+            if report_entry:
+                report.append(report_entry)
+
+        return report
+
+    @staticmethod
+    def track_scaling_log(scaling_log) -> Optional[dict]:
+        """
+        Checks a single in progress scaling operation, and completes its log
+        if the stream is ACTIVE.
+        Operations of deleted streams, and operations that didn't complete
+        within MAX_RESHARDING_DURATION, are ended as well, since in progress
+        operations hold the account shard headroom.
+        :param scaling_log: the in progress scaling operation log
+        :return: report entry of the scaling operation, or None if still in progress
+        """
+        from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+
+        now = datetime.utcnow().replace(tzinfo=timezone.utc)
+        resharding_duration = now - scaling_log.scaling_datetime
+        final_shard_count = None
+        if resharding_duration > MAX_RESHARDING_DURATION:
+            resharding_status = RESHARDING_TIMED_OUT
+        else:
+            try:
+                response = get_client("kinesis").describe_stream_summary(
+                    StreamName=scaling_log.stream_name
+                )
+            except Exception as exception:
+                error = getattr(exception, "response", {}).get("Error", {})
+                if error.get("Code") != "ResourceNotFoundException":
+                    raise
+                response = None
+
+            if response is None:
+                resharding_status = RESHARDING_STREAM_DELETED
+            elif response["StreamDescriptionSummary"]["StreamStatus"] == "ACTIVE":
+                resharding_status = RESHARDING_COMPLETED
+                final_shard_count = response["StreamDescriptionSummary"][
+                    "OpenShardCount"
+                ]
+            else:
+                return None
+
+        actions = [
+            KinesisAutoscalerLog.resharding_status.set(resharding_status),
+            KinesisAutoscalerLog.resharding_duration_seconds.set(
+                int(resharding_duration.total_seconds())
+            ),
+        ]
+        if final_shard_count is not None:
+            actions.append(
+                KinesisAutoscalerLog.final_shard_count.set(final_shard_count)
+            )
+        scaling_log.update(actions=actions)
+        logging.info(
+            "Scaling operation finished. "
+            f"stream={scaling_log.stream_name} status={resharding_status} "
+            f"duration_seconds={int(resharding_duration.total_seconds())} "
+            f"target_count={scaling_log.target_shard_count} "
+            f"final_count={final_shard_count}"
+        )
+        return {
+            "stream_name": scaling_log.stream_name,
+            "resharding_status": resharding_status,
+            "resharding_duration_seconds": int(resharding_duration.total_seconds()),
+            "final_shard_count": final_shard_count,
+        }
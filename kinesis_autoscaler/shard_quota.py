@@ -0,0 +1,145 @@
+"""
+Account shard quota ledger
+"""
+import math
+import time
+import logging
+import threading
+from kinesis_autoscaler.aws_clients import get_client
+from kinesis_autoscaler.scaling_tracker import RESHARDING_IN_PROGRESS
+from kinesis_autoscaler.constants import (
+    SHARD_QUOTA_CACHE_TTL_SECONDS,
+    CRITICAL_SHARD_RESERVE_RATIO,
+)
+
+_shard_limit = 0
+_open_shard_count = 0
+# shards added by the in progress scale-ups, which the open shard count
+# doesn't include until their resharding completes
+_in_flight_shard_count = 0
+# shards reserved by this process' scale-ups which weren't logged yet
+_pending_shard_count = 0
+_shard_limits_expiration = 0.0
+_shard_limits_lock = threading.Lock()
+
+
+def get_shard_headroom(critical: bool = False) -> int:
+    """
+    Returns the number of shards the account's streams can still scale up by.
+    :param critical: whether the critical shard reserve can be used
+    :return: the account shard headroom
+    """
+    with _shard_limits_lock:
+        return get_available_shard_count(critical)
+
+
+def reserve_shards(shard_count: int, critical: bool = False) -> int:
+    """
+    Reserves up to a number of shards from the account shard headroom,
+    so concurrent scale-ups don't exceed the account shard limit together.
+    :param shard_count: the number of shards to reserve
+    :param critical: whether the critical shard reserve can be used
+    :return: the number of shards reserved
+    """
+    global _pending_shard_count
+
+    with _shard_limits_lock:
+        reserved_shard_count = max(
+            min(shard_count, get_available_shard_count(critical)), 0
+        )
+        _pending_shard_count += reserved_shard_count
+        return reserved_shard_count
+
+
+def commit_shards(shard_count: int) -> None:
+    """
+    Marks reserved shards as in flight once their scale-up is logged, so they
+    stay reserved until the scaling tracker completes the scale-up.
+    :param shard_count: the number of shards to commit
+    """
+    global _pending_shard_count, _in_flight_shard_count
+
+    with _shard_limits_lock:
+        _pending_shard_count = max(_pending_shard_count - shard_count, 0)
+        _in_flight_shard_count += shard_count
+
+
+def release_shards(shard_count: int) -> None:
+    """
+    Releases shards reserved by a scale-up that wasn't started.
+    :param shard_count: the number of shards to release
+    """
+    global _pending_shard_count
+
+    with _shard_limits_lock:
+        _pending_shard_count = max(_pending_shard_count - shard_count, 0)
+
+
+def get_available_shard_count(critical: bool) -> int:
+    """
+    Calculates the account shard headroom, refreshing the cached account
+    shard limits once they expire.
+    Must be called under the shard limits lock.
+    :param critical: whether the critical shard reserve can be used
+    :return: the account shard headroom
+    """
+    if _shard_limits_expiration <= time.monotonic():
+        refresh_shard_limits()
+
+    available_shard_count = (
+        _shard_limit - _open_shard_count - _in_flight_shard_count - _pending_shard_count
+    )
+    if not critical:
+        available_shard_count -= math.ceil(_shard_limit * CRITICAL_SHARD_RESERVE_RATIO)
+    return max(available_shard_count, 0)
+
+
+def refresh_shard_limits() -> None:
+    """
+    Describes the account shard limits, and sums the shards added by the
+    in progress scale-ups of all the autoscaler invocations.
+    Must be called under the shard limits lock.
+    """
+    global _shard_limit, _open_shard_count, _in_flight_shard_count
+    global _shard_limits_expiration
+
+    response = get_client("kinesis").describe_limits()
+    _shard_limit = response["ShardLimit"]
+    _open_shard_count = response["OpenShardCount"]
+    _in_flight_shard_count = load_in_flight_shard_count()
+    _shard_limits_expiration = time.monotonic() + SHARD_QUOTA_CACHE_TTL_SECONDS
+    logging.info(
+        "Described account shard limits. "
+        f"shard_limit={_shard_limit} open_shard_count={_open_shard_count} "
+        f"in_flight_shard_count={_in_flight_shard_count}"
+    )
+
+
+def load_in_flight_shard_count() -> int:
+    """
+    Queries the in progress scaling logs for the shards their scale-ups add.
+    :return: the number of shards added by the in progress scale-ups
+    """
+    from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+
+    return sum(
+        max(int(scaling_log.target_shard_count - scaling_log.shard_count), 0)
+        for scaling_log in KinesisAutoscalerLog.resharding_status_index.query(
+            RESHARDING_IN_PROGRESS
+        )
+    )
+
+
+def reset_cache() -> None:
+    """
+    Clears the in-memory account shard limits and reservations.
+    """
+    global _shard_limit, _open_shard_count, _in_flight_shard_count
+    global _pending_shard_count, _shard_limits_expiration
+
+    with _shard_limits_lock:
+        _shard_limit = 0
+        _open_shard_count = 0
+        _in_flight_shard_count = 0
+        _pending_shard_count = 0
+        _shard_limits_expiration = 0.0
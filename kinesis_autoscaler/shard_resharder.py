@@ -0,0 +1,318 @@
+"""
+Kinesis stream targeted (hot-shard aware) resharder
+"""
+import time
+import logging
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from datetime import datetime, timedelta
+from kinesis_autoscaler.aws_clients import get_client
+from kinesis_autoscaler.usage_metrics import (
+    METRIC_PERIOD_SECONDS,
+    get_complete_periods_end_time,
+)
+from kinesis_autoscaler.invocation_deadline import get_remaining_seconds
+from kinesis_autoscaler.constants import (
+    SCALE_UP_USAGE_THRESHOLD,
+    TARGETED_RESHARDING_MAX_HOT_SHARDS_RATIO,
+    TARGETED_RESHARDING_WAIT_SECONDS,
+    TARGETED_RESHARDING_TIME_MARGIN_SECONDS,
+)
+
+MAX_METRIC_DATA_QUERIES = 500
+SHARD_USAGE_WINDOW = timedelta(minutes=15)
+MERGED_SHARD_TARGET_USAGE_FACTOR = 0.5
+
+
+class ShardUsage(NamedTuple):
+    """
+    Open shard hash key range and usage factor
+    """
+
+    shard_id: str
+    starting_hash_key: int
+    ending_hash_key: int
+    usage_factor: float
+
+
+class KinesisShardResharder:
+    """
+    Reshards a stream by splitting only its hot shards on scale-up,
+    and merging adjacent cold shards on scale-down.
+    Shard usage is based on the shard-level (enhanced monitoring) metrics.
+    """
+
+    def __init__(self, stream_name: str):
+        """
+        Initializes KinesisShardResharder instance.
+        :param stream_name: name of the stream to reshard
+        """
+        self.stream_name = stream_name
+
+    def reshard(
+        self, current_shard_count: int, target_shard_count: int
+    ) -> Optional[int]:
+        """
+        Reshards the stream towards the target shard count using split/merge
+        operations, when its load is skewed enough for targeted resharding.
+        Each operation requires the stream to be ACTIVE, so operations that can't
+        be done within the wait limit are left for the next scaling operation.
+        The wait is limited by the invocation's remaining time as well, leaving
+        time for the alarms sync and the scaling log write.
+        :param current_shard_count: the stream's current shard count
+        :param target_shard_count: the shard count the stream should scale to
+        :return: the stream shard count after resharding, or None if
+            targeted resharding isn't suitable for the stream load
+        """
+        shard_index = self.build_shard_index()
+        if target_shard_count > current_shard_count:
+            hot_shards = self.plan_splits(
+                shard_index, target_shard_count - current_shard_count
+            )
+            if not hot_shards:
+                return None
+            operations = [(self.split_shard, (shard,)) for shard in hot_shards]
+            shard_count_change = 1
+        else:
+            cold_shard_pairs = self.plan_merges(
+                shard_index, current_shard_count - target_shard_count
+            )
+            if not cold_shard_pairs:
+                return None
+            operations = [(self.merge_shards, pair) for pair in cold_shard_pairs]
+            shard_count_change = -1
+
+        deadline = time.monotonic() + self.get_wait_seconds()
+        resharded_shard_count = len(shard_index)
+        for index, (operation, shards) in enumerate(operations):
+            if index > 0 and not self.wait_for_active_stream(deadline):
+                logging.info(
+                    "Stream is still updating. Postponing remaining operations. "
+                    f"stream={self.stream_name} remaining={len(operations) - index}"
+                )
+                break
+
+            operation(*shards)
+            resharded_shard_count += shard_count_change
+
+        return resharded_shard_count
+
+    @staticmethod
+    def get_wait_seconds() -> float:
+        """
+        Returns the max time to wait for the stream between operations.
+        :return: the wait limit in seconds
+        """
+        remaining_seconds = get_remaining_seconds()
+        if remaining_seconds is None:
+            return TARGETED_RESHARDING_WAIT_SECONDS
+        return min(
+            TARGETED_RESHARDING_WAIT_SECONDS,
+            remaining_seconds - TARGETED_RESHARDING_TIME_MARGIN_SECONDS,
+        )
+
+    def build_shard_index(self) -> List[ShardUsage]:
+        """
+        Builds the stream's open shards index, ordered by their hash key ranges.
+        :return: the open shards usage, ordered by starting hash key
+        """
+        shards = self.list_open_shards()
+        usage_factors = self.get_shard_usage_factors(
+            [shard["ShardId"] for shard in shards]
+        )
+        return sorted(
+            (
+                ShardUsage(
+                    shard["ShardId"],
+                    int(shard["HashKeyRange"]["StartingHashKey"]),
+                    int(shard["HashKeyRange"]["EndingHashKey"]),
+                    usage_factors.get(shard["ShardId"], 0),
+                )
+                for shard in shards
+            ),
+            key=lambda shard: shard.starting_hash_key,
+        )
+
+    def list_open_shards(self) -> List[dict]:
+        """
+        Lists the stream's open shards.
+        :return: list of the open shards
+        """
+        shards = []
+        request = {"StreamName": self.stream_name, "ShardFilter": {"Type": "AT_LATEST"}}
+        while True:
+            response = get_client("kinesis").list_shards(**request)
+            shards.extend(response["Shards"])
+            if not response.get("NextToken"):
+                return shards
+            request = {"NextToken": response["NextToken"]}
+
+    def get_shard_usage_factors(self, shard_ids: List[str]) -> Dict[str, float]:
+        """
+        Queries for the newest usage factor of each shard, which is the max
+        between its incoming bytes and incoming records usage.
+        The current partial period is left out, so the newest data point is
+        of a complete period.
+        Shards without shard-level metrics are omitted.
+        :param shard_ids: ids of the shards to query
+        :return: dict of shard id to its usage factor
+        """
+        current_datetime = get_complete_periods_end_time(datetime.now())
+        metric_limits = {"IncomingBytes": 1024 * 1024, "IncomingRecords": 1000}
+        shards_per_request = MAX_METRIC_DATA_QUERIES // len(metric_limits)
+        usage_factors = {}
+
+        for chunk_start in range(0, len(shard_ids), shards_per_request):
+            chunk_end = chunk_start + shards_per_request
+            chunk = shard_ids[chunk_start:chunk_end]
+            queries = [
+                {
+                    "Id": f"{metric_name.lower()}{index}",
+                    "MetricStat": {
+                        "Metric": {
+                            "Namespace": "AWS/Kinesis",
+                            "MetricName": metric_name,
+                            "Dimensions": [
+                                {"Name": "StreamName", "Value": self.stream_name},
+                                {"Name": "ShardId", "Value": shard_id},
+                            ],
+                        },
+                        "Period": METRIC_PERIOD_SECONDS,
+                        "Stat": "Sum",
+                    },
+                    "ReturnData": True,
+                }
+                for index, shard_id in enumerate(chunk)
+                for metric_name in metric_limits
+            ]
+            response = get_client("cloudwatch").get_metric_data(
+                StartTime=current_datetime - SHARD_USAGE_WINDOW,
+                EndTime=current_datetime,
+                MetricDataQueries=queries,
+            )
+
+            for result in response["MetricDataResults"]:
+                if not result["Values"]:
+                    continue
+                for metric_name, limit in metric_limits.items():
+                    id_prefix = metric_name.lower()
+                    if result["Id"].startswith(id_prefix):
+                        shard_id = chunk[int(result["Id"].removeprefix(id_prefix))]
+                        usage_factor = result["Values"][0] / (
+                            limit * METRIC_PERIOD_SECONDS
+                        )
+                        usage_factors[shard_id] = max(
+                            usage_factors.get(shard_id, 0), usage_factor
+                        )
+
+        return usage_factors
+
+    @staticmethod
+    def plan_splits(
+        shard_index: List[ShardUsage], max_operations: int
+    ) -> List[ShardUsage]:
+        """
+        Selects the hot shards to split, hottest first.
+        When most of the shards are hot, uniform scaling is preferred.
+        :param shard_index: the open shards usage
+        :param max_operations: max number of shards to split
+        :return: the shards to split
+        """
+        hot_shards = sorted(
+            (
+                shard
+                for shard in shard_index
+                if shard.usage_factor >= SCALE_UP_USAGE_THRESHOLD
+            ),
+            key=lambda shard: shard.usage_factor,
+            reverse=True,
+        )
+        if (
+            len(hot_shards)
+            > len(shard_index) * TARGETED_RESHARDING_MAX_HOT_SHARDS_RATIO
+        ):
+            return []
+
+        return hot_shards[:max_operations]
+
+    @staticmethod
+    def plan_merges(
+        shard_index: List[ShardUsage], max_operations: int
+    ) -> List[Tuple[ShardUsage, ShardUsage]]:
+        """
+        Selects pairs of adjacent shards to merge, coldest pairs first.
+        A pair is merged only if the merged shard usage stays below the target
+        usage factor, and each shard is merged at most once.
+        :param shard_index: the open shards usage, ordered by starting hash key
+        :param max_operations: max number of shard pairs to merge
+        :return: the adjacent shard pairs to merge
+        """
+        candidate_pairs = sorted(
+            (
+                (shard, adjacent_shard)
+                for shard, adjacent_shard in zip(shard_index, shard_index[1:])
+                if shard.ending_hash_key + 1 == adjacent_shard.starting_hash_key
+                and shard.usage_factor + adjacent_shard.usage_factor
+                <= MERGED_SHARD_TARGET_USAGE_FACTOR
+            ),
+            key=lambda pair: pair[0].usage_factor + pair[1].usage_factor,
+        )
+
+        merged_shard_ids = set()
+        cold_shard_pairs = []
+        for shard, adjacent_shard in candidate_pairs:
+            if len(cold_shard_pairs) == max_operations:
+                break
+            if {shard.shard_id, adjacent_shard.shard_id} & merged_shard_ids:
+                continue
+            merged_shard_ids.update((shard.shard_id, adjacent_shard.shard_id))
+            cold_shard_pairs.append((shard, adjacent_shard))
+
+        return cold_shard_pairs
+
+    def split_shard(self, shard: ShardUsage) -> None:
+        """
+        Splits a shard into two shards with even hash key ranges.
+        :param shard: the shard to split
+        """
+        new_starting_hash_key = (shard.starting_hash_key + shard.ending_hash_key) // 2
+        get_client("kinesis", mutating=True).split_shard(
+            StreamName=self.stream_name,
+            ShardToSplit=shard.shard_id,
+            NewStartingHashKey=str(new_starting_hash_key + 1),
+        )
+        logging.info(
+            f"Split hot shard. stream={self.stream_name} shard={shard.shard_id} "
+            f"usage_factor={shard.usage_factor}"
+        )
+
+    def merge_shards(self, shard: ShardUsage, adjacent_shard: ShardUsage) -> None:
+        """
+        Merges two adjacent shards.
+        :param shard: the shard with the lower hash key range
+        :param adjacent_shard: the shard with the higher hash key range
+        """
+        get_client("kinesis", mutating=True).merge_shards(
+            StreamName=self.stream_name,
+            ShardToMerge=shard.shard_id,
+            AdjacentShardToMerge=adjacent_shard.shard_id,
+        )
+        logging.info(
+            f"Merged cold shards. stream={self.stream_name} "
+            f"shards={shard.shard_id},{adjacent_shard.shard_id}"
+        )
+
+    def wait_for_active_stream(self, deadline: float) -> bool:
+        """
+        Waits for the stream to become ACTIVE.
+        :param deadline: monotonic time to stop waiting at
+        :return: True if the stream is ACTIVE, False if the deadline passed
+        """
+        while time.monotonic() < deadline:
+            response = get_client("kinesis").describe_stream_summary(
+                StreamName=self.stream_name
+            )
+            if response["StreamDescriptionSummary"]["StreamStatus"] == "ACTIVE":
+                return True
+            time.sleep(1)
+
+        return False
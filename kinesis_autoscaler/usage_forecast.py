@@ -0,0 +1,292 @@
+"""
+Seasonal stream usage forecasts
+"""
+import time
+import threading
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from kinesis_autoscaler.constants import (
+    FORECAST_WEEKLY_SMOOTHING,
+    FORECAST_DAILY_SMOOTHING,
+    USAGE_FORECAST_RETENTION_DAYS,
+    USAGE_FORECAST_CACHE_TTL_SECONDS,
+)
+
+HOUR_SECONDS = 3600
+HOURS_PER_DAY = 24
+HOURS_PER_WEEK = 7 * HOURS_PER_DAY
+# the epoch (1970-01-01) is a Thursday
+EPOCH_WEEKDAY = 3
+
+# stream name to (cache expiration monotonic time, usage forecast or None)
+_usage_forecasts: Dict[str, Tuple[float, Optional["SeasonalProfile"]]] = {}
+_usage_forecasts_lock = threading.Lock()
+
+
+class SeasonalProfile:
+    """
+    Seasonal profile of a stream used shard count.
+    Each hour of the week (UTC) holds the exponentially smoothed peak used
+    shard count of that hour in the previous weeks, and each hour of the day
+    holds the same for the previous days. Hours of the week without samples
+    fall back to their hour of the day, so new streams are forecast after
+    their first day.
+    """
+
+    def __init__(
+        self,
+        weekly_used_shard_counts: List[float],
+        weekly_samples: List[int],
+        daily_used_shard_counts: List[float],
+        daily_samples: List[int],
+        fitted_timestamp: int,
+    ):
+        """
+        Initializes SeasonalProfile instance.
+        :param weekly_used_shard_counts: smoothed peaks of each hour of the week
+        :param weekly_samples: number of peaks fitted into each hour of the week
+        :param daily_used_shard_counts: smoothed peaks of each hour of the day
+        :param daily_samples: number of peaks fitted into each hour of the day
+        :param fitted_timestamp: epoch timestamp of the end of the newest hour
+            fitted into the profile, 0 if it wasn't fitted yet
+        """
+        self.weekly_used_shard_counts = weekly_used_shard_counts
+        self.weekly_samples = weekly_samples
+        self.daily_used_shard_counts = daily_used_shard_counts
+        self.daily_samples = daily_samples
+        self.fitted_timestamp = fitted_timestamp
+
+    @classmethod
+    def empty(cls) -> "SeasonalProfile":
+        """
+        Creates a profile without samples.
+        """
+        return cls(
+            [0.0] * HOURS_PER_WEEK,
+            [0] * HOURS_PER_WEEK,
+            [0.0] * HOURS_PER_DAY,
+            [0] * HOURS_PER_DAY,
+            0,
+        )
+
+    def fit(self, data_points: List[Tuple[int, float]], end_timestamp: int) -> None:
+        """
+        Fits the peaks of the complete hours since the newest fitted hour.
+        Each hour is fitted once, so an hour is fitted only after it ended,
+        and data points of the following hours are ignored until then.
+        :param data_points: (epoch timestamp, used shard count) data points
+        :param end_timestamp: epoch timestamp the data points were queried until
+        """
+        end_timestamp -= end_timestamp % HOUR_SECONDS
+        hourly_peaks = get_hourly_peaks(
+            data_points, self.fitted_timestamp, end_timestamp
+        )
+        for hour_timestamp in sorted(hourly_peaks):
+            peak = hourly_peaks[hour_timestamp]
+            hour_of_week = get_hour_of_week(hour_timestamp)
+            hour_of_day = hour_of_week % HOURS_PER_DAY
+            self.weekly_used_shard_counts[hour_of_week] = smooth(
+                self.weekly_used_shard_counts[hour_of_week],
+                self.weekly_samples[hour_of_week],
+                peak,
+                FORECAST_WEEKLY_SMOOTHING,
+            )
+            self.weekly_samples[hour_of_week] += 1
+            self.daily_used_shard_counts[hour_of_day] = smooth(
+                self.daily_used_shard_counts[hour_of_day],
+                self.daily_samples[hour_of_day],
+                peak,
+                FORECAST_DAILY_SMOOTHING,
+            )
+            self.daily_samples[hour_of_day] += 1
+
+        self.fitted_timestamp = max(self.fitted_timestamp, end_timestamp)
+
+    def predict(self, timestamp: int) -> Optional[float]:
+        """
+        Forecasts the peak used shard count of the hour containing a timestamp.
+        :param timestamp: epoch timestamp
+        :return: the forecast used shard count, or None if the hour has no samples
+        """
+        hour_of_week = get_hour_of_week(timestamp)
+        if self.weekly_samples[hour_of_week]:
+            return self.weekly_used_shard_counts[hour_of_week]
+
+        hour_of_day = hour_of_week % HOURS_PER_DAY
+        if self.daily_samples[hour_of_day]:
+            return self.daily_used_shard_counts[hour_of_day]
+        return None
+
+    def peak(self, start_timestamp: int, end_timestamp: int) -> Optional[float]:
+        """
+        Forecasts the peak used shard count of the hours overlapping a time range.
+        :param start_timestamp: time range start epoch timestamp
+        :param end_timestamp: time range end epoch timestamp
+        :return: the forecast peak used shard count, or None if the hours have
+            no samples
+        """
+        start_timestamp -= start_timestamp % HOUR_SECONDS
+        forecasts = [
+            forecast
+            for forecast in (
+                self.predict(timestamp)
+                for timestamp in range(start_timestamp, end_timestamp, HOUR_SECONDS)
+            )
+            if forecast is not None
+        ]
+        return max(forecasts) if forecasts else None
+
+
+def get_hour_of_week(timestamp: int) -> int:
+    """
+    Returns the UTC hour of the week (0 is Monday 00:00) of a timestamp.
+    :param timestamp: epoch timestamp
+    :return: the hour of the week
+    """
+    hours = timestamp // HOUR_SECONDS
+    weekday = (hours // HOURS_PER_DAY + EPOCH_WEEKDAY) % 7
+    return weekday * HOURS_PER_DAY + hours % HOURS_PER_DAY
+
+
+def get_hourly_peaks(
+    data_points: List[Tuple[int, float]], start_timestamp: int, end_timestamp: int
+) -> Dict[int, float]:
+    """
+    Reduces data points to the peak of each hour in a time range.
+    :param data_points: (epoch timestamp, used shard count) data points
+    :param start_timestamp: time range start epoch timestamp
+    :param end_timestamp: time range end epoch timestamp
+    :return: dict of hour start epoch timestamp to its peak used shard count
+    """
+    hourly_peaks = {}
+    for timestamp, used_shard_count in data_points:
+        if start_timestamp <= timestamp < end_timestamp:
+            hour_timestamp = timestamp - timestamp % HOUR_SECONDS
+            hourly_peaks[hour_timestamp] = max(
+                hourly_peaks.get(hour_timestamp, used_shard_count), used_shard_count
+            )
+    return hourly_peaks
+
+
+def smooth(value: float, samples: int, new_value: float, smoothing: float) -> float:
+    """
+    Exponentially smooths a value, the first sample is taken as is.
+    :param value: the smoothed value
+    :param samples: number of samples smoothed into the value
+    :param new_value: the new sample
+    :param smoothing: weight of the new sample
+    :return: the new smoothed value
+    """
+    if not samples:
+        return new_value
+    return smoothing * new_value + (1 - smoothing) * value
+
+
+def get_forecast_used_shard_count(
+    stream_name: str, horizon: timedelta
+) -> Optional[float]:
+    """
+    Forecasts the peak used shard count of a stream from now until a horizon.
+    :param stream_name: name of the stream
+    :param horizon: the forecast time range duration
+    :return: the forecast peak used shard count, or None if the stream
+        has no forecast
+    """
+    profile = get_usage_forecast(stream_name)
+    if profile is None:
+        return None
+
+    now = int(datetime.now(timezone.utc).timestamp())
+    return profile.peak(now, now + int(horizon.total_seconds()))
+
+
+def get_usage_forecast(stream_name: str) -> Optional[SeasonalProfile]:
+    """
+    Returns the seasonal profile of a stream.
+    The profile is cached in memory for warm invocations.
+    :param stream_name: name of the stream
+    :return: the stream seasonal profile, or None if the stream has no forecast
+    """
+    with _usage_forecasts_lock:
+        cached = _usage_forecasts.get(stream_name)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    from kinesis_autoscaler.models.usage_forecast import KinesisUsageForecast
+
+    try:
+        profile = to_seasonal_profile(KinesisUsageForecast.get(stream_name))
+    except KinesisUsageForecast.DoesNotExist:
+        profile = None
+
+    set_usage_forecast(stream_name, profile)
+    return profile
+
+
+def load_usage_forecasts() -> Dict[str, SeasonalProfile]:
+    """
+    Scans the usage forecasts table.
+    :return: dict of stream name to its seasonal profile
+    """
+    from kinesis_autoscaler.models.usage_forecast import KinesisUsageForecast
+
+    return {
+        item.stream_name: to_seasonal_profile(item)
+        for item in KinesisUsageForecast.scan()
+    }
+
+
+def save_usage_forecast(stream_name: str, profile: SeasonalProfile) -> None:
+    """
+    Saves the stream seasonal profile in memory and in DB.
+    :param stream_name: name of the stream
+    :param profile: the stream seasonal profile
+    """
+    from kinesis_autoscaler.models.usage_forecast import KinesisUsageForecast
+
+    KinesisUsageForecast(
+        stream_name=stream_name,
+        weekly_used_shard_counts=profile.weekly_used_shard_counts,
+        weekly_samples=profile.weekly_samples,
+        daily_used_shard_counts=profile.daily_used_shard_counts,
+        daily_samples=profile.daily_samples,
+        fitted_timestamp=profile.fitted_timestamp,
+        expiration_datetime=timedelta(days=USAGE_FORECAST_RETENTION_DAYS),
+    ).save()
+    set_usage_forecast(stream_name, profile)
+
+
+def to_seasonal_profile(item) -> SeasonalProfile:
+    """
+    Converts a usage forecast item to a seasonal profile.
+    :param item: KinesisUsageForecast item
+    :return: the seasonal profile
+    """
+    return SeasonalProfile(
+        [float(value) for value in item.weekly_used_shard_counts],
+        [int(value) for value in item.weekly_samples],
+        [float(value) for value in item.daily_used_shard_counts],
+        [int(value) for value in item.daily_samples],
+        int(item.fitted_timestamp),
+    )
+
+
+def set_usage_forecast(stream_name: str, profile: Optional[SeasonalProfile]) -> None:
+    """
+    Caches the seasonal profile of a stream.
+    :param stream_name: name of the stream
+    :param profile: the stream seasonal profile
+    """
+    with _usage_forecasts_lock:
+        _usage_forecasts[stream_name] = (
+            time.monotonic() + USAGE_FORECAST_CACHE_TTL_SECONDS,
+            profile,
+        )
+
+
+def reset_cache() -> None:
+    """
+    Clears the in-memory usage forecasts.
+    """
+    with _usage_forecasts_lock:
+        _usage_forecasts.clear()
@@ -0,0 +1,241 @@
+"""
+Incrementally updated stream usage history
+"""
+import math
+import bisect
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from kinesis_autoscaler.usage_metrics import (
+    METRIC_PERIOD_SECONDS,
+    get_usage_factor_data_points,
+)
+from kinesis_autoscaler.scaling_policies import (
+    DEFAULT_SCALING_POLICY,
+    get_scaling_policies,
+)
+from kinesis_autoscaler.constants import USAGE_HISTORY_RETENTION_DAYS
+
+DEFAULT_USAGE_WINDOW = timedelta(days=1)
+
+_usage_histories: Dict[str, "UsageHistory"] = {}
+_usage_histories_lock = threading.Lock()
+
+
+class UsageHistory:
+    """
+    Rolling window of a stream used shard count data points.
+    The used shard count (usage factor multiplied by the shard count it is
+    relative to) doesn't depend on the stream's current shard count, so data
+    points remain valid across scaling operations.
+    """
+
+    def __init__(self, timestamps: List[int], used_shard_counts: List[float]):
+        """
+        Initializes UsageHistory instance.
+        :param timestamps: data points epoch timestamps, sorted ascending
+        :param used_shard_counts: data points used shard counts
+        """
+        self.timestamps = timestamps
+        self.used_shard_counts = used_shard_counts
+
+    @property
+    def last_timestamp(self) -> Optional[int]:
+        """
+        The newest data point epoch timestamp, or None if there are no data points.
+        """
+        return self.timestamps[-1] if self.timestamps else None
+
+    def merge(self, data_points: List[Tuple[int, float]]) -> None:
+        """
+        Merges new data points into the history.
+        Data points with an existing timestamp (for example, a previously
+        partial period) replace the existing data point.
+        :param data_points: (epoch timestamp, used shard count) data points
+        """
+        for timestamp, used_shard_count in sorted(data_points):
+            index = bisect.bisect_left(self.timestamps, timestamp)
+            if index < len(self.timestamps) and self.timestamps[index] == timestamp:
+                self.used_shard_counts[index] = used_shard_count
+            else:
+                self.timestamps.insert(index, timestamp)
+                self.used_shard_counts.insert(index, used_shard_count)
+
+    def trim(self, start_timestamp: int) -> None:
+        """
+        Drops the data points older than the window start.
+        :param start_timestamp: window start epoch timestamp
+        """
+        index = bisect.bisect_left(self.timestamps, start_timestamp)
+        del self.timestamps[:index]
+        del self.used_shard_counts[:index]
+
+    def window(self, start_timestamp: int) -> "UsageHistory":
+        """
+        Returns the data points of a window of the history, leaving the
+        history itself intact.
+        :param start_timestamp: window start epoch timestamp
+        :return: usage history of the data points since the window start
+        """
+        index = bisect.bisect_left(self.timestamps, start_timestamp)
+        return UsageHistory(self.timestamps[index:], self.used_shard_counts[index:])
+
+    def percentile(self, percentile: float = 100) -> Optional[float]:
+        """
+        Returns a percentile of the used shard counts (nearest rank method).
+        :param percentile: the percentile to return, 100 for the max
+        :return: the used shard count percentile, or None if there are no data points
+        """
+        return get_percentile(self.used_shard_counts, percentile)
+
+
+def get_percentile(values: List[float], percentile: float = 100) -> Optional[float]:
+    """
+    Returns a percentile of values (nearest rank method).
+    :param values: the values
+    :param percentile: the percentile to return, 100 for the max
+    :return: the values percentile, or None if there are no values
+    """
+    if not values:
+        return None
+    if percentile >= 100:
+        return max(values)
+
+    sorted_values = sorted(values)
+    rank = math.ceil(percentile / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+
+def get_used_shard_count(
+    stream_name: str,
+    shard_count: int,
+    window: timedelta = DEFAULT_USAGE_WINDOW,
+    percentile: float = 100,
+) -> Optional[float]:
+    """
+    Returns a percentile of the stream used shard count in a rolling window.
+    :param stream_name: name of the stream
+    :param shard_count: the current shard count of the stream
+    :param window: the rolling window duration
+    :param percentile: the percentile to return, 100 for the max
+    :return: the used shard count percentile, or None if there are no data points
+    """
+    return update_usage_history(stream_name, shard_count, window).percentile(percentile)
+
+
+def update_usage_history(
+    stream_name: str, shard_count: int, window: timedelta = DEFAULT_USAGE_WINDOW
+) -> UsageHistory:
+    """
+    Updates the stream usage history with the data points since its newest
+    data point, and returns the data points of a rolling window.
+    The history is kept in memory for warm invocations and persisted in DB,
+    so only the data points since the newest known data point are queried.
+    It is trimmed to the largest configured usage window, so callers with
+    different windows don't trim each other's data points.
+    :param stream_name: name of the stream
+    :param shard_count: the current shard count of the stream
+    :param window: the rolling window duration
+    :return: the stream usage history of the window
+    """
+    now = datetime.now(timezone.utc)
+    window_start_timestamp = get_window_start_timestamp(now, window)
+    history_start_timestamp = get_window_start_timestamp(
+        now, max(window, get_max_usage_window())
+    )
+
+    usage_history = load_usage_history(stream_name)
+    start_timestamp = max(usage_history.last_timestamp or 0, history_start_timestamp)
+    data_points = get_usage_factor_data_points(
+        stream_name,
+        shard_count,
+        datetime.fromtimestamp(start_timestamp, timezone.utc),
+        now,
+    )
+    logging.info(
+        "Fetched stream usage data points. "
+        f"stream={stream_name} data_points={len(data_points)} "
+        f"start={start_timestamp}"
+    )
+
+    usage_history.merge(
+        [
+            (int(timestamp.timestamp()), usage_factor * shard_count)
+            for timestamp, usage_factor in data_points
+        ]
+    )
+    usage_history.trim(history_start_timestamp)
+    save_usage_history(stream_name, usage_history)
+    return usage_history.window(window_start_timestamp)
+
+
+def get_window_start_timestamp(now: datetime, window: timedelta) -> int:
+    """
+    Returns the start of a rolling window, aligned to the metric period.
+    :param now: the window end
+    :param window: the rolling window duration
+    :return: window start epoch timestamp
+    """
+    window_start_timestamp = int(now.timestamp()) - int(window.total_seconds())
+    return window_start_timestamp - window_start_timestamp % METRIC_PERIOD_SECONDS
+
+
+def get_max_usage_window() -> timedelta:
+    """
+    Returns the largest usage window of the default and the configured
+    scaling policies.
+    :return: the largest usage window duration
+    """
+    return timedelta(
+        hours=max(
+            policy.usage_window_hours
+            for policy in [DEFAULT_SCALING_POLICY, *get_scaling_policies().values()]
+        )
+    )
+
+
+def load_usage_history(stream_name: str) -> UsageHistory:
+    """
+    Loads the stream usage history from memory, or from DB on a cold cache.
+    :param stream_name: name of the stream
+    :return: the stream usage history
+    """
+    with _usage_histories_lock:
+        usage_history = _usage_histories.get(stream_name)
+    if usage_history:
+        return usage_history
+
+    from kinesis_autoscaler.models.usage_history import KinesisUsageHistory
+
+    try:
+        item = KinesisUsageHistory.get(stream_name)
+        return UsageHistory(list(item.timestamps), list(item.used_shard_counts))
+    except KinesisUsageHistory.DoesNotExist:
+        return UsageHistory([], [])
+
+
+def save_usage_history(stream_name: str, usage_history: UsageHistory) -> None:
+    """
+    Saves the stream usage history in memory and in DB.
+    :param stream_name: name of the stream
+    :param usage_history: the stream usage history
+    """
+    from kinesis_autoscaler.models.usage_history import KinesisUsageHistory
+
+    KinesisUsageHistory(
+        stream_name=stream_name,
+        timestamps=usage_history.timestamps,
+        used_shard_counts=usage_history.used_shard_counts,
+        expiration_datetime=timedelta(days=USAGE_HISTORY_RETENTION_DAYS),
+    ).save()
+    with _usage_histories_lock:
+        _usage_histories[stream_name] = usage_history
+
+
+def reset_cache() -> None:
+    """
+    Clears the in-memory usage histories.
+    """
+    with _usage_histories_lock:
+        _usage_histories.clear()
@@ -0,0 +1,222 @@
+"""
+Kinesis stream usage factor metric queries
+"""
+from typing import List, Optional, Tuple
+from datetime import datetime
+from kinesis_autoscaler.aws_clients import get_client
+
+USAGE_FACTOR_METRIC_ID = "maxUsageFactor"
+METRIC_PERIOD_SECONDS = 300
+
+
+def build_usage_factor_queries(
+    stream_name: str,
+    shard_count: int,
+    id_prefix: str = "",
+    period: int = METRIC_PERIOD_SECONDS,
+) -> List[dict]:
+    """
+    Builds the metric data queries calculating the stream usage factor.
+    The usage factor is the max between the incoming bytes and incoming records
+    usage of the stream, relative to its shard count write limits, and the
+    outgoing bytes usage relative to its shard count shared read limit.
+    Enhanced fan-out consumers have their own dedicated read throughput,
+    so only the GetRecords (shared throughput) bytes are considered.
+    The queries are limited to 10 metrics, the max supported by alarms.
+    Only the usage factor query (with the prefixed USAGE_FACTOR_METRIC_ID id)
+    returns data.
+    :param stream_name: name of the stream to query
+    :param shard_count: shard count the usage factor is relative to
+    :param id_prefix: prefix for the query ids, used for querying multiple
+        streams in a single request (must start with a lowercase letter)
+    :param period: metrics aggregation period in seconds
+    :return: list of metric data queries
+    """
+    return [
+        {
+            "Id": f"{id_prefix}shardCount",
+            "Expression": str(shard_count),
+            "ReturnData": False,
+        },
+        {
+            "Id": f"{id_prefix}incomingBytes",
+            "MetricStat": {
+                "Metric": {
+                    "Namespace": "AWS/Kinesis",
+                    "MetricName": "IncomingBytes",
+                    "Dimensions": [
+                        {"Name": "StreamName", "Value": stream_name},
+                    ],
+                },
+                "Period": period,
+                "Stat": "Sum",
+            },
+            "ReturnData": False,
+        },
+        {
+            "Id": f"{id_prefix}incomingRecords",
+            "MetricStat": {
+                "Metric": {
+                    "Namespace": "AWS/Kinesis",
+                    "MetricName": "IncomingRecords",
+                    "Dimensions": [
+                        {"Name": "StreamName", "Value": stream_name},
+                    ],
+                },
+                "Period": period,
+                "Stat": "Sum",
+            },
+            "ReturnData": False,
+        },
+        {
+            "Id": f"{id_prefix}outgoingBytes",
+            "MetricStat": {
+                "Metric": {
+                    "Namespace": "AWS/Kinesis",
+                    "MetricName": "GetRecords.Bytes",
+                    "Dimensions": [
+                        {"Name": "StreamName", "Value": stream_name},
+                    ],
+                },
+                "Period": period,
+                "Stat": "Sum",
+            },
+            "ReturnData": False,
+        },
+        {
+            "Id": f"{id_prefix}incomingBytesFilledWithZeroForMissingDataPoints",
+            "Expression": f"FILL({id_prefix}incomingBytes,0)",
+            "ReturnData": False,
+        },
+        {
+            "Id": f"{id_prefix}incomingRecordsFilledWithZeroForMissingDataPoints",
+            "Expression": f"FILL({id_prefix}incomingRecords,0)",
+            "ReturnData": False,
+        },
+        {
+            "Id": f"{id_prefix}incomingBytesUsageFactor",
+            "Expression": (
+                f"{id_prefix}incomingBytesFilledWithZeroForMissingDataPoints"
+                f"/(1024*1024*{period}*{id_prefix}shardCount)"
+            ),
+            "ReturnData": False,
+        },
+        {
+            "Id": f"{id_prefix}incomingRecordsUsageFactor",
+            "Expression": (
+                f"{id_prefix}incomingRecordsFilledWithZeroForMissingDataPoints"
+                f"/(1000*{period}*{id_prefix}shardCount)"
+            ),
+            "ReturnData": False,
+        },
+        {
+            "Id": f"{id_prefix}outgoingBytesUsageFactor",
+            "Expression": (
+                f"FILL({id_prefix}outgoingBytes,0)"
+                f"/(2*1024*1024*{period}*{id_prefix}shardCount)"
+            ),
+            "ReturnData": False,
+        },
+        {
+            "Id": f"{id_prefix}{USAGE_FACTOR_METRIC_ID}",
+            "Expression": (
+                f"MAX([{id_prefix}incomingBytesUsageFactor,"
+                f"{id_prefix}incomingRecordsUsageFactor,"
+                f"{id_prefix}outgoingBytesUsageFactor])"
+            ),
+            "ReturnData": True,
+        },
+    ]
+
+
+def get_complete_periods_end_time(
+    end_time: datetime, period: int = METRIC_PERIOD_SECONDS
+) -> datetime:
+    """
+    Aligns a query end time to the start of its metric period, so the newest
+    returned data point is of a complete period. The current period's sums
+    cover only its elapsed part, which under-estimates the usage factor.
+    :param end_time: the query end time
+    :param period: metrics aggregation period in seconds
+    :return: the end time of the newest complete period
+    """
+    return datetime.fromtimestamp(
+        end_time.timestamp() // period * period, end_time.tzinfo
+    )
+
+
+def get_usage_factors(
+    stream_name: str, shard_count: int, start_time: datetime, end_time: datetime
+) -> List[float]:
+    """
+    Queries for the stream usage factor data points in a time range.
+    :param stream_name: name of the stream to query
+    :param shard_count: shard count the usage factor is relative to
+    :param start_time: query time range start
+    :param end_time: query time range end
+    :return: the usage factor data points, ordered from the newest to the oldest
+    """
+    return [
+        value
+        for _, value in get_usage_factor_data_points(
+            stream_name, shard_count, start_time, end_time
+        )
+    ]
+
+
+def get_usage_factor_data_points(
+    stream_name: str, shard_count: int, start_time: datetime, end_time: datetime
+) -> List[Tuple[datetime, float]]:
+    """
+    Queries for the stream usage factor data points in a time range,
+    including their timestamps.
+    :param stream_name: name of the stream to query
+    :param shard_count: shard count the usage factor is relative to
+    :param start_time: query time range start
+    :param end_time: query time range end
+    :return: (timestamp, usage factor) data points, ordered from the newest
+        to the oldest
+    """
+    response = get_client("cloudwatch").get_metric_data(
+        StartTime=start_time,
+        EndTime=end_time,
+        MetricDataQueries=build_usage_factor_queries(stream_name, shard_count),
+    )
+    result = response["MetricDataResults"][0]
+    return list(zip(result["Timestamps"], result["Values"]))
+
+
+def get_max_iterator_age(
+    stream_name: str, start_time: datetime, end_time: datetime
+) -> Optional[float]:
+    """
+    Queries for the stream's max GetRecords iterator age in a time range,
+    which indicates how far behind the stream's consumers are.
+    :param stream_name: name of the stream to query
+    :param start_time: query time range start
+    :param end_time: query time range end
+    :return: the max iterator age in milliseconds, or None if missing
+    """
+    response = get_client("cloudwatch").get_metric_data(
+        StartTime=start_time,
+        EndTime=end_time,
+        MetricDataQueries=[
+            {
+                "Id": "iteratorAge",
+                "MetricStat": {
+                    "Metric": {
+                        "Namespace": "AWS/Kinesis",
+                        "MetricName": "GetRecords.IteratorAgeMilliseconds",
+                        "Dimensions": [
+                            {"Name": "StreamName", "Value": stream_name},
+                        ],
+                    },
+                    "Period": METRIC_PERIOD_SECONDS,
+                    "Stat": "Maximum",
+                },
+                "ReturnData": True,
+            }
+        ],
+    )
+    values = response["MetricDataResults"][0]["Values"]
+    return max(values) if values else None
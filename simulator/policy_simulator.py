@@ -0,0 +1,413 @@
+"""
+Offline scaling policy simulator.
+Replays recorded per-stream metric histories through the scalers' target
+calculations, modeling the alarms evaluation periods, the resharding delay,
+the cooldowns and the UpdateShardCount limits, and reports the shard-hours,
+the time spent above 100% usage and the number of scaling operations.
+
+Input: CSV or Parquet file with the columns timestamp (epoch seconds or ISO 8601),
+stream_name, incoming_bytes, incoming_records and optionally outgoing_bytes
+(GetRecords.Bytes), each row holding the sums of a single period (e.g. 1 minute)
+of a single stream. Requires numpy, and pyarrow for Parquet files (and faster
+CSV parsing).
+
+Usage (from the project root):
+    python -m simulator.policy_simulator metrics.csv [--target-usage-factor 0.4 0.5]
+
+Parameters given multiple values are swept, simulating each combination.
+"""
+import csv
+import json
+import math
+import argparse
+import itertools
+from typing import Dict, List, NamedTuple, Optional
+import numpy as np
+from kinesis_autoscaler.kinesis_upscaler import KinesisUpscaler
+from kinesis_autoscaler.kinesis_downscaler import KinesisDownscaler
+from kinesis_autoscaler.scaling_planner import KinesisScalingPlanner
+from kinesis_autoscaler.scaling_policies import DEFAULT_SCALING_POLICY, ScalingPolicy
+from kinesis_autoscaler.usage_history import get_percentile
+from kinesis_autoscaler.usage_metrics import METRIC_PERIOD_SECONDS
+from kinesis_autoscaler.constants import (
+    UPSCALE_MODE,
+    SCALE_UP_USAGE_THRESHOLD,
+    SCALE_DOWN_USAGE_THRESHOLD,
+    MAX_SCALING_OPERATIONS_PER_DAY,
+)
+
+# per shard write (bytes, records) and shared read (bytes) limits per second
+SHARD_INCOMING_BYTES_LIMIT = 1024 * 1024
+SHARD_INCOMING_RECORDS_LIMIT = 1000
+SHARD_OUTGOING_BYTES_LIMIT = 2 * 1024 * 1024
+
+DAY_SECONDS = 86400
+
+
+class StreamMetrics(NamedTuple):
+    """
+    Recorded metric histories of multiple streams, as [stream, step] arrays
+    """
+
+    stream_names: List[str]
+    step_seconds: int
+    incoming_bytes: np.ndarray
+    incoming_records: np.ndarray
+    outgoing_bytes: np.ndarray
+
+
+class SimulationConfig(NamedTuple):
+    """
+    Simulated scaling configuration
+    """
+
+    policy: ScalingPolicy = DEFAULT_SCALING_POLICY
+    upscale_mode: str = UPSCALE_MODE
+    scale_up_threshold: float = SCALE_UP_USAGE_THRESHOLD
+    scale_down_threshold: float = SCALE_DOWN_USAGE_THRESHOLD
+    alarm_period_seconds: int = METRIC_PERIOD_SECONDS
+    # the scale-down alarm requires a day of low usage data points
+    scale_down_evaluation_periods: int = DAY_SECONDS // METRIC_PERIOD_SECONDS
+    reshard_delay_seconds: int = 600
+    scale_up_cooldown_seconds: int = int(
+        KinesisUpscaler.cooldown_period.total_seconds()
+    )
+    scale_down_cooldown_seconds: int = int(
+        KinesisDownscaler.cooldown_period.total_seconds()
+    )
+
+
+def load_stream_metrics(path: str) -> StreamMetrics:
+    """
+    Loads recorded stream metrics from a CSV or Parquet file.
+    Missing data points are considered as zero.
+    :param path: path of the CSV or Parquet file
+    :return: the streams metric histories
+    """
+    columns = read_columns(path)
+    timestamps = to_epoch_seconds(columns["timestamp"])
+    stream_names, stream_indexes = np.unique(
+        columns["stream_name"], return_inverse=True
+    )
+    unique_timestamps = np.unique(timestamps)
+    step_seconds = (
+        int(np.diff(unique_timestamps).min()) if len(unique_timestamps) > 1 else 60
+    )
+    step_indexes = (timestamps - unique_timestamps[0]) // step_seconds
+    shape = (len(stream_names), int(step_indexes.max()) + 1)
+
+    def to_array(column: str) -> np.ndarray:
+        array = np.zeros(shape, dtype=np.float32)
+        if column in columns:
+            array[stream_indexes, step_indexes] = columns[column]
+        return array
+
+    return StreamMetrics(
+        [str(stream_name) for stream_name in stream_names],
+        step_seconds,
+        to_array("incoming_bytes"),
+        to_array("incoming_records"),
+        to_array("outgoing_bytes"),
+    )
+
+
+def read_columns(path: str) -> Dict[str, np.ndarray]:
+    """
+    Reads the columns of a CSV or Parquet file.
+    :param path: path of the CSV or Parquet file
+    :return: dict of column name to its values
+    """
+    if path.endswith(".parquet"):
+        import pyarrow.parquet
+
+        table = pyarrow.parquet.read_table(path)
+    else:
+        try:
+            import pyarrow.csv
+
+            table = pyarrow.csv.read_csv(path)
+        except ImportError:
+            with open(path, newline="") as csv_file:
+                rows = list(csv.DictReader(csv_file))
+            return {
+                column: np.array([row[column] for row in rows])
+                for column in (rows[0] if rows else {})
+            }
+
+    return {
+        column: table.column(column).to_numpy(zero_copy_only=False)
+        for column in table.column_names
+    }
+
+
+def to_epoch_seconds(values: np.ndarray) -> np.ndarray:
+    """
+    Converts timestamps (epoch seconds, ISO 8601 strings or datetimes)
+    to epoch seconds.
+    :param values: the timestamps
+    :return: the epoch seconds timestamps
+    """
+    try:
+        return values.astype(np.float64).astype(np.int64)
+    except (TypeError, ValueError):
+        datetimes = np.array(
+            [str(value).replace("Z", "").split("+")[0] for value in values],
+            dtype="datetime64[s]",
+        )
+        return datetimes.astype(np.int64)
+
+
+def rolling_max(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Calculates the trailing rolling max of each row, in O(log(window)) passes.
+    The first window - 1 values of each row are the max of the available values.
+    :param values: [row, column] values
+    :param window: the rolling window size
+    :return: [row, column] rolling max values
+    """
+    result = values.copy()
+    span = 1
+    while span < window:
+        step = min(span, window - span)
+        np.maximum(result[:, step:], result[:, :-step], out=result[:, step:])
+        span += step
+    return result
+
+
+def simulate(
+    metrics: StreamMetrics,
+    config: SimulationConfig = SimulationConfig(),
+    initial_shard_counts: Optional[List[int]] = None,
+) -> dict:
+    """
+    Replays the streams metric histories through the scaling process.
+    The alarms are evaluated at the end of each alarm period for all the streams
+    at once, and only the triggered alarms go through the scalers' calculations.
+    Each stream keeps its capacity until its resharding delay ends, while its
+    alarms are updated with the target shard count immediately, as they are by
+    the scalers.
+    :param metrics: the streams metric histories
+    :param config: the simulated scaling configuration
+    :param initial_shard_counts: the streams shard counts at the start of the
+        simulation, defaults to the shard count of the policy's target usage factor
+    :return: report containing the results of each stream and their total
+    """
+    step_seconds = metrics.step_seconds
+    steps_per_period = max(config.alarm_period_seconds // step_seconds, 1)
+    period_seconds = steps_per_period * step_seconds
+    stream_count, step_count = metrics.incoming_bytes.shape
+    period_count = math.ceil(step_count / steps_per_period)
+
+    def used_shard_counts(duration: int, reshape_periods: bool) -> np.ndarray:
+        arrays = []
+        for values, limit in (
+            (metrics.incoming_bytes, SHARD_INCOMING_BYTES_LIMIT),
+            (metrics.incoming_records, SHARD_INCOMING_RECORDS_LIMIT),
+            (metrics.outgoing_bytes, SHARD_OUTGOING_BYTES_LIMIT),
+        ):
+            padded = np.zeros(
+                (stream_count, period_count * steps_per_period), dtype=np.float32
+            )
+            padded[:, :step_count] = values
+            periods = padded.reshape(stream_count, period_count, steps_per_period)
+            if reshape_periods:
+                periods = periods.sum(axis=2)
+            arrays.append(periods / (limit * duration))
+        return np.maximum.reduce(arrays)
+
+    # used shard counts of each alarm period, and of each step in each period
+    period_used = used_shard_counts(period_seconds, reshape_periods=True)
+    step_used = used_shard_counts(step_seconds, reshape_periods=False)
+    evaluation_periods = config.scale_down_evaluation_periods
+    period_used_max = rolling_max(period_used, evaluation_periods)
+
+    policy = config.policy
+    window_periods = max(policy.usage_window_hours * 3600 // period_seconds, 1)
+    day_periods = DAY_SECONDS // period_seconds
+    reshard_periods = max(math.ceil(config.reshard_delay_seconds / period_seconds), 1)
+    scale_up_cooldown_periods = config.scale_up_cooldown_seconds / period_seconds
+    scale_down_cooldown_periods = config.scale_down_cooldown_seconds / period_seconds
+
+    if initial_shard_counts is None:
+        initial_shard_counts = [
+            policy.clamp(max(math.ceil(used / policy.target_usage_factor), 1))
+            for used in period_used[:, 0]
+        ]
+    shard_counts = np.array(initial_shard_counts, dtype=np.int64)
+    alarm_shard_counts = shard_counts.copy()
+    resharding_end = np.full(stream_count, -1)
+    alarms_reset = np.zeros(stream_count)
+    last_scale_up = np.full(stream_count, -np.inf)
+    last_scaling = np.full(stream_count, -np.inf)
+    operations = np.full((stream_count, MAX_SCALING_OPERATIONS_PER_DAY), -np.inf)
+    scale_up_alarms = np.zeros(stream_count, dtype=bool)
+    scale_down_alarms = np.zeros(stream_count, dtype=bool)
+
+    shard_seconds = np.zeros(stream_count)
+    overloaded_seconds = np.zeros(stream_count)
+    scale_up_operations = np.zeros(stream_count, dtype=np.int64)
+    scale_down_operations = np.zeros(stream_count, dtype=np.int64)
+    denied_operations = np.zeros(stream_count, dtype=np.int64)
+
+    for period in range(period_count):
+        resharded = resharding_end == period
+        shard_counts[resharded] = alarm_shard_counts[resharded]
+        resharding_end[resharded] = -1
+
+        shard_seconds += shard_counts * period_seconds
+        overloaded_seconds += (step_used[:, period, :] > shard_counts[:, None]).sum(
+            axis=1
+        ) * step_seconds
+
+        # alarms invoke their actions only when changing to the ALARM state
+        scale_up_breach = (
+            period_used[:, period] >= config.scale_up_threshold * alarm_shard_counts
+        )
+        scale_down_breach = (period - alarms_reset + 1 >= evaluation_periods) & (
+            period_used_max[:, period]
+            <= config.scale_down_threshold * alarm_shard_counts
+        )
+        scale_up_triggered = scale_up_breach & ~scale_up_alarms
+        scale_down_triggered = scale_down_breach & ~scale_down_alarms
+        scale_up_alarms = scale_up_breach
+        scale_down_alarms = scale_down_breach
+
+        # streams that are still resharding cancel their triggered scaling
+        triggered = (scale_up_triggered | scale_down_triggered) & (resharding_end < 0)
+        for stream in np.flatnonzero(triggered):
+            current_shard_count = int(shard_counts[stream])
+            is_scale_up = bool(scale_up_triggered[stream])
+            if is_scale_up:
+                if period - last_scale_up[stream] < scale_up_cooldown_periods:
+                    continue
+                usage_factor = None
+                if config.upscale_mode == "PROPORTIONAL":
+                    usage_factor = period_used[stream, period] / current_shard_count
+                ideal_shard_count = KinesisUpscaler.calculate_target_shard_count(
+                    current_shard_count, usage_factor, policy
+                )
+            else:
+                if period - last_scaling[stream] < scale_down_cooldown_periods:
+                    continue
+                window_start = max(period - window_periods + 1, 0)
+                window_end = period + 1
+                max_used_shard_count = get_percentile(
+                    period_used[stream, window_start:window_end].tolist(),
+                    policy.usage_percentile,
+                )
+                ideal_shard_count = KinesisDownscaler.calculate_target_shard_count(
+                    current_shard_count,
+                    max_used_shard_count / current_shard_count,
+                    policy,
+                )
+
+            remaining_operations = MAX_SCALING_OPERATIONS_PER_DAY - int(
+                (operations[stream] > period - day_periods).sum()
+            )
+            plan = KinesisScalingPlanner.plan(
+                current_shard_count, ideal_shard_count, remaining_operations
+            )
+            if not plan:
+                if ideal_shard_count != current_shard_count:
+                    denied_operations[stream] += 1
+                continue
+
+            operations[stream, operations[stream].argmin()] = period
+            alarm_shard_counts[stream] = plan[0]
+            resharding_end[stream] = period + reshard_periods
+            alarms_reset[stream] = period
+            scale_up_alarms[stream] = scale_down_alarms[stream] = False
+            last_scaling[stream] = period
+            if is_scale_up:
+                last_scale_up[stream] = period
+                scale_up_operations[stream] += 1
+            else:
+                scale_down_operations[stream] += 1
+
+    streams = {
+        stream_name: {
+            "shard_hours": round(float(shard_seconds[index]) / 3600, 2),
+            "overloaded_hours": round(float(overloaded_seconds[index]) / 3600, 2),
+            "scale_up_operations": int(scale_up_operations[index]),
+            "scale_down_operations": int(scale_down_operations[index]),
+            "denied_operations": int(denied_operations[index]),
+            "final_shard_count": int(alarm_shard_counts[index]),
+        }
+        for index, stream_name in enumerate(metrics.stream_names)
+    }
+    simulated_hours = period_count * period_seconds / 3600
+    total = {
+        key: round(sum(stream[key] for stream in streams.values()), 2)
+        for key in (
+            "shard_hours",
+            "overloaded_hours",
+            "scale_up_operations",
+            "scale_down_operations",
+            "denied_operations",
+        )
+    }
+    total["overloaded_pct"] = round(
+        100 * total["overloaded_hours"] / max(simulated_hours * stream_count, 1e-9),
+        3,
+    )
+    return {"streams": streams, "total": total}
+
+
+def main() -> None:
+    """
+    Parses the command line arguments, simulates the metrics file with each
+    combination of the swept parameters, and prints the reports as JSON.
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("path", help="CSV or Parquet metrics file")
+    parser.add_argument("--target-usage-factor", type=float, nargs="+")
+    parser.add_argument("--scale-up-pct", type=int, nargs="+")
+    parser.add_argument("--scale-up-threshold", type=float, nargs="+")
+    parser.add_argument("--scale-down-threshold", type=float, nargs="+")
+    parser.add_argument("--upscale-mode", nargs="+", choices=("STEP", "PROPORTIONAL"))
+    parser.add_argument("--reshard-delay-minutes", type=float, nargs="+")
+    parser.add_argument(
+        "--per-stream", action="store_true", help="include each stream results"
+    )
+    args = parser.parse_args()
+
+    metrics = load_stream_metrics(args.path)
+    defaults = SimulationConfig()
+    sweep = {
+        "target_usage_factor": args.target_usage_factor
+        or [defaults.policy.target_usage_factor],
+        "scale_up_pct": args.scale_up_pct or [defaults.policy.scale_up_pct],
+        "scale_up_threshold": args.scale_up_threshold or [defaults.scale_up_threshold],
+        "scale_down_threshold": args.scale_down_threshold
+        or [defaults.scale_down_threshold],
+        "upscale_mode": args.upscale_mode or [defaults.upscale_mode],
+        "reshard_delay_minutes": args.reshard_delay_minutes
+        or [defaults.reshard_delay_seconds / 60],
+    }
+
+    results = []
+    for values in itertools.product(*sweep.values()):
+        parameters = dict(zip(sweep, values))
+        config = SimulationConfig(
+            policy=defaults.policy._replace(
+                target_usage_factor=parameters["target_usage_factor"],
+                scale_up_pct=parameters["scale_up_pct"],
+            ),
+            upscale_mode=parameters["upscale_mode"],
+            scale_up_threshold=parameters["scale_up_threshold"],
+            scale_down_threshold=parameters["scale_down_threshold"],
+            reshard_delay_seconds=int(parameters["reshard_delay_minutes"] * 60),
+        )
+        report = simulate(metrics, config)
+        result = {"parameters": parameters, "total": report["total"]}
+        if args.per_stream:
+            result["streams"] = report["streams"]
+        results.append(result)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,7 @@
 CloudWatch client mocker
 """
 from typing import List
+from datetime import datetime, timedelta, timezone
 from pytest_mock import MockerFixture
 
 
@@ -37,8 +38,19 @@ class CloudWatchClientMocker:
         return self.mocker.patch.object(self.client, "set_alarm_state")
 
     def get_metric_data(self, metric_data_results: List[float]) -> MockerFixture:
+        now = datetime.now(timezone.utc)
         return self.mocker.patch.object(
             self.client,
             "get_metric_data",
-            return_value={"MetricDataResults": [{"Values": metric_data_results}]},
+            return_value={
+                "MetricDataResults": [
+                    {
+                        "Values": metric_data_results,
+                        "Timestamps": [
+                            now - timedelta(minutes=5 * index)
+                            for index in range(len(metric_data_results))
+                        ],
+                    }
+                ]
+            },
         )
@@ -2,6 +2,7 @@
 Kinesis client mocker
 """
 from pytest_mock import MockerFixture
+from kinesis_autoscaler.aws_clients import get_client
 
 
 class KinesisClientMocker:
@@ -14,12 +15,17 @@ class KinesisClientMocker:
         self.client = client
         self.mocker = mocker
 
-    def describe_stream_summary(self, open_shard_count: int) -> MockerFixture:
+    def describe_stream_summary(
+        self, open_shard_count: int, stream_status: str = "ACTIVE"
+    ) -> MockerFixture:
         return self.mocker.patch.object(
             self.client,
             "describe_stream_summary",
             return_value={
-                "StreamDescriptionSummary": {"OpenShardCount": open_shard_count}
+                "StreamDescriptionSummary": {
+                    "OpenShardCount": open_shard_count,
+                    "StreamStatus": stream_status,
+                }
             },
         )
 
@@ -30,7 +36,7 @@ class KinesisClientMocker:
         target_shard_count: int,
     ) -> MockerFixture:
         return self.mocker.patch.object(
-            self.client,
+            get_client("kinesis", mutating=True),
             "update_shard_count",
             return_value={
                 "StreamName": stream_name,
@@ -38,3 +44,15 @@ class KinesisClientMocker:
                 "TargetShardCount": target_shard_count,
             },
         )
+
+    def describe_limits(
+        self, shard_limit: int = 500, open_shard_count: int = 0
+    ) -> MockerFixture:
+        return self.mocker.patch.object(
+            self.client,
+            "describe_limits",
+            return_value={
+                "ShardLimit": shard_limit,
+                "OpenShardCount": open_shard_count,
+            },
+        )
@@ -0,0 +1,30 @@
+"""
+Stateful in-process fakes of the AWS services used by the autoscaler
+"""
+from tests.aws_fakes.clock import Clock, VirtualClock
+from tests.aws_fakes.kinesis import FakeKinesisClient
+from tests.aws_fakes.cloudwatch import FakeCloudWatchClient, StreamLoad
+from tests.aws_fakes.tagging import FakeTaggingClient
+from tests.aws_fakes.dynamodb import MODELS, fake_dynamodb, recreate_model_table
+from tests.aws_fakes.fake_aws import (
+    FakeAWS,
+    SCALE_UP_TOPIC_ARN,
+    SCALE_DOWN_TOPIC_ARN,
+    EMERGENCY_SCALE_UP_TOPIC_ARN,
+)
+
+__all__ = [
+    "Clock",
+    "VirtualClock",
+    "FakeKinesisClient",
+    "FakeCloudWatchClient",
+    "StreamLoad",
+    "FakeTaggingClient",
+    "MODELS",
+    "fake_dynamodb",
+    "recreate_model_table",
+    "FakeAWS",
+    "SCALE_UP_TOPIC_ARN",
+    "SCALE_DOWN_TOPIC_ARN",
+    "EMERGENCY_SCALE_UP_TOPIC_ARN",
+]
@@ -0,0 +1,96 @@
+"""
+Fake AWS service client base
+"""
+import random
+import threading
+from collections import Counter
+from typing import Dict, Tuple
+from botocore.exceptions import ClientError
+from tests.aws_fakes.clock import Clock
+
+ALL_OPERATIONS = "*"
+
+
+class FakeAWSClient:
+    """
+    Base of the fake AWS service clients.
+    Counts the calls of each operation, and injects latency and throttling errors.
+    The service state is guarded by a single lock, so the fakes can be called
+    from concurrent threads.
+    """
+
+    throttling_error_code = "Throttling"
+
+    def __init__(self, clock: Clock = None, seed: int = 0):
+        """
+        Initializes FakeAWSClient instance.
+        :param clock: clock driving the service time, defaults to real time
+        :param seed: seed of the throttling errors randomness
+        """
+        self.clock = clock or Clock()
+        self.call_counts = Counter()
+        self.latencies: Dict[str, float] = {}
+        self.throttling_rates: Dict[str, float] = {}
+        self.lock = threading.RLock()
+        self.random = random.Random(seed)
+
+    def inject_latency(self, seconds: float, operation: str = ALL_OPERATIONS) -> None:
+        """
+        Adds latency to the calls of an operation.
+        :param seconds: latency of each call in seconds
+        :param operation: the operation name (e.g. UpdateShardCount), or all
+            operations by default
+        """
+        self.latencies[operation] = seconds
+
+    def inject_throttling(self, rate: float, operation: str = ALL_OPERATIONS) -> None:
+        """
+        Fails a ratio of the calls of an operation with a throttling error.
+        :param rate: ratio of the throttled calls, between 0 and 1
+        :param operation: the operation name (e.g. UpdateShardCount), or all
+            operations by default
+        """
+        self.throttling_rates[operation] = rate
+
+    def record_call(self, operation: str) -> None:
+        """
+        Records a call of an operation, applying its injected latency and
+        throttling. Called by each operation before accessing the service state.
+        :param operation: the operation name
+        """
+        with self.lock:
+            self.call_counts[operation] += 1
+            throttling_rate = self.throttling_rates.get(
+                operation, self.throttling_rates.get(ALL_OPERATIONS, 0)
+            )
+            throttled = throttling_rate and self.random.random() < throttling_rate
+
+        latency = self.latencies.get(operation, self.latencies.get(ALL_OPERATIONS))
+        if latency:
+            self.clock.sleep(latency)
+        if throttled:
+            raise self.error(operation, self.throttling_error_code, "Rate exceeded")
+
+    @staticmethod
+    def error(operation: str, code: str, message: str) -> ClientError:
+        """
+        Creates an AWS service error.
+        :param operation: the failed operation name
+        :param code: the error code
+        :param message: the error message
+        :return: the error, as raised by botocore clients
+        """
+        return ClientError({"Error": {"Code": code, "Message": message}}, operation)
+
+    @staticmethod
+    def paginate(items: list, request: dict, max_results: int) -> Tuple[list, dict]:
+        """
+        Returns a page of items according to the request's NextToken.
+        :param items: all the items
+        :param request: the request parameters
+        :param max_results: max items per page
+        :return: the page items, and the response pagination fields
+        """
+        start = int(request.get("NextToken") or 0)
+        end = start + max_results
+        return items[start:end], ({"NextToken": str(end)} if end < len(items) else {})
@@ -0,0 +1,62 @@
+"""
+Clocks driving the fake AWS services time
+"""
+import time
+import threading
+
+
+class Clock:
+    """
+    Real time clock
+    """
+
+    @staticmethod
+    def time() -> float:
+        """
+        Returns the current epoch time in seconds.
+        """
+        return time.time()
+
+    @staticmethod
+    def sleep(seconds: float) -> None:
+        """
+        Waits for a duration.
+        :param seconds: the duration in seconds
+        """
+        time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """
+    Manually advanced clock, sleeping advances the clock without waiting
+    """
+
+    def __init__(self, start_time: float = None):
+        """
+        Initializes VirtualClock instance.
+        :param start_time: the initial epoch time, defaults to the current time
+        """
+        self.current_time = time.time() if start_time is None else start_time
+        self.lock = threading.Lock()
+
+    def time(self) -> float:
+        """
+        Returns the current virtual epoch time in seconds.
+        """
+        with self.lock:
+            return self.current_time
+
+    def sleep(self, seconds: float) -> None:
+        """
+        Advances the clock by a duration.
+        :param seconds: the duration in seconds
+        """
+        self.advance(seconds)
+
+    def advance(self, seconds: float) -> None:
+        """
+        Advances the clock by a duration.
+        :param seconds: the duration in seconds
+        """
+        with self.lock:
+            self.current_time += seconds
@@ -0,0 +1,646 @@
+"""
+Fake CloudWatch service client
+"""
+import copy
+import json
+import operator
+from bisect import bisect_right
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from tests.aws_fakes.base import FakeAWSClient
+from tests.aws_fakes.clock import Clock
+from tests.aws_fakes.kinesis import FakeKinesisClient
+
+MAX_DESCRIBE_ALARM_NAMES = 100
+DEFAULT_DESCRIBE_ALARMS_MAX_RECORDS = 50
+DEFAULT_METRIC_PERIOD_SECONDS = 300
+
+# (action topic ARNs, SNS notification message, EventBridge state change event)
+# of an alarm state change
+Notification = Tuple[List[str], dict, dict]
+
+COMPARISON_OPERATORS = {
+    "GreaterThanOrEqualToThreshold": operator.ge,
+    "GreaterThanThreshold": operator.gt,
+    "LessThanThreshold": operator.lt,
+    "LessThanOrEqualToThreshold": operator.le,
+}
+
+
+class StreamLoad(NamedTuple):
+    """
+    Kinesis stream load, used for generating its metrics
+    """
+
+    incoming_bytes_per_second: float = 0
+    incoming_records_per_second: float = 0
+    outgoing_bytes_per_second: float = 0
+    iterator_age_ms: float = 0
+    write_throttled_records_per_second: float = 0
+
+
+# metric name to (StreamLoad field, whether the metric is a rate)
+KINESIS_METRICS = {
+    "IncomingBytes": ("incoming_bytes_per_second", True),
+    "IncomingRecords": ("incoming_records_per_second", True),
+    "GetRecords.Bytes": ("outgoing_bytes_per_second", True),
+    "GetRecords.IteratorAgeMilliseconds": ("iterator_age_ms", False),
+    "WriteProvisionedThroughputExceeded": (
+        "write_throttled_records_per_second",
+        True,
+    ),
+}
+
+
+class Series(list):
+    """
+    Metric math time series, aligned to the queried timestamps.
+    Missing data points are None, and propagate through arithmetic.
+    """
+
+    def apply(self, other, function: Callable) -> "Series":
+        others = other if isinstance(other, list) else [other] * len(self)
+        return Series(
+            None
+            if value is None or other_value is None
+            else function(value, other_value)
+            for value, other_value in zip(self, others)
+        )
+
+    def __add__(self, other):
+        return self.apply(other, operator.add)
+
+    def __sub__(self, other):
+        return self.apply(other, operator.sub)
+
+    def __mul__(self, other):
+        return self.apply(other, operator.mul)
+
+    def __truediv__(self, other):
+        return self.apply(other, operator.truediv)
+
+    def __radd__(self, other):
+        return self.apply(other, lambda value, other_value: other_value + value)
+
+    def __rsub__(self, other):
+        return self.apply(other, lambda value, other_value: other_value - value)
+
+    def __rmul__(self, other):
+        return self.apply(other, lambda value, other_value: other_value * value)
+
+    def __rtruediv__(self, other):
+        return self.apply(other, lambda value, other_value: other_value / value)
+
+
+def fill(series: Series, value: float) -> Series:
+    """
+    Metric math FILL function, replaces missing data points with a value.
+    """
+    return Series(value if point is None else point for point in series)
+
+
+def max_of(series_list: List[Series]) -> Series:
+    """
+    Metric math MAX function of multiple series, ignoring missing data points.
+    """
+    return Series(
+        max((point for point in points if point is not None), default=None)
+        for points in zip(*series_list)
+    )
+
+
+METRIC_MATH_FUNCTIONS = {"FILL": fill, "MAX": max_of}
+
+
+class QueryEvaluator(dict):
+    """
+    Lazily evaluates the metric data queries of a single request.
+    Used as the namespace of the metric math expressions, so each query is
+    evaluated once, on first reference.
+    """
+
+    def __init__(self, client: "FakeCloudWatchClient", queries: List[dict], timestamps):
+        super().__init__()
+        self.client = client
+        self.queries = {query["Id"]: query for query in queries}
+        self.timestamps = timestamps
+
+    def __missing__(self, query_id: str):
+        if query_id in METRIC_MATH_FUNCTIONS:
+            return METRIC_MATH_FUNCTIONS[query_id]
+
+        query = self.queries.get(query_id)
+        if query is None:
+            raise ValueError(f"Unknown metric data query id. id={query_id}")
+
+        if "MetricStat" in query:
+            result = self.client.get_metric_stat_series(
+                query["MetricStat"], self.timestamps
+            )
+        else:
+            # expressions are evaluated without builtins, only the
+            # query ids and the metric math functions are available
+            result = eval(query["Expression"], {"__builtins__": {}}, self)
+            if not isinstance(result, list):
+                result = Series([result] * len(self.timestamps))
+        self[query_id] = result
+        return result
+
+
+class FakeCloudWatchClient(FakeAWSClient):
+    """
+    Stateful fake of the CloudWatch client operations used by the autoscaler.
+    Alarms are stored as put, and their metrics (including metric math
+    expressions) are generated from the Kinesis streams load.
+    Alarms are evaluated on demand, and their actions are invoked through
+    the subscribed topic handlers.
+    """
+
+    def __init__(
+        self, clock: Clock = None, kinesis: FakeKinesisClient = None, seed: int = 0
+    ):
+        """
+        Initializes FakeCloudWatchClient instance.
+        :param clock: clock driving the service time, defaults to real time
+        :param kinesis: fake Kinesis client, used for splitting the stream load
+            between its open shards in the shard level metrics
+        :param seed: seed of the throttling errors randomness
+        """
+        super().__init__(clock, seed)
+        self.kinesis = kinesis
+        self.alarms: Dict[str, dict] = {}
+        self.stream_loads: Dict[str, List[Tuple[float, StreamLoad]]] = {}
+        self.topic_handlers: Dict[str, Callable[[dict], None]] = {}
+        self.event_handlers: List[Callable[[dict], None]] = []
+        self.state_history: List[Tuple[str, str, str]] = []
+
+    def set_stream_load(
+        self, stream_name: str, start_time: float = None, **load
+    ) -> None:
+        """
+        Sets a stream load from a point in time onwards.
+        A period's data points are generated from the load at its end.
+        :param stream_name: name of the stream
+        :param start_time: epoch time the load starts at, defaults to the
+            current time (use 0 for a stream that always had the load)
+        :param load: the StreamLoad fields
+        """
+        start_time = self.clock.time() if start_time is None else start_time
+        with self.lock:
+            loads = self.stream_loads.setdefault(stream_name, [])
+            loads.append((start_time, StreamLoad(**load)))
+            loads.sort(key=lambda item: item[0])
+
+    def subscribe(self, topic_arn: str, handler: Callable[[dict], None]) -> None:
+        """
+        Subscribes a handler to alarm notifications sent to a topic.
+        :param topic_arn: the alarm action topic ARN
+        :param handler: function receiving the alarm notification message
+        """
+        self.topic_handlers[topic_arn] = handler
+
+    def subscribe_events(self, handler: Callable[[dict], None]) -> None:
+        """
+        Subscribes a handler to the alarm state change events sent to
+        EventBridge, which are sent for every state change regardless of the
+        alarm actions.
+        :param handler: function receiving the alarm state change event
+        """
+        self.event_handlers.append(handler)
+
+    def put_metric_alarm(self, **alarm) -> dict:
+        """
+        Creates or overwrites an alarm. Updating an alarm keeps its state.
+        """
+        self.record_call("PutMetricAlarm")
+        with self.lock:
+            existing_alarm = self.alarms.get(alarm["AlarmName"], {})
+            self.alarms[alarm["AlarmName"]] = dict(
+                copy.deepcopy(alarm),
+                AlarmArn=f"arn:aws:cloudwatch:::alarm:{alarm['AlarmName']}",
+                ActionsEnabled=alarm.get("ActionsEnabled", True),
+                StateValue=existing_alarm.get("StateValue", "INSUFFICIENT_DATA"),
+                StateReason=existing_alarm.get("StateReason", "Unchecked"),
+                StateUpdatedTimestamp=existing_alarm.get(
+                    "StateUpdatedTimestamp", self.now()
+                ),
+            )
+        return {}
+
+    def describe_alarms(
+        self,
+        AlarmNames: List[str] = None,
+        AlarmTypes: List[str] = None,
+        MaxRecords: int = DEFAULT_DESCRIBE_ALARMS_MAX_RECORDS,
+        NextToken: str = None,
+    ) -> dict:
+        """
+        Describes the metric alarms, optionally filtered by name.
+        """
+        self.record_call("DescribeAlarms")
+        if AlarmNames is not None and len(AlarmNames) > MAX_DESCRIBE_ALARM_NAMES:
+            raise self.error(
+                "DescribeAlarms",
+                "ValidationError",
+                f"AlarmNames must contain at most {MAX_DESCRIBE_ALARM_NAMES} names",
+            )
+        with self.lock:
+            if AlarmNames is None:
+                alarm_names = sorted(self.alarms)
+            else:
+                alarm_names = sorted(set(AlarmNames) & self.alarms.keys())
+
+            page, pagination = self.paginate(
+                alarm_names, {"NextToken": NextToken}, MaxRecords
+            )
+            return dict(
+                MetricAlarms=[copy.deepcopy(self.alarms[name]) for name in page],
+                CompositeAlarms=[],
+                **pagination,
+            )
+
+    def set_alarm_state(
+        self, AlarmName: str, StateValue: str, StateReason: str, **_kwargs
+    ) -> dict:
+        """
+        Temporarily sets an alarm state, until its next evaluation.
+        """
+        self.record_call("SetAlarmState")
+        with self.lock:
+            if AlarmName not in self.alarms:
+                raise self.error(
+                    "SetAlarmState",
+                    "ResourceNotFound",
+                    f"Alarm {AlarmName} not found",
+                )
+            notification = self.set_state(AlarmName, StateValue, StateReason)
+        self.notify(notification)
+        return {}
+
+    def enable_alarm_actions(self, AlarmNames: List[str]) -> dict:
+        """
+        Enables the actions of alarms, missing alarms are ignored.
+        """
+        self.record_call("EnableAlarmActions")
+        self.set_actions_enabled(AlarmNames, True)
+        return {}
+
+    def disable_alarm_actions(self, AlarmNames: List[str]) -> dict:
+        """
+        Disables the actions of alarms, missing alarms are ignored.
+        """
+        self.record_call("DisableAlarmActions")
+        self.set_actions_enabled(AlarmNames, False)
+        return {}
+
+    def set_actions_enabled(
+        self, alarm_names: List[str], actions_enabled: bool
+    ) -> None:
+        """
+        Sets whether the actions of alarms are enabled.
+        """
+        with self.lock:
+            for alarm_name in alarm_names:
+                if alarm_name in self.alarms:
+                    self.alarms[alarm_name]["ActionsEnabled"] = actions_enabled
+
+    def get_metric_data(
+        self,
+        MetricDataQueries: List[dict],
+        StartTime: datetime,
+        EndTime: datetime,
+        NextToken: str = None,
+        ScanBy: str = "TimestampDescending",
+    ) -> dict:
+        """
+        Queries the metric data of the complete periods in a time range,
+        ordered from the newest to the oldest.
+        """
+        self.record_call("GetMetricData")
+        timestamps = self.get_timestamps(
+            MetricDataQueries, StartTime.timestamp(), EndTime.timestamp()
+        )
+        with self.lock:
+            evaluator = QueryEvaluator(self, MetricDataQueries, timestamps)
+            results = []
+            for query in MetricDataQueries:
+                if not query.get("ReturnData", True):
+                    continue
+                points = [
+                    (timestamp, value)
+                    for timestamp, value in zip(timestamps, evaluator[query["Id"]])
+                    if value is not None
+                ]
+                results.append(
+                    {
+                        "Id": query["Id"],
+                        "Label": query.get("Label", query["Id"]),
+                        "Timestamps": [
+                            datetime.fromtimestamp(timestamp, timezone.utc)
+                            for timestamp, _ in points
+                        ],
+                        "Values": [value for _, value in points],
+                        "StatusCode": "Complete",
+                    }
+                )
+        return {"MetricDataResults": results, "Messages": []}
+
+    def evaluate_alarms(self) -> None:
+        """
+        Evaluates all the alarms against their latest complete periods,
+        and invokes the actions of the alarms that changed their state.
+        The actions are invoked after the evaluation, outside of the service
+        lock, so they can call the service themselves.
+        """
+        with self.lock:
+            notifications = [
+                self.evaluate_alarm(alarm_name) for alarm_name in sorted(self.alarms)
+            ]
+        for notification in notifications:
+            self.notify(notification)
+
+    def evaluate_alarm(self, alarm_name: str) -> Optional[Notification]:
+        """
+        Evaluates a single alarm.
+        Must be called under the service lock.
+        :return: the alarm state change notification, if any
+        """
+        alarm = self.alarms[alarm_name]
+        queries = alarm.get("Metrics") or [self.to_metric_stat_query(alarm)]
+        evaluation_periods = alarm["EvaluationPeriods"]
+        period = self.get_period(queries)
+        end_time = self.clock.time()
+        timestamps = self.get_timestamps(
+            queries, (end_time // period - evaluation_periods) * period, end_time
+        )
+
+        evaluator = QueryEvaluator(self, queries, timestamps)
+        alarm_query_id = alarm.get("ThresholdMetricId") or next(
+            query["Id"] for query in queries if query.get("ReturnData", True)
+        )
+        values = [value for value in evaluator[alarm_query_id] if value is not None]
+        treat_missing_data = alarm.get("TreatMissingData", "missing")
+        if len(values) < len(timestamps) and treat_missing_data == "notBreaching":
+            values.extend([None] * (len(timestamps) - len(values)))
+
+        if not values:
+            if treat_missing_data == "ignore":
+                return None
+            return self.set_state(
+                alarm_name, "INSUFFICIENT_DATA", "Insufficient data points"
+            )
+
+        compare = COMPARISON_OPERATORS[alarm["ComparisonOperator"]]
+        breaching_count = sum(
+            value is not None and compare(value, alarm["Threshold"]) for value in values
+        )
+        if breaching_count >= alarm.get("DatapointsToAlarm", evaluation_periods):
+            return self.set_state(alarm_name, "ALARM", "Threshold crossed")
+        return self.set_state(alarm_name, "OK", "Threshold not crossed")
+
+    def set_state(
+        self, alarm_name: str, state_value: str, state_reason: str
+    ) -> Optional[Notification]:
+        """
+        Updates an alarm state.
+        Must be called under the service lock.
+        :return: the alarm state change notification, if the state changed.
+            Its action topics are notified only if the alarm entered the ALARM
+            state with its actions enabled.
+        """
+        alarm = self.alarms[alarm_name]
+        old_state_value = alarm["StateValue"]
+        if old_state_value == state_value:
+            return None
+
+        alarm.update(
+            StateValue=state_value,
+            StateReason=state_reason,
+            StateUpdatedTimestamp=self.now(),
+        )
+        self.state_history.append((alarm_name, old_state_value, state_value))
+        topic_arns = []
+        if state_value == "ALARM" and alarm["ActionsEnabled"]:
+            topic_arns = alarm.get("AlarmActions", [])
+
+        return (
+            topic_arns,
+            self.to_notification_message(alarm, old_state_value),
+            self.to_state_change_event(alarm, old_state_value),
+        )
+
+    def notify(self, notification: Optional[Notification]) -> None:
+        """
+        Sends an alarm state change event to the EventBridge handlers,
+        and its notification to the handlers of its action topics.
+        """
+        if notification is None:
+            return
+
+        topic_arns, message, event = notification
+        for event_handler in self.event_handlers:
+            event_handler(event)
+        for topic_arn in topic_arns:
+            handler = self.topic_handlers.get(topic_arn)
+            if handler:
+                handler(message)
+
+    def to_notification_message(self, alarm: dict, old_state_value: str) -> dict:
+        """
+        Converts an alarm to its state change notification message,
+        in the format delivered by SNS.
+        """
+        trigger = {
+            "Threshold": alarm["Threshold"],
+            "ComparisonOperator": alarm["ComparisonOperator"],
+            "EvaluationPeriods": alarm["EvaluationPeriods"],
+        }
+        if "Metrics" in alarm:
+            trigger["Metrics"] = copy.deepcopy(alarm["Metrics"])
+            for metric in trigger["Metrics"]:
+                if "MetricStat" in metric:
+                    stat_metric = metric["MetricStat"]["Metric"]
+                    stat_metric["Dimensions"] = self.to_message_dimensions(
+                        stat_metric.get("Dimensions", [])
+                    )
+        else:
+            trigger.update(
+                MetricName=alarm["MetricName"],
+                Namespace=alarm["Namespace"],
+                Statistic=alarm.get("Statistic", "Sum").upper(),
+                Period=alarm["Period"],
+                Dimensions=self.to_message_dimensions(alarm.get("Dimensions", [])),
+            )
+
+        return {
+            "AlarmName": alarm["AlarmName"],
+            "AlarmArn": alarm["AlarmArn"],
+            "NewStateValue": alarm["StateValue"],
+            "NewStateReason": alarm["StateReason"],
+            "OldStateValue": old_state_value,
+            "StateChangeTime": alarm["StateUpdatedTimestamp"]
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "+0000"),
+            "Trigger": trigger,
+        }
+
+    def to_state_change_event(self, alarm: dict, old_state_value: str) -> dict:
+        """
+        Converts an alarm to its state change event, in the format delivered
+        by EventBridge.
+        """
+        queries = alarm.get("Metrics") or [self.to_metric_stat_query(alarm)]
+        metrics = []
+        for query in queries:
+            metric = {"id": query["Id"], "returnData": query.get("ReturnData", True)}
+            if "Expression" in query:
+                metric.update(
+                    expression=query["Expression"], label=query.get("Label", "")
+                )
+            else:
+                metric_stat = query["MetricStat"]
+                metric["metricStat"] = {
+                    "metric": {
+                        "namespace": metric_stat["Metric"]["Namespace"],
+                        "name": metric_stat["Metric"]["MetricName"],
+                        "dimensions": {
+                            dimension["Name"]: dimension["Value"]
+                            for dimension in metric_stat["Metric"].get("Dimensions", [])
+                        },
+                    },
+                    "period": metric_stat["Period"],
+                    "stat": metric_stat["Stat"],
+                }
+            metrics.append(metric)
+
+        timestamp = (
+            alarm["StateUpdatedTimestamp"]
+            .isoformat(timespec="milliseconds")
+            .replace("+00:00", "+0000")
+        )
+        return {
+            "version": "0",
+            "source": "aws.cloudwatch",
+            "detail-type": "CloudWatch Alarm State Change",
+            "time": timestamp,
+            "resources": [alarm["AlarmArn"]],
+            "detail": {
+                "alarmName": alarm["AlarmName"],
+                "state": {
+                    "value": alarm["StateValue"],
+                    "reason": alarm["StateReason"],
+                    "timestamp": timestamp,
+                },
+                "previousState": {"value": old_state_value},
+                "configuration": {"metrics": metrics},
+            },
+        }
+
+    @staticmethod
+    def to_message_dimensions(dimensions: List[dict]) -> List[dict]:
+        """
+        Converts dimensions to the lowercase keys format of alarm notifications.
+        """
+        return [
+            {"name": dimension["Name"], "value": dimension["Value"]}
+            for dimension in dimensions
+        ]
+
+    @staticmethod
+    def to_metric_stat_query(alarm: dict) -> dict:
+        """
+        Converts a single metric alarm to its equivalent metric data query.
+        """
+        return {
+            "Id": "m",
+            "MetricStat": {
+                "Metric": {
+                    "Namespace": alarm["Namespace"],
+                    "MetricName": alarm["MetricName"],
+                    "Dimensions": alarm.get("Dimensions", []),
+                },
+                "Period": alarm["Period"],
+                "Stat": alarm.get("Statistic", "Sum"),
+            },
+        }
+
+    @staticmethod
+    def get_period(queries: List[dict]) -> int:
+        """
+        Returns the aggregation period of a request's metric stat queries.
+        """
+        return next(
+            (
+                query["MetricStat"]["Period"]
+                for query in queries
+                if "MetricStat" in query
+            ),
+            DEFAULT_METRIC_PERIOD_SECONDS,
+        )
+
+    def get_timestamps(
+        self, queries: List[dict], start_time: float, end_time: float
+    ) -> List[float]:
+        """
+        Returns the start times of the complete periods in a time range,
+        ordered from the newest to the oldest.
+        """
+        period = self.get_period(queries)
+        timestamp = end_time // period * period - period
+        timestamps = []
+        while timestamp >= start_time:
+            timestamps.append(timestamp)
+            timestamp -= period
+        return timestamps
+
+    def get_metric_stat_series(
+        self, metric_stat: dict, timestamps: List[float]
+    ) -> Series:
+        """
+        Generates a Kinesis metric's data points from its stream load.
+        Shard level metrics split the stream load evenly between its open shards.
+        Periods before the stream load was first set have no data points.
+        Must be called under the service lock.
+        """
+        metric = metric_stat["Metric"]
+        dimensions = {
+            dimension["Name"]: dimension["Value"] for dimension in metric["Dimensions"]
+        }
+        loads = self.stream_loads.get(dimensions.get("StreamName"))
+        metric_definition = KINESIS_METRICS.get(metric["MetricName"])
+        if (
+            metric.get("Namespace") != "AWS/Kinesis"
+            or not loads
+            or not metric_definition
+        ):
+            return Series([None] * len(timestamps))
+
+        field, is_rate = metric_definition
+        scale = metric_stat["Period"] if is_rate and metric_stat["Stat"] == "Sum" else 1
+        if "ShardId" in dimensions and is_rate:
+            open_shard_ids = self.kinesis.get_open_shard_ids(dimensions["StreamName"])
+            if dimensions["ShardId"] not in open_shard_ids:
+                return Series([None] * len(timestamps))
+            scale /= len(open_shard_ids)
+
+        load_times = [load_time for load_time, _ in loads]
+        series = Series()
+        for timestamp in timestamps:
+            index = bisect_right(load_times, timestamp + metric_stat["Period"]) - 1
+            series.append(
+                None if index < 0 else getattr(loads[index][1], field) * scale
+            )
+        return series
+
+    def now(self) -> datetime:
+        """
+        Returns the current clock time.
+        """
+        return datetime.fromtimestamp(self.clock.time(), timezone.utc)
+
+    @staticmethod
+    def to_sns_event(message: dict) -> dict:
+        """
+        Wraps an alarm notification message in an SNS Lambda event.
+        """
+        return {"Records": [{"Sns": {"Message": json.dumps(message)}}]}
@@ -0,0 +1,47 @@
+"""
+Local DynamoDB tables of the autoscaler models
+"""
+import time
+from contextlib import contextmanager
+from typing import Iterator
+from moto import mock_dynamodb2
+from pynamodb.models import Model
+from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+from kinesis_autoscaler.models.usage_history import KinesisUsageHistory
+from kinesis_autoscaler.models.scaling_event import KinesisScalingEvent
+from kinesis_autoscaler.models.scaling_policy import KinesisScalingPolicy
+from kinesis_autoscaler.models.usage_forecast import KinesisUsageForecast
+
+MODELS = (
+    KinesisAutoscalerLog,
+    KinesisUsageHistory,
+    KinesisScalingEvent,
+    KinesisScalingPolicy,
+    KinesisUsageForecast,
+)
+
+
+def recreate_model_table(model: Model) -> None:
+    """
+    Recreates a table for a given PynamoDB model
+    :param model: the PynamoDB model to recreate the table for
+    """
+    if model.exists():
+        model.delete_table()
+        while model.exists():
+            time.sleep(0.1)
+
+    model.create_table(wait=True)
+
+
+@contextmanager
+def fake_dynamodb() -> Iterator[None]:
+    """
+    Serves the autoscaler models tables from an in-process DynamoDB mock.
+    """
+    with mock_dynamodb2():
+        for model in MODELS:
+            recreate_model_table(model)
+        yield
+        for model in MODELS:
+            model.delete_table()
@@ -0,0 +1,174 @@
+"""
+Fake AWS environment of the autoscaler
+"""
+from fnmatch import fnmatchcase
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, List, NamedTuple, Optional
+from kinesis_autoscaler.aws_clients import set_client, reset_clients
+from kinesis_autoscaler.usage_metrics import build_usage_factor_queries
+from kinesis_autoscaler.constants import (
+    SCALE_UP_USAGE_THRESHOLD,
+    SCALE_DOWN_USAGE_THRESHOLD,
+)
+from tests.aws_fakes.clock import Clock
+from tests.aws_fakes.kinesis import (
+    DEFAULT_RESHARDING_SECONDS,
+    DEFAULT_SHARD_LIMIT,
+    FakeKinesisClient,
+)
+from tests.aws_fakes.cloudwatch import FakeCloudWatchClient
+from tests.aws_fakes.tagging import FakeTaggingClient
+
+SCALE_UP_TOPIC_ARN = "arn:aws:sns:::kinesis-autoscaler-scale-up"
+SCALE_DOWN_TOPIC_ARN = "arn:aws:sns:::kinesis-autoscaler-scale-down"
+EMERGENCY_SCALE_UP_TOPIC_ARN = "arn:aws:sns:::kinesis-autoscaler-emergency-scale-up"
+
+
+class Invocation(NamedTuple):
+    """
+    Lambda handler invocation by an alarm notification, or by an alarm
+    state change event (without a topic ARN)
+    """
+
+    topic_arn: Optional[str]
+    event: dict
+    result: Any
+
+
+class FakeAWS:
+    """
+    Fake Kinesis, CloudWatch and tagging services sharing a single clock,
+    with helpers for subscribing streams to the autoscaler.
+    DynamoDB is served by moto (see fake_dynamodb).
+    """
+
+    def __init__(
+        self,
+        clock: Clock = None,
+        resharding_seconds: float = DEFAULT_RESHARDING_SECONDS,
+        seed: int = 0,
+        shard_limit: int = DEFAULT_SHARD_LIMIT,
+    ):
+        """
+        Initializes FakeAWS instance.
+        :param clock: clock driving the services time, defaults to real time
+        :param resharding_seconds: duration of each resharding operation
+        :param seed: seed of the throttling errors randomness
+        :param shard_limit: the account shard limit of provisioned streams
+        """
+        self.clock = clock or Clock()
+        self.kinesis = FakeKinesisClient(
+            self.clock, resharding_seconds, seed, shard_limit
+        )
+        self.cloudwatch = FakeCloudWatchClient(self.clock, self.kinesis, seed)
+        self.tagging = FakeTaggingClient(self.clock, self.kinesis, seed)
+        self.invocations: List[Invocation] = []
+
+    @contextmanager
+    def install(self) -> Iterator["FakeAWS"]:
+        """
+        Replaces the autoscaler AWS clients with the fake services.
+        """
+        set_client("kinesis", self.kinesis)
+        set_client("cloudwatch", self.cloudwatch)
+        set_client("resourcegroupstaggingapi", self.tagging)
+        try:
+            yield self
+        finally:
+            reset_clients()
+
+    def subscribe_handler(self, topic_arn: str, handler: Callable) -> None:
+        """
+        Invokes a Lambda handler with an SNS event for each alarm notification
+        sent to a topic.
+        As with asynchronous invocations, handler failures aren't raised to
+        the alarm evaluation, and are recorded with the invocation instead.
+        :param topic_arn: the alarm action topic ARN
+        :param handler: the Lambda handler function
+        """
+
+        def invoke(message: dict) -> None:
+            event = self.cloudwatch.to_sns_event(message)
+            try:
+                result = handler(event, None)
+            except Exception as exception:
+                result = exception
+            self.invocations.append(Invocation(topic_arn, event, result))
+
+        self.cloudwatch.subscribe(topic_arn, invoke)
+
+    def subscribe_rule(self, alarm_name_pattern: str, handler: Callable) -> None:
+        """
+        Invokes a Lambda handler with the EventBridge event of each alarm
+        entering the ALARM state, matched by an EventBridge rule on the
+        alarm name.
+        :param alarm_name_pattern: the rule alarm name wildcard pattern
+        :param handler: the Lambda handler function
+        """
+
+        def invoke(event: dict) -> None:
+            detail = event["detail"]
+            if detail["state"]["value"] != "ALARM" or not fnmatchcase(
+                detail["alarmName"], alarm_name_pattern
+            ):
+                return
+
+            try:
+                result = handler(event, None)
+            except Exception as exception:
+                result = exception
+            self.invocations.append(Invocation(None, event, result))
+
+        self.cloudwatch.subscribe_events(invoke)
+
+    def create_stream(
+        self,
+        stream_name: str,
+        shard_count: int = 1,
+        emergency_alarm: bool = False,
+        **load,
+    ) -> None:
+        """
+        Creates a stream subscribed to the autoscaler by its scaling alarms,
+        as in the stream subscription example.
+        :param stream_name: name of the stream
+        :param shard_count: the stream initial shard count
+        :param emergency_alarm: whether to add the emergency scale-up alarm
+        :param load: the stream's StreamLoad fields, as if it always had the load
+        """
+        self.kinesis.create_stream(StreamName=stream_name, ShardCount=shard_count)
+        self.cloudwatch.set_stream_load(stream_name, start_time=0, **load)
+        metrics = build_usage_factor_queries(stream_name, shard_count)
+        self.cloudwatch.put_metric_alarm(
+            AlarmName=f"{stream_name}-scale-up",
+            AlarmActions=[SCALE_UP_TOPIC_ARN],
+            Threshold=SCALE_UP_USAGE_THRESHOLD,
+            ComparisonOperator="GreaterThanOrEqualToThreshold",
+            TreatMissingData="ignore",
+            EvaluationPeriods=1,
+            Metrics=metrics,
+        )
+        self.cloudwatch.put_metric_alarm(
+            AlarmName=f"{stream_name}-scale-down",
+            AlarmActions=[SCALE_DOWN_TOPIC_ARN],
+            ActionsEnabled=shard_count > 1,
+            Threshold=SCALE_DOWN_USAGE_THRESHOLD,
+            ComparisonOperator="LessThanOrEqualToThreshold",
+            TreatMissingData="ignore",
+            EvaluationPeriods=288,
+            Metrics=metrics,
+        )
+        if emergency_alarm:
+            self.cloudwatch.put_metric_alarm(
+                AlarmName=f"{stream_name}-emergency-scale-up",
+                AlarmActions=[EMERGENCY_SCALE_UP_TOPIC_ARN],
+                Namespace="AWS/Kinesis",
+                MetricName="WriteProvisionedThroughputExceeded",
+                Dimensions=[{"Name": "StreamName", "Value": stream_name}],
+                Statistic="Sum",
+                Period=60,
+                EvaluationPeriods=1,
+                Threshold=0,
+                ComparisonOperator="GreaterThanThreshold",
+                TreatMissingData="notBreaching",
+            )
@@ -0,0 +1,486 @@
+"""
+Fake Kinesis service client
+"""
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional
+from tests.aws_fakes.base import FakeAWSClient
+from tests.aws_fakes.clock import Clock
+
+MAX_HASH_KEY = 2 ** 128 - 1
+MAX_SHARD_COUNT_UPDATES_PER_DAY = 10
+MAX_STREAM_MODE_UPDATES_PER_DAY = 2
+DEFAULT_RESHARDING_SECONDS = 30.0
+DEFAULT_LIST_SHARDS_MAX_RESULTS = 1000
+# well above the test fleets, so only the tests setting a limit hit it
+DEFAULT_SHARD_LIMIT = 10000
+
+
+class FakeShard:
+    """
+    Kinesis shard hash key range
+    """
+
+    def __init__(self, shard_id: str, starting_hash_key: int, ending_hash_key: int):
+        self.shard_id = shard_id
+        self.starting_hash_key = starting_hash_key
+        self.ending_hash_key = ending_hash_key
+        self.is_open = True
+
+    def describe(self) -> dict:
+        """
+        Returns the shard as returned from list shards operation.
+        """
+        return {
+            "ShardId": self.shard_id,
+            "HashKeyRange": {
+                "StartingHashKey": str(self.starting_hash_key),
+                "EndingHashKey": str(self.ending_hash_key),
+            },
+        }
+
+
+class FakeStream:
+    """
+    Kinesis stream state
+    """
+
+    def __init__(self, stream_name: str, shard_count: int, stream_mode: str):
+        self.stream_name = stream_name
+        self.stream_mode = stream_mode
+        self.status = "ACTIVE"
+        self.shards: List[FakeShard] = []
+        self.pending_update: Optional[Callable[[], None]] = None
+        self.pending_shard_count = 0
+        self.tags: Dict[str, str] = {}
+        self.update_completion_time = 0.0
+        self.shard_count_update_times: Deque[float] = deque()
+        self.stream_mode_update_times: Deque[float] = deque()
+        self.create_shards(shard_count)
+
+    @property
+    def open_shards(self) -> List[FakeShard]:
+        """
+        The stream open shards, ordered by their starting hash key.
+        """
+        return sorted(
+            (shard for shard in self.shards if shard.is_open),
+            key=lambda shard: shard.starting_hash_key,
+        )
+
+    @property
+    def provisioned_shard_count(self) -> int:
+        """
+        The shards the stream counts in the account open shard count.
+        """
+        if self.stream_mode == "ON_DEMAND":
+            return 0
+        return len(self.open_shards)
+
+    @property
+    def reserved_shard_count(self) -> int:
+        """
+        The shards the stream counts against the account shard limit,
+        including the shards its pending update adds.
+        """
+        return max(self.provisioned_shard_count, self.pending_shard_count)
+
+    def add_shard(self, starting_hash_key: int, ending_hash_key: int) -> None:
+        """
+        Adds an open shard covering a hash key range.
+        """
+        shard_id = f"shardId-{len(self.shards):012d}"
+        self.shards.append(FakeShard(shard_id, starting_hash_key, ending_hash_key))
+
+    def create_shards(self, shard_count: int) -> None:
+        """
+        Closes the open shards and replaces them with evenly distributed shards.
+        """
+        for shard in self.shards:
+            shard.is_open = False
+        for index in range(shard_count):
+            self.add_shard(
+                MAX_HASH_KEY * index // shard_count + (1 if index else 0),
+                MAX_HASH_KEY * (index + 1) // shard_count,
+            )
+
+
+class FakeKinesisClient(FakeAWSClient):
+    """
+    Stateful fake of the Kinesis client operations used by the autoscaler.
+    Resharding operations move the stream to UPDATING, and the stream's shards
+    change only once the resharding duration has passed on the clock.
+    """
+
+    throttling_error_code = "LimitExceededException"
+
+    def __init__(
+        self,
+        clock: Clock = None,
+        resharding_seconds: float = DEFAULT_RESHARDING_SECONDS,
+        seed: int = 0,
+        shard_limit: int = DEFAULT_SHARD_LIMIT,
+    ):
+        """
+        Initializes FakeKinesisClient instance.
+        :param clock: clock driving the service time, defaults to real time
+        :param resharding_seconds: duration of each resharding operation
+        :param seed: seed of the throttling errors randomness
+        :param shard_limit: the account shard limit of provisioned streams
+        """
+        super().__init__(clock, seed)
+        self.resharding_seconds = resharding_seconds
+        self.shard_limit = shard_limit
+        self.streams: Dict[str, FakeStream] = {}
+
+    def create_stream(
+        self, StreamName: str, ShardCount: int = 1, StreamModeDetails: dict = None
+    ) -> dict:
+        """
+        Creates an ACTIVE stream.
+        """
+        self.record_call("CreateStream")
+        with self.lock:
+            if StreamName in self.streams:
+                raise self.error(
+                    "CreateStream",
+                    "ResourceInUseException",
+                    f"Stream {StreamName} already exists",
+                )
+            stream_mode = (StreamModeDetails or {}).get("StreamMode", "PROVISIONED")
+            self.streams[StreamName] = FakeStream(StreamName, ShardCount, stream_mode)
+        return {}
+
+    def describe_stream_summary(self, StreamName: str) -> dict:
+        """
+        Describes a stream's status and open shard count.
+        """
+        self.record_call("DescribeStreamSummary")
+        with self.lock:
+            stream = self.get_stream("DescribeStreamSummary", StreamName)
+            return {
+                "StreamDescriptionSummary": {
+                    "StreamName": stream.stream_name,
+                    "StreamARN": f"arn:aws:kinesis:::stream/{stream.stream_name}",
+                    "StreamStatus": stream.status,
+                    "StreamModeDetails": {"StreamMode": stream.stream_mode},
+                    "OpenShardCount": len(stream.open_shards),
+                    "RetentionPeriodHours": 24,
+                }
+            }
+
+    def add_tags_to_stream(self, StreamName: str, Tags: Dict[str, str]) -> dict:
+        """
+        Adds or overwrites tags of a stream.
+        """
+        self.record_call("AddTagsToStream")
+        with self.lock:
+            self.get_stream("AddTagsToStream", StreamName).tags.update(Tags)
+        return {}
+
+    def describe_limits(self) -> dict:
+        """
+        Describes the account shard limit and open shard count.
+        As in Kinesis, the open shard count doesn't include the shards added
+        by pending updates, though they already count against the limit.
+        """
+        self.record_call("DescribeLimits")
+        with self.lock:
+            return {
+                "ShardLimit": self.shard_limit,
+                "OpenShardCount": sum(
+                    self.get_stream(
+                        "DescribeLimits", stream_name
+                    ).provisioned_shard_count
+                    for stream_name in self.streams
+                ),
+                "OnDemandStreamCount": sum(
+                    self.get_stream("DescribeLimits", stream_name).stream_mode
+                    == "ON_DEMAND"
+                    for stream_name in self.streams
+                ),
+                "OnDemandStreamCountLimit": 50,
+            }
+
+    def update_shard_count(
+        self, StreamName: str, TargetShardCount: int, ScalingType: str
+    ) -> dict:
+        """
+        Starts a uniform scaling of a stream, within the API limits of a single
+        operation (up to double or half the current shard count, and 10
+        operations per rolling 24 hours).
+        """
+        operation = "UpdateShardCount"
+        self.record_call(operation)
+        with self.lock:
+            stream = self.get_active_stream(operation, StreamName)
+            if stream.stream_mode == "ON_DEMAND":
+                raise self.error(
+                    operation,
+                    "ValidationException",
+                    "UpdateShardCount is not supported for on-demand streams",
+                )
+            current_shard_count = len(stream.open_shards)
+            if not (
+                current_shard_count / 2 <= TargetShardCount <= current_shard_count * 2
+            ):
+                raise self.error(
+                    operation,
+                    "ValidationException",
+                    "Target shard count must be between half and double "
+                    f"the current shard count. current={current_shard_count}",
+                )
+
+            self.limit_account_shards(operation, TargetShardCount - current_shard_count)
+            self.limit_daily_updates(
+                operation,
+                stream.shard_count_update_times,
+                MAX_SHARD_COUNT_UPDATES_PER_DAY,
+            )
+            self.start_update(stream, lambda: stream.create_shards(TargetShardCount))
+            stream.pending_shard_count = TargetShardCount
+            return {
+                "StreamName": StreamName,
+                "CurrentShardCount": current_shard_count,
+                "TargetShardCount": TargetShardCount,
+            }
+
+    def update_stream_mode(self, StreamARN: str, StreamModeDetails: dict) -> dict:
+        """
+        Starts switching a stream's capacity mode, within the API limit of
+        2 switches per rolling 24 hours.
+        """
+        operation = "UpdateStreamMode"
+        self.record_call(operation)
+        with self.lock:
+            stream = self.get_active_stream(operation, StreamARN.split("/")[-1])
+            stream_mode = StreamModeDetails["StreamMode"]
+            if stream_mode == stream.stream_mode:
+                raise self.error(
+                    operation,
+                    "ValidationException",
+                    f"Stream is already in {stream_mode} mode",
+                )
+            self.limit_daily_updates(
+                operation,
+                stream.stream_mode_update_times,
+                MAX_STREAM_MODE_UPDATES_PER_DAY,
+            )
+
+            def update() -> None:
+                stream.stream_mode = stream_mode
+
+            self.start_update(stream, update)
+        return {}
+
+    def list_shards(
+        self,
+        StreamName: str = None,
+        NextToken: str = None,
+        ShardFilter: dict = None,
+        MaxResults: int = DEFAULT_LIST_SHARDS_MAX_RESULTS,
+    ) -> dict:
+        """
+        Lists a stream's shards, either all of them or only the open ones
+        (AT_LATEST filter). The NextToken is used instead of the stream name
+        for the following pages.
+        """
+        self.record_call("ListShards")
+        with self.lock:
+            if NextToken:
+                StreamName, open_only, start = NextToken.rsplit(":", 2)
+                request = {"NextToken": start}
+                open_only = open_only == "open"
+            else:
+                request = {}
+                open_only = (ShardFilter or {}).get("Type") == "AT_LATEST"
+
+            stream = self.get_stream("ListShards", StreamName)
+            shards = stream.open_shards if open_only else stream.shards
+            page, pagination = self.paginate(shards, request, MaxResults)
+            response = {"Shards": [shard.describe() for shard in page]}
+            if pagination:
+                response["NextToken"] = ":".join(
+                    (
+                        StreamName,
+                        "open" if open_only else "all",
+                        pagination["NextToken"],
+                    )
+                )
+            return response
+
+    def split_shard(
+        self, StreamName: str, ShardToSplit: str, NewStartingHashKey: str
+    ) -> dict:
+        """
+        Starts splitting an open shard into two shards.
+        """
+        operation = "SplitShard"
+        self.record_call(operation)
+        with self.lock:
+            stream = self.get_active_stream(operation, StreamName)
+            shard = self.get_open_shard(operation, stream, ShardToSplit)
+            new_starting_hash_key = int(NewStartingHashKey)
+            if not (
+                shard.starting_hash_key < new_starting_hash_key <= shard.ending_hash_key
+            ):
+                raise self.error(
+                    operation,
+                    "InvalidArgumentException",
+                    "NewStartingHashKey must be within the shard's hash key range",
+                )
+
+            self.limit_account_shards(operation, 1)
+
+            def split() -> None:
+                shard.is_open = False
+                stream.add_shard(shard.starting_hash_key, new_starting_hash_key - 1)
+                stream.add_shard(new_starting_hash_key, shard.ending_hash_key)
+
+            self.start_update(stream, split)
+            stream.pending_shard_count = len(stream.open_shards) + 1
+        return {}
+
+    def merge_shards(
+        self, StreamName: str, ShardToMerge: str, AdjacentShardToMerge: str
+    ) -> dict:
+        """
+        Starts merging two adjacent open shards.
+        """
+        operation = "MergeShards"
+        self.record_call(operation)
+        with self.lock:
+            stream = self.get_active_stream(operation, StreamName)
+            shard = self.get_open_shard(operation, stream, ShardToMerge)
+            adjacent_shard = self.get_open_shard(
+                operation, stream, AdjacentShardToMerge
+            )
+            if shard.ending_hash_key + 1 != adjacent_shard.starting_hash_key:
+                raise self.error(
+                    operation,
+                    "InvalidArgumentException",
+                    "Shards must have adjacent hash key ranges",
+                )
+
+            def merge() -> None:
+                shard.is_open = False
+                adjacent_shard.is_open = False
+                stream.add_shard(
+                    shard.starting_hash_key, adjacent_shard.ending_hash_key
+                )
+
+            self.start_update(stream, merge)
+        return {}
+
+    def get_open_shard_ids(self, stream_name: str) -> List[str]:
+        """
+        Returns the ids of a stream's open shards, without counting as a call.
+        :param stream_name: name of the stream
+        :return: the open shard ids, ordered by their starting hash key
+        """
+        with self.lock:
+            stream = self.get_stream("ListShards", stream_name)
+            return [shard.shard_id for shard in stream.open_shards]
+
+    def get_account_shard_count(self) -> int:
+        """
+        Returns the shards counted against the account shard limit,
+        including the shards added by pending updates.
+        Must be called under the service lock.
+        """
+        return sum(
+            self.get_stream("DescribeLimits", stream_name).reserved_shard_count
+            for stream_name in self.streams
+        )
+
+    def limit_account_shards(self, operation: str, added_shard_count: int) -> None:
+        """
+        Fails if adding shards would exceed the account shard limit.
+        Must be called under the service lock.
+        """
+        if (
+            added_shard_count > 0
+            and self.get_account_shard_count() + added_shard_count > self.shard_limit
+        ):
+            raise self.error(
+                operation,
+                "LimitExceededException",
+                f"Exceeded the account shard limit. shard_limit={self.shard_limit}",
+            )
+
+    def limit_daily_updates(
+        self, operation: str, update_times: Deque[float], max_updates: int
+    ) -> None:
+        """
+        Records an update, failing if the max updates of a rolling 24 hours
+        were already made.
+        Must be called under the service lock.
+        """
+        now = self.clock.time()
+        while update_times and now - update_times[0] >= 24 * 3600:
+            update_times.popleft()
+        if len(update_times) >= max_updates:
+            raise self.error(
+                operation,
+                "LimitExceededException",
+                "Exceeded the updates limit for a rolling 24 hours",
+            )
+        update_times.append(now)
+
+    def start_update(self, stream: FakeStream, update: Callable[[], None]) -> None:
+        """
+        Moves a stream to UPDATING, applying the update once the resharding
+        duration has passed.
+        Must be called under the service lock.
+        """
+        stream.status = "UPDATING"
+        stream.pending_update = update
+        stream.update_completion_time = self.clock.time() + self.resharding_seconds
+
+    def get_stream(self, operation: str, stream_name: str) -> FakeStream:
+        """
+        Returns a stream, completing its pending update if it is due.
+        Must be called under the service lock.
+        """
+        stream = self.streams.get(stream_name)
+        if stream is None:
+            raise self.error(
+                operation,
+                "ResourceNotFoundException",
+                f"Stream {stream_name} not found",
+            )
+
+        if stream.pending_update and self.clock.time() >= stream.update_completion_time:
+            stream.pending_update()
+            stream.pending_update = None
+            stream.pending_shard_count = 0
+            stream.status = "ACTIVE"
+        return stream
+
+    def get_active_stream(self, operation: str, stream_name: str) -> FakeStream:
+        """
+        Returns a stream, failing if it isn't ACTIVE.
+        Must be called under the service lock.
+        """
+        stream = self.get_stream(operation, stream_name)
+        if stream.status != "ACTIVE":
+            raise self.error(
+                operation,
+                "ResourceInUseException",
+                f"Stream {stream_name} is not ACTIVE. status={stream.status}",
+            )
+        return stream
+
+    def get_open_shard(
+        self, operation: str, stream: FakeStream, shard_id: str
+    ) -> FakeShard:
+        """
+        Returns an open shard of a stream.
+        Must be called under the service lock.
+        """
+        for shard in stream.open_shards:
+            if shard.shard_id == shard_id:
+                return shard
+
+        raise self.error(
+            operation, "ResourceNotFoundException", f"Open shard {shard_id} not found"
+        )
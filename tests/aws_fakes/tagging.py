@@ -0,0 +1,70 @@
+"""
+Fake Resource Groups Tagging API client
+"""
+from typing import List
+from tests.aws_fakes.base import FakeAWSClient
+from tests.aws_fakes.clock import Clock
+from tests.aws_fakes.kinesis import FakeKinesisClient
+
+DEFAULT_RESOURCES_PER_PAGE = 50
+
+
+class FakeTaggingClient(FakeAWSClient):
+    """
+    Fake of the tagging API operations used by the autoscaler, serving the
+    tags of the fake Kinesis streams.
+    """
+
+    def __init__(self, clock: Clock, kinesis: FakeKinesisClient, seed: int = 0):
+        """
+        Initializes FakeTaggingClient instance.
+        :param clock: clock driving the service time
+        :param kinesis: the fake Kinesis service whose streams are tagged
+        :param seed: seed of the throttling errors randomness
+        """
+        super().__init__(clock, seed)
+        self.kinesis = kinesis
+
+    def get_resources(
+        self,
+        ResourceTypeFilters: List[str] = None,
+        TagFilters: List[dict] = None,
+        ResourcesPerPage: int = DEFAULT_RESOURCES_PER_PAGE,
+        PaginationToken: str = "",
+    ) -> dict:
+        """
+        Lists the streams matching all the tag filters.
+        """
+        self.record_call("GetResources")
+        if ResourceTypeFilters not in (None, ["kinesis:stream"]):
+            raise self.error(
+                "GetResources",
+                "InvalidParameterException",
+                "Only kinesis:stream resources are supported by the fake",
+            )
+
+        with self.kinesis.lock:
+            streams = [
+                stream
+                for _, stream in sorted(self.kinesis.streams.items())
+                if all(
+                    stream.tags.get(tag_filter["Key"]) in tag_filter["Values"]
+                    for tag_filter in TagFilters or []
+                )
+            ]
+            page, pagination = self.paginate(
+                streams, {"NextToken": PaginationToken}, ResourcesPerPage
+            )
+            return {
+                "ResourceTagMappingList": [
+                    {
+                        "ResourceARN": f"arn:aws:kinesis:::stream/{stream.stream_name}",
+                        "Tags": [
+                            {"Key": key, "Value": value}
+                            for key, value in stream.tags.items()
+                        ],
+                    }
+                    for stream in page
+                ],
+                "PaginationToken": pagination.get("NextToken", ""),
+            }
@@ -1,33 +1,36 @@
 """
 Shared tests configuration
 """
-import time
 from typing import Iterator
 import pytest
-from moto import mock_dynamodb2
-from pynamodb.models import Model
-from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+from kinesis_autoscaler import (
+    usage_history,
+    usage_forecast,
+    scaling_history,
+    scaling_policies,
+    shard_quota,
+    invocation_deadline,
+)
+from tests.aws_fakes.dynamodb import fake_dynamodb
 
 
-def recreate_model_table(model: Model) -> None:
+@pytest.fixture(autouse=True)
+def autoscaler_models() -> Iterator[None]:
     """
-    Recreates a table for a given PynamoDB model
-    :param model: the PynamoDB model to recreate the table for
+    Sets up and tears down the autoscaler models
     """
-    if model.exists():
-        model.delete_table()
-        while model.exists():
-            time.sleep(0.1)
-
-    model.create_table(wait=True)
+    with fake_dynamodb():
+        yield
 
 
 @pytest.fixture(autouse=True)
-def autoscaler_log_model() -> Iterator[None]:
+def autoscaler_caches() -> None:
     """
-    Sets up and tears down the autoscaler log model
+    Clears the autoscaler in-memory caches
     """
-    with mock_dynamodb2():
-        recreate_model_table(KinesisAutoscalerLog)
-        yield
-        KinesisAutoscalerLog.delete_table()
+    usage_history.reset_cache()
+    scaling_history.reset_cache()
+    scaling_policies.reset_cache()
+    usage_forecast.reset_cache()
+    shard_quota.reset_cache()
+    invocation_deadline.clear_invocation_deadline()
@@ -0,0 +1,134 @@
+"""
+Scaling alarm events tests
+"""
+from typing import Iterator
+import pytest
+import handler
+from kinesis_autoscaler.alarm_event import AlarmEvent
+from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+from tests.aws_fakes import (
+    FakeAWS,
+    VirtualClock,
+    SCALE_UP_TOPIC_ARN,
+    EMERGENCY_SCALE_UP_TOPIC_ARN,
+)
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def fake_aws() -> Iterator[FakeAWS]:
+    """
+    Serves the autoscaler AWS clients from fake services driven by a virtual clock
+    """
+    with FakeAWS(VirtualClock(), resharding_seconds=60).install() as aws:
+        yield aws
+
+
+def test_sns_and_eventbridge_events_are_parsed_alike(fake_aws: FakeAWS) -> None:
+    """
+    Ensures the alarm notifications delivered by SNS and the alarm state change
+    events delivered by EventBridge are normalized to the same alarm events.
+    """
+    messages = []
+    events = []
+    fake_aws.cloudwatch.subscribe(SCALE_UP_TOPIC_ARN, messages.append)
+    fake_aws.cloudwatch.subscribe(EMERGENCY_SCALE_UP_TOPIC_ARN, messages.append)
+    fake_aws.cloudwatch.subscribe_events(events.append)
+    fake_aws.create_stream("stream", shard_count=3, emergency_alarm=True)
+
+    for alarm_name in ("stream-scale-up", "stream-emergency-scale-up"):
+        fake_aws.cloudwatch.set_alarm_state(
+            AlarmName=alarm_name, StateValue="ALARM", StateReason="test"
+        )
+
+    assert [event["detail-type"] for event in events] == [
+        "CloudWatch Alarm State Change"
+    ] * 2
+    parsed_events = [
+        [
+            (
+                alarm_event.alarm_name,
+                alarm_event.alarm_type,
+                alarm_event.stream_name,
+                alarm_event.shard_count,
+                alarm_event.state_change_time,
+                alarm_event.alarm_names,
+            )
+            for alarm_event in map(AlarmEvent.parse, delivered)
+        ]
+        for delivered in (messages, events)
+    ]
+    alarm_names = {"scale_up": "stream-scale-up", "scale_down": "stream-scale-down"}
+    state_change_time = (
+        fake_aws.cloudwatch.now()
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "+0000")
+    )
+    assert (
+        parsed_events[0]
+        == parsed_events[1]
+        == [
+            (
+                "stream-scale-up",
+                "scale-up",
+                "stream",
+                3,
+                state_change_time,
+                alarm_names,
+            ),
+            (
+                "stream-emergency-scale-up",
+                "emergency-scale-up",
+                "stream",
+                None,
+                state_change_time,
+                alarm_names,
+            ),
+        ]
+    )
+
+    with pytest.raises(AttributeError):
+        AlarmEvent.parse(messages[0]).extra = True
+    with pytest.raises(ValueError):
+        AlarmEvent.parse(dict(messages[0], AlarmName="stream-alarm"))
+    with pytest.raises(ValueError):
+        AlarmEvent.parse(
+            dict(events[0], detail=dict(events[0]["detail"], configuration={}))
+        )
+
+
+def test_eventbridge_rules_scale_streams(fake_aws: FakeAWS) -> None:
+    """
+    Ensures the handlers scale streams by the alarm state change events of
+    EventBridge rules, a state change delivered by both SNS and EventBridge
+    scales the stream once, and alarms of other types are skipped.
+    """
+    fake_aws.subscribe_handler(SCALE_UP_TOPIC_ARN, handler.scale_up)
+    fake_aws.subscribe_rule("*scale-up*", handler.scale_up)
+    fake_aws.create_stream(
+        "stream",
+        shard_count=2,
+        emergency_alarm=True,
+        incoming_bytes_per_second=1.8 * MB,
+    )
+
+    fake_aws.cloudwatch.evaluate_alarms()
+
+    assert [
+        (invocation.topic_arn, invocation.result[0]["status"])
+        for invocation in fake_aws.invocations
+    ] == [(None, "SUCCEEDED"), (SCALE_UP_TOPIC_ARN, "SUCCEEDED")]
+    assert fake_aws.kinesis.call_counts["UpdateShardCount"] == 1
+    assert [log.target_shard_count for log in KinesisAutoscalerLog.scan()] == [4]
+
+    fake_aws.cloudwatch.set_alarm_state(
+        AlarmName="stream-emergency-scale-up", StateValue="ALARM", StateReason="test"
+    )
+    assert fake_aws.invocations[-1].result == [
+        {
+            "alarm_name": "stream-emergency-scale-up",
+            "stream_name": "stream",
+            "status": "SKIPPED",
+        }
+    ]
@@ -0,0 +1,146 @@
+"""
+Kinesis alarms reconciler tests
+"""
+from typing import Iterator
+import pytest
+import handler
+from kinesis_autoscaler.alarm_reconciler import KinesisAlarmReconciler
+from tests.aws_fakes import (
+    FakeAWS,
+    VirtualClock,
+    SCALE_UP_TOPIC_ARN,
+    SCALE_DOWN_TOPIC_ARN,
+)
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def fake_aws() -> Iterator[FakeAWS]:
+    """
+    Serves the autoscaler AWS clients from fake services driven by a virtual clock
+    """
+    with FakeAWS(VirtualClock(), resharding_seconds=60).install() as aws:
+        yield aws
+
+
+@pytest.fixture
+def reconciler() -> KinesisAlarmReconciler:
+    """
+    Reconciles alarms with the fake alarm action topics
+    """
+    return KinesisAlarmReconciler(SCALE_UP_TOPIC_ARN, SCALE_DOWN_TOPIC_ARN)
+
+
+def test_tagged_streams_are_reconciled(
+    fake_aws: FakeAWS, reconciler: KinesisAlarmReconciler
+) -> None:
+    """
+    Ensures the alarms of tagged streams are described in batches and only
+    missing or drifted alarms are written, and that created alarms scale
+    their streams.
+    """
+    fake_aws.subscribe_handler(SCALE_UP_TOPIC_ARN, handler.scale_up)
+    for index in range(120):
+        fake_aws.kinesis.create_stream(StreamName=f"new{index:03d}", ShardCount=2)
+        fake_aws.cloudwatch.set_stream_load(
+            f"new{index:03d}", start_time=0, incoming_bytes_per_second=0.2 * MB
+        )
+    fake_aws.kinesis.create_stream(StreamName="untagged", ShardCount=2)
+    fake_aws.create_stream("subscribed", shard_count=4)
+    fake_aws.create_stream("drifted", shard_count=3)
+    fake_aws.cloudwatch.put_metric_alarm(
+        **dict(
+            KinesisAlarmReconciler.describe_alarms(["drifted-scale-up"])[
+                "drifted-scale-up"
+            ],
+            Threshold=0.9,
+        )
+    )
+    stream_names = [f"new{index:03d}" for index in range(120)]
+    for stream_name in stream_names + ["subscribed", "drifted"]:
+        fake_aws.kinesis.add_tags_to_stream(
+            StreamName=stream_name, Tags={"team": "data"}
+        )
+    fake_aws.kinesis.add_tags_to_stream(StreamName="untagged", Tags={"team": "web"})
+    describe_alarms_calls = fake_aws.cloudwatch.call_counts["DescribeAlarms"]
+    put_metric_alarm_calls = fake_aws.cloudwatch.call_counts["PutMetricAlarm"]
+
+    report = reconciler.reconcile(tags={"team": "data"})
+
+    assert sorted(
+        (entry["alarm_name"], entry["action"])
+        for entry in report
+        if entry["stream_name"] == "drifted" or entry["stream_name"] == "new000"
+    ) == [
+        ("drifted-scale-up", "REPAIR"),
+        ("new000-scale-down", "CREATE"),
+        ("new000-scale-up", "CREATE"),
+    ]
+    assert len(report) == 241
+    assert all(entry["status"] == "SUCCEEDED" for entry in report)
+    assert "untagged-scale-up" not in fake_aws.cloudwatch.alarms
+    # 244 alarm names in 3 batches
+    assert (
+        fake_aws.cloudwatch.call_counts["DescribeAlarms"] - describe_alarms_calls == 3
+    )
+    assert (
+        fake_aws.cloudwatch.call_counts["PutMetricAlarm"] - put_metric_alarm_calls
+        == 241
+    )
+    assert fake_aws.kinesis.call_counts["DescribeStreamSummary"] == 120
+    assert fake_aws.cloudwatch.alarms["drifted-scale-up"]["Threshold"] == 0.75
+
+    # all the alarms exist now, so the batches are described in 2 pages
+    describe_alarms_calls = fake_aws.cloudwatch.call_counts["DescribeAlarms"]
+    assert reconciler.reconcile(tags={"team": "data"}) == []
+    assert (
+        fake_aws.cloudwatch.call_counts["DescribeAlarms"] - describe_alarms_calls == 5
+    )
+
+    fake_aws.cloudwatch.set_stream_load("new007", incoming_bytes_per_second=1.8 * MB)
+    fake_aws.clock.advance(300)
+    fake_aws.cloudwatch.evaluate_alarms()
+    assert [invocation.result[0]["status"] for invocation in fake_aws.invocations] == [
+        "SUCCEEDED"
+    ]
+    assert fake_aws.kinesis.call_counts["UpdateShardCount"] == 1
+
+
+def test_stream_list_reconciliation(fake_aws: FakeAWS) -> None:
+    """
+    Ensures existing alarms keep their shard count and actions state,
+    on-demand streams get disabled alarms, and a dry run writes nothing.
+    """
+    fake_aws.create_stream("stream", shard_count=4)
+    fake_aws.cloudwatch.disable_alarm_actions(AlarmNames=["stream-scale-up"])
+    del fake_aws.cloudwatch.alarms["stream-scale-down"]
+    fake_aws.kinesis.create_stream(
+        StreamName="on-demand", StreamModeDetails={"StreamMode": "ON_DEMAND"}
+    )
+
+    dry_run_report = KinesisAlarmReconciler(
+        SCALE_UP_TOPIC_ARN, SCALE_DOWN_TOPIC_ARN, dry_run=True
+    ).reconcile(stream_names=["stream", "on-demand", "missing"])
+
+    assert sorted(
+        (entry["stream_name"], entry.get("alarm_name"), entry["status"])
+        for entry in dry_run_report
+    ) == [
+        ("missing", None, "FAILED"),
+        ("on-demand", "on-demand-scale-down", "DRY_RUN"),
+        ("on-demand", "on-demand-scale-up", "DRY_RUN"),
+        ("stream", "stream-scale-down", "DRY_RUN"),
+    ]
+    assert "stream-scale-down" not in fake_aws.cloudwatch.alarms
+
+    KinesisAlarmReconciler(SCALE_UP_TOPIC_ARN, SCALE_DOWN_TOPIC_ARN).reconcile(
+        stream_names=["stream", "on-demand"]
+    )
+
+    alarms = fake_aws.cloudwatch.alarms
+    assert not alarms["stream-scale-up"]["ActionsEnabled"]
+    assert alarms["stream-scale-down"]["ActionsEnabled"]
+    assert alarms["stream-scale-down"]["Metrics"][0]["Expression"] == "4"
+    assert not alarms["on-demand-scale-up"]["ActionsEnabled"]
+    assert not alarms["on-demand-scale-down"]["ActionsEnabled"]
@@ -0,0 +1,168 @@
+"""
+Fake AWS services tests
+"""
+from typing import Iterator
+import pytest
+from botocore.exceptions import ClientError
+from datetime import datetime, timedelta
+import handler
+from kinesis_autoscaler.batch_scaler import BatchScalingError
+from kinesis_autoscaler.fleet_sweeper import KinesisFleetSweeper
+from kinesis_autoscaler.usage_metrics import get_usage_factors
+from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+from tests.aws_fakes import (
+    FakeAWS,
+    VirtualClock,
+    SCALE_UP_TOPIC_ARN,
+    SCALE_DOWN_TOPIC_ARN,
+)
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def fake_aws() -> Iterator[FakeAWS]:
+    """
+    Serves the autoscaler AWS clients from fake services driven by a virtual clock
+    """
+    with FakeAWS(VirtualClock(), resharding_seconds=60).install() as aws:
+        yield aws
+
+
+def describe_stream(fake_aws: FakeAWS, stream_name: str) -> dict:
+    """
+    Describes a fake stream summary.
+    """
+    response = fake_aws.kinesis.describe_stream_summary(StreamName=stream_name)
+    return response["StreamDescriptionSummary"]
+
+
+def get_alarm_shard_count(fake_aws: FakeAWS, alarm_name: str) -> str:
+    """
+    Returns the shard count expression of a fake alarm.
+    """
+    alarm = fake_aws.cloudwatch.alarms[alarm_name]
+    return next(
+        metric["Expression"]
+        for metric in alarm["Metrics"]
+        if metric["Id"] == "shardCount"
+    )
+
+
+def test_usage_factor_expressions_are_evaluated(fake_aws: FakeAWS) -> None:
+    """
+    Ensures the usage factor metric math is evaluated from the stream load.
+    """
+    fake_aws.create_stream(
+        "stream",
+        shard_count=2,
+        incoming_bytes_per_second=MB,
+        incoming_records_per_second=200,
+        outgoing_bytes_per_second=3 * MB,
+    )
+
+    now = datetime.fromtimestamp(fake_aws.clock.time())
+    usage_factors = get_usage_factors("stream", 2, now - timedelta(hours=1), now)
+
+    # only complete periods are returned, and the outgoing bytes usage
+    # is the highest, 3MB/s out of 2 shards * 2MB/s
+    assert len(usage_factors) == 11
+    assert usage_factors == [pytest.approx(0.75)] * 11
+
+
+def test_alarm_triggers_async_resharding(fake_aws: FakeAWS) -> None:
+    """
+    Ensures a triggered alarm scales the stream through the Lambda handler,
+    the stream is UPDATING until the resharding completes,
+    and the synced alarm isn't triggered again by the same load.
+    """
+    fake_aws.subscribe_handler(SCALE_UP_TOPIC_ARN, handler.scale_up)
+    fake_aws.subscribe_handler(SCALE_DOWN_TOPIC_ARN, handler.scale_down)
+    fake_aws.create_stream("stream", shard_count=2, incoming_bytes_per_second=1.8 * MB)
+
+    fake_aws.cloudwatch.evaluate_alarms()
+
+    assert describe_stream(fake_aws, "stream")["StreamStatus"] == "UPDATING"
+    assert describe_stream(fake_aws, "stream")["OpenShardCount"] == 2
+    assert get_alarm_shard_count(fake_aws, "stream-scale-up") == "4"
+    assert get_alarm_shard_count(fake_aws, "stream-scale-down") == "4"
+    assert fake_aws.kinesis.call_counts["UpdateShardCount"] == 1
+
+    fake_aws.clock.advance(60)
+    assert describe_stream(fake_aws, "stream")["StreamStatus"] == "ACTIVE"
+    assert describe_stream(fake_aws, "stream")["OpenShardCount"] == 4
+
+    fake_aws.clock.advance(300)
+    fake_aws.cloudwatch.evaluate_alarms()
+    assert fake_aws.cloudwatch.alarms["stream-scale-up"]["StateValue"] == "OK"
+    assert fake_aws.kinesis.call_counts["UpdateShardCount"] == 1
+    assert [log.target_shard_count for log in KinesisAutoscalerLog.scan()] == [4]
+
+
+def test_shard_count_update_limits(fake_aws: FakeAWS) -> None:
+    """
+    Ensures the fake stream enforces the UpdateShardCount API limits.
+    """
+    fake_aws.kinesis.create_stream(StreamName="stream", ShardCount=2)
+
+    with pytest.raises(ClientError, match="ValidationException"):
+        fake_aws.kinesis.update_shard_count(
+            StreamName="stream", TargetShardCount=5, ScalingType="UNIFORM_SCALING"
+        )
+
+    for target_shard_count in (4, 2) * 5:
+        fake_aws.kinesis.update_shard_count(
+            StreamName="stream",
+            TargetShardCount=target_shard_count,
+            ScalingType="UNIFORM_SCALING",
+        )
+        with pytest.raises(ClientError, match="ResourceInUseException"):
+            fake_aws.kinesis.update_shard_count(
+                StreamName="stream", TargetShardCount=3, ScalingType="UNIFORM_SCALING"
+            )
+        fake_aws.clock.advance(60)
+
+    with pytest.raises(ClientError, match="LimitExceededException"):
+        fake_aws.kinesis.update_shard_count(
+            StreamName="stream", TargetShardCount=4, ScalingType="UNIFORM_SCALING"
+        )
+
+
+def test_throttled_scaling_fails_and_can_be_redelivered(fake_aws: FakeAWS) -> None:
+    """
+    Ensures a throttled scaling operation is reported as failed,
+    and its alarm event can be processed again.
+    """
+    fake_aws.subscribe_handler(SCALE_UP_TOPIC_ARN, handler.scale_up)
+    fake_aws.create_stream("stream", shard_count=2, incoming_bytes_per_second=1.8 * MB)
+    fake_aws.kinesis.inject_throttling(1, "UpdateShardCount")
+
+    fake_aws.cloudwatch.evaluate_alarms()
+
+    invocation = fake_aws.invocations[0]
+    assert isinstance(invocation.result, BatchScalingError)
+    assert describe_stream(fake_aws, "stream")["StreamStatus"] == "ACTIVE"
+
+    fake_aws.kinesis.inject_throttling(0, "UpdateShardCount")
+    assert handler.scale_up(invocation.event, None)[0]["status"] == "SUCCEEDED"
+    assert describe_stream(fake_aws, "stream")["StreamStatus"] == "UPDATING"
+
+
+def test_fleet_sweep_of_many_streams(fake_aws: FakeAWS) -> None:
+    """
+    Ensures a fleet sweep over many fake streams scales only the hot ones.
+    """
+    for index in range(200):
+        fake_aws.create_stream(
+            f"stream{index}",
+            shard_count=4,
+            incoming_bytes_per_second=(3.5 if index % 10 == 0 else 2) * MB,
+        )
+
+    report = KinesisFleetSweeper().sweep()
+
+    assert len(report) == 20
+    assert all(entry["status"] == "SUCCEEDED" for entry in report)
+    assert fake_aws.kinesis.call_counts["UpdateShardCount"] == 20
+    assert describe_stream(fake_aws, "stream0")["StreamStatus"] == "UPDATING"
+    assert get_alarm_shard_count(fake_aws, "stream0-scale-up") == "6"
@@ -0,0 +1,68 @@
+"""
+AWS calls rate limiting and throttling tracking tests
+"""
+from kinesis_autoscaler import aws_throttling
+from kinesis_autoscaler.aws_clients import get_client
+
+
+def test_token_bucket_waits_for_tokens() -> None:
+    """
+    Ensures the token bucket allows bursts up to its capacity,
+    and then waits for tokens according to its rate.
+    """
+    now = [0.0]
+    sleeps = []
+    token_bucket = aws_throttling.TokenBucket(
+        rate=2, clock=lambda: now[0], sleep=sleeps.append
+    )
+
+    assert token_bucket.acquire() == 0
+    assert token_bucket.acquire() == 0
+    assert token_bucket.acquire() == 0.5
+    assert token_bucket.acquire() == 1
+    now[0] = 10
+    assert token_bucket.acquire() == 0
+    assert sleeps == [0.5, 1]
+
+
+def test_throttled_attempts_are_counted() -> None:
+    """
+    Ensures only throttling errors of AWS calls attempts are counted,
+    excluding the limit errors of resharding operations.
+    """
+    operation = get_client("kinesis").meta.service_model.operation_model(
+        "UpdateShardCount"
+    )
+    initial_count = aws_throttling.get_throttle_counts().get(
+        "kinesis.UpdateShardCount", 0
+    )
+
+    aws_throttling.record_throttling(
+        response=(None, {"Error": {"Code": "ThrottlingException"}}),
+        operation=operation,
+    )
+    aws_throttling.record_throttling(
+        response=(None, {"Error": {"Code": "LimitExceededException"}}),
+        operation=operation,
+    )
+    aws_throttling.record_throttling(
+        response=(None, {"Error": {"Code": "ResourceInUseException"}}),
+        operation=operation,
+    )
+    aws_throttling.record_throttling(response=None, operation=operation)
+
+    assert (
+        aws_throttling.get_throttle_counts()["kinesis.UpdateShardCount"]
+        == initial_count + 1
+    )
+
+
+def test_clients_use_adaptive_retries() -> None:
+    """
+    Ensures the AWS clients are configured with the adaptive retry mode.
+    """
+    client_config = get_client("cloudwatch").meta.config
+    assert client_config.retries["mode"] == "adaptive"
+    assert client_config.max_pool_connections >= 2
+    mutating_client_config = get_client("kinesis", mutating=True).meta.config
+    assert mutating_client_config.retries["total_max_attempts"] == 2
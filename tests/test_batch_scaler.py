@@ -0,0 +1,135 @@
+"""
+Kinesis batch scaler tests
+"""
+from typing import List
+import pytest
+from kinesis_autoscaler.alarm_event import AlarmEvent
+from kinesis_autoscaler.batch_scaler import KinesisBatchScaler, BatchScalingError
+
+SCALED_EVENTS: List[AlarmEvent] = []
+FAILING_STREAM_NAME = "failing"
+
+
+class StubScaler:
+    """
+    Stub scaler recording the alarm events it scaled
+    """
+
+    alarm_type = "scale-up"
+
+    def __init__(self, alarm_event: AlarmEvent):
+        self.alarm_event = alarm_event
+
+    def scale(self) -> None:
+        if self.alarm_event.stream_name == FAILING_STREAM_NAME:
+            raise RuntimeError("scaling failed")
+        SCALED_EVENTS.append(self.alarm_event)
+
+
+def to_alarm_message(
+    alarm_name: str, stream_name: str = None, state_change_time: str = None
+) -> dict:
+    """
+    Returns an alarm notification message as delivered by SNS.
+    """
+    dimensions = [{"name": "StreamName", "value": stream_name}] if stream_name else []
+    return {
+        "AlarmName": alarm_name,
+        "StateChangeTime": state_change_time,
+        "Trigger": {
+            "Metrics": [
+                {"Id": "shardCount", "Expression": "2"},
+                {
+                    "Id": "incomingBytes",
+                    "MetricStat": {"Metric": {"Dimensions": dimensions}},
+                },
+            ]
+        },
+    }
+
+
+@pytest.fixture(autouse=True)
+def clear_scaled_events() -> None:
+    """
+    Clears the stub scaler recorded alarm events
+    """
+    SCALED_EVENTS.clear()
+
+
+def test_batch_coalesces_duplicate_stream_alarms() -> None:
+    """
+    Ensures only the newest alarm event of each stream is scaled.
+    """
+    event_messages = [
+        to_alarm_message("a-1-scale-up", "a", "2021-11-16T10"),
+        to_alarm_message("b-1-scale-up", "b", "2021-11-16T10"),
+        to_alarm_message("a-2-scale-up", "a", "2021-11-16T09"),
+        to_alarm_message("a-3-scale-up", "a", "2021-11-16T10"),
+    ]
+
+    report = KinesisBatchScaler(StubScaler, event_messages).scale()
+
+    assert sorted(event.alarm_name for event in SCALED_EVENTS) == [
+        "a-3-scale-up",
+        "b-1-scale-up",
+    ]
+    assert [entry["status"] for entry in report] == [
+        "DUPLICATE",
+        "SUCCEEDED",
+        "DUPLICATE",
+        "SUCCEEDED",
+    ]
+
+
+def test_batch_isolates_failed_streams() -> None:
+    """
+    Ensures a failing stream doesn't fail the other streams of the batch,
+    and that the batch fails only when all of its scaled records fail,
+    regardless of its duplicate and skipped records.
+    """
+    event_messages = [
+        to_alarm_message("a-1-scale-up", FAILING_STREAM_NAME),
+        to_alarm_message("b-1-scale-up", "b"),
+        to_alarm_message("c-1-scale-up"),
+    ]
+
+    report = KinesisBatchScaler(StubScaler, event_messages).scale()
+
+    assert [event.alarm_name for event in SCALED_EVENTS] == ["b-1-scale-up"]
+    assert [entry["status"] for entry in report] == [
+        "FAILED",
+        "SUCCEEDED",
+        "FAILED",
+    ]
+    assert report[0]["error"] == "scaling failed"
+
+    with pytest.raises(BatchScalingError):
+        KinesisBatchScaler(StubScaler, event_messages[:1]).scale()
+    with pytest.raises(BatchScalingError):
+        KinesisBatchScaler(
+            StubScaler,
+            [
+                to_alarm_message("a-1-scale-up", FAILING_STREAM_NAME, "2021-11-16T09"),
+                to_alarm_message("a-2-scale-up", FAILING_STREAM_NAME, "2021-11-16T10"),
+                to_alarm_message("b-emergency-scale-up", "b"),
+            ],
+        ).scale()
+
+
+def test_batch_skips_other_alarm_types() -> None:
+    """
+    Ensures alarm events of other alarm types are skipped, since the scale-up
+    EventBridge rule matches the emergency scale-up alarms as well.
+    """
+    event_messages = [
+        to_alarm_message("a-emergency-scale-up", "a"),
+        to_alarm_message("b-scale-up", "b"),
+    ]
+
+    report = KinesisBatchScaler(StubScaler, event_messages).scale()
+
+    assert [event.alarm_name for event in SCALED_EVENTS] == ["b-scale-up"]
+    assert [(entry["alarm_name"], entry["status"]) for entry in report] == [
+        ("a-emergency-scale-up", "SKIPPED"),
+        ("b-scale-up", "SUCCEEDED"),
+    ]
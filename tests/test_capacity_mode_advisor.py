@@ -0,0 +1,138 @@
+"""
+Kinesis capacity mode advisor tests
+"""
+from typing import Iterator
+from datetime import datetime, timedelta, timezone
+import pytest
+import handler
+from kinesis_autoscaler.alarm_event import AlarmEvent
+from kinesis_autoscaler.capacity_mode_advisor import KinesisCapacityModeAdvisor
+from kinesis_autoscaler.kinesis_upscaler import KinesisUpscaler
+from kinesis_autoscaler.kinesis_downscaler import KinesisDownscaler
+from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+from tests.aws_fakes import FakeAWS, VirtualClock, SCALE_UP_TOPIC_ARN
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def fake_aws() -> Iterator[FakeAWS]:
+    """
+    Serves the autoscaler AWS clients from fake services driven by a virtual clock
+    """
+    with FakeAWS(VirtualClock(), resharding_seconds=60).install() as aws:
+        yield aws
+
+
+def get_stream_mode(fake_aws: FakeAWS, stream_name: str) -> str:
+    """
+    Returns the capacity mode of a fake stream.
+    """
+    response = fake_aws.kinesis.describe_stream_summary(StreamName=stream_name)
+    return response["StreamDescriptionSummary"]["StreamModeDetails"]["StreamMode"]
+
+
+def test_spiky_stream_switches_to_on_demand(fake_aws: FakeAWS) -> None:
+    """
+    Ensures only the spiky stream is switched to on-demand, its alarm actions
+    are disabled, and it isn't scaled while on-demand.
+    """
+    fake_aws.subscribe_handler(SCALE_UP_TOPIC_ARN, handler.scale_up)
+    fake_aws.create_stream("flat", shard_count=4, incoming_bytes_per_second=2 * MB)
+    fake_aws.create_stream("spiky", shard_count=4, incoming_bytes_per_second=0.05 * MB)
+    spike_time = fake_aws.clock.time() - 3 * 3600
+    fake_aws.cloudwatch.set_stream_load(
+        "spiky", start_time=spike_time, incoming_bytes_per_second=8 * MB
+    )
+    fake_aws.cloudwatch.set_stream_load(
+        "spiky", start_time=spike_time + 300, incoming_bytes_per_second=0.05 * MB
+    )
+
+    (dry_run_entry,) = KinesisCapacityModeAdvisor(dry_run=True).advise()
+    assert dry_run_entry["status"] == "DRY_RUN"
+    assert get_stream_mode(fake_aws, "spiky") == "PROVISIONED"
+
+    (entry,) = KinesisCapacityModeAdvisor(dry_run=False).advise()
+    assert entry["stream_name"] == "spiky"
+    assert entry["recommended_stream_mode"] == "ON_DEMAND"
+    assert entry["on_demand_hourly_cost"] < entry["provisioned_hourly_cost"]
+    assert entry["status"] == "SWITCHED"
+    assert not fake_aws.cloudwatch.alarms["spiky-scale-up"]["ActionsEnabled"]
+    assert fake_aws.cloudwatch.alarms["flat-scale-up"]["ActionsEnabled"]
+    assert [log.stream_mode for log in KinesisAutoscalerLog.query("spiky")] == [
+        "ON_DEMAND"
+    ]
+
+    fake_aws.clock.advance(60)
+    assert get_stream_mode(fake_aws, "spiky") == "ON_DEMAND"
+    fake_aws.cloudwatch.set_stream_load("spiky", incoming_bytes_per_second=4 * MB)
+    fake_aws.clock.advance(600)
+    fake_aws.cloudwatch.evaluate_alarms()
+    assert fake_aws.invocations == []
+    assert fake_aws.kinesis.call_counts["UpdateShardCount"] == 0
+
+
+def test_flat_stream_switches_to_provisioned(fake_aws: FakeAWS) -> None:
+    """
+    Ensures a flat on-demand stream is switched back to provisioned with
+    synced alarms, within the capacity mode switches limit.
+    """
+    fake_aws.create_stream("stream", shard_count=2, incoming_bytes_per_second=2 * MB)
+    fake_aws.kinesis.update_stream_mode(
+        StreamARN="arn:aws:kinesis:::stream/stream",
+        StreamModeDetails={"StreamMode": "ON_DEMAND"},
+    )
+    fake_aws.cloudwatch.disable_alarm_actions(
+        AlarmNames=["stream-scale-up", "stream-scale-down"]
+    )
+    fake_aws.clock.advance(60)
+
+    (entry,) = KinesisCapacityModeAdvisor(dry_run=False).advise()
+
+    assert entry["recommended_stream_mode"] == "PROVISIONED"
+    assert entry["status"] == "SWITCHED"
+    for alarm_name in ("stream-scale-up", "stream-scale-down"):
+        assert fake_aws.cloudwatch.alarms[alarm_name]["ActionsEnabled"]
+
+    fake_aws.clock.advance(60)
+    assert get_stream_mode(fake_aws, "stream") == "PROVISIONED"
+
+    # the switch delays scale-downs but not scale-ups
+    alarm_event = AlarmEvent.from_alarm(fake_aws.cloudwatch.alarms["stream-scale-up"])
+    for scaler_class, in_cooldown in (
+        (KinesisUpscaler, False),
+        (KinesisDownscaler, True),
+    ):
+        scaler = scaler_class(alarm_event)
+        scaler.stream_name = "stream"
+        assert scaler.is_in_cooldown() == in_cooldown
+
+
+def test_switches_limit(fake_aws: FakeAWS) -> None:
+    """
+    Ensures a stream isn't switched after the max daily capacity mode switches.
+    """
+    fake_aws.create_stream("spiky", shard_count=4, incoming_bytes_per_second=0)
+    fake_aws.cloudwatch.set_stream_load(
+        "spiky",
+        start_time=fake_aws.clock.time() - 3600,
+        incoming_bytes_per_second=8 * MB,
+    )
+    fake_aws.cloudwatch.set_stream_load(
+        "spiky", start_time=fake_aws.clock.time() - 3300, incoming_bytes_per_second=0
+    )
+    for hours_ago in (1, 2):
+        KinesisAutoscalerLog(
+            stream_name="spiky",
+            scaling_datetime=datetime.now(timezone.utc) - timedelta(hours=hours_ago),
+            shard_count=4,
+            target_shard_count=4,
+            scaling_type="CAPACITY_MODE_SWITCH",
+            expiration_datetime=timedelta(days=1),
+        ).save()
+
+    (entry,) = KinesisCapacityModeAdvisor(dry_run=False).advise()
+
+    assert entry["status"] == "LIMITED"
+    assert fake_aws.kinesis.call_counts["UpdateStreamMode"] == 0
+    assert fake_aws.cloudwatch.alarms["spiky-scale-up"]["ActionsEnabled"]
@@ -0,0 +1,128 @@
+"""
+Kinesis fleet sweeper tests
+"""
+from pytest_mock import MockerFixture
+from kinesis_autoscaler.fleet_sweeper import KinesisFleetSweeper
+from kinesis_autoscaler.usage_metrics import USAGE_FACTOR_METRIC_ID
+from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+from kinesis_autoscaler.aws_clients import get_client
+
+
+def build_alarm(alarm_name: str, stream_name: str, shard_count: int) -> dict:
+    """
+    Builds a stream scaling alarm as returned from describe operation.
+    """
+    return {
+        "AlarmName": alarm_name,
+        "Metrics": [
+            {"Id": "shardCount", "Expression": str(shard_count)},
+            {
+                "Id": "incomingBytes",
+                "MetricStat": {
+                    "Metric": {
+                        "Dimensions": [{"Name": "StreamName", "Value": stream_name}],
+                    },
+                },
+            },
+        ],
+    }
+
+
+def test_sweep_scales_only_streams_requiring_it(mocker: MockerFixture) -> None:
+    """
+    Ensures all streams are evaluated in bulk metric queries
+    and only the streams crossing the thresholds are scaled.
+    """
+    shard_counts = {"hot": 2, "cold": 10, "steady": 4}
+    usage_factors = {"hot": [0.8, 0.3], "cold": [0.1, 0.05], "steady": [0.5, 0.6]}
+    alarms = {}
+    for stream_name, shard_count in shard_counts.items():
+        for alarm_type in ("scale-up", "scale-down"):
+            alarm_name = f"{stream_name}-{alarm_type}"
+            alarms[alarm_name] = build_alarm(alarm_name, stream_name, shard_count)
+
+    def describe_alarms(**kwargs) -> dict:
+        alarm_names = kwargs.get("AlarmNames", alarms.keys())
+        return {"MetricAlarms": [alarms[name] for name in alarm_names]}
+
+    def get_metric_data(MetricDataQueries: list, **_kwargs) -> dict:
+        if MetricDataQueries[0]["Id"] == "iteratorAge":
+            return {"MetricDataResults": [{"Id": "iteratorAge", "Values": [500.0]}]}
+
+        query_streams = {
+            query["Id"].replace("incomingBytes", ""): query["MetricStat"]["Metric"][
+                "Dimensions"
+            ][0]["Value"]
+            for query in MetricDataQueries
+            if query["Id"].endswith("incomingBytes")
+        }
+        return {
+            "MetricDataResults": [
+                {
+                    "Id": query["Id"],
+                    "Values": usage_factors[
+                        query_streams[query["Id"].replace(USAGE_FACTOR_METRIC_ID, "")]
+                    ],
+                }
+                for query in MetricDataQueries
+                if query["ReturnData"]
+            ]
+        }
+
+    cw_client = get_client("cloudwatch")
+    kinesis_client = get_client("kinesis")
+    describe_alarms_mock = mocker.patch.object(
+        cw_client, "describe_alarms", side_effect=describe_alarms
+    )
+    get_metric_data_mock = mocker.patch.object(
+        cw_client, "get_metric_data", side_effect=get_metric_data
+    )
+    put_metric_alarm_mock = mocker.patch.object(cw_client, "put_metric_alarm")
+    mocker.patch.object(cw_client, "set_alarm_state")
+    mocker.patch.object(
+        kinesis_client,
+        "describe_stream_summary",
+        side_effect=lambda StreamName: {
+            "StreamDescriptionSummary": {
+                "OpenShardCount": shard_counts[StreamName],
+                "StreamStatus": "ACTIVE",
+            }
+        },
+    )
+    mocker.patch.object(
+        kinesis_client,
+        "describe_limits",
+        return_value={"ShardLimit": 500, "OpenShardCount": 16},
+    )
+    update_shard_count_mock = mocker.patch.object(
+        get_client("kinesis", mutating=True),
+        "update_shard_count",
+        side_effect=lambda StreamName, TargetShardCount, ScalingType: {
+            "StreamName": StreamName,
+            "CurrentShardCount": shard_counts[StreamName],
+            "TargetShardCount": TargetShardCount,
+        },
+    )
+
+    report = KinesisFleetSweeper().sweep()
+
+    # a single bulk usage factors request, and the cold stream iterator age guard
+    assert get_metric_data_mock.call_count == 2
+    assert describe_alarms_mock.call_args_list[0].kwargs == {
+        "AlarmTypes": ["MetricAlarm"]
+    }
+    assert sorted((entry["stream_name"], entry["status"]) for entry in report) == [
+        ("cold", "SUCCEEDED"),
+        ("hot", "SUCCEEDED"),
+    ]
+    assert sorted(
+        (call.kwargs["StreamName"], call.kwargs["TargetShardCount"])
+        for call in update_shard_count_mock.call_args_list
+    ) == [("cold", 5), ("hot", 4)]
+    assert put_metric_alarm_mock.call_count == 4
+
+    logs = sorted(KinesisAutoscalerLog.scan(), key=lambda log: log.stream_name)
+    assert [(log.stream_name, log.scaling_type) for log in logs] == [
+        ("cold", "SCALE_DOWN"),
+        ("hot", "SCALE_UP"),
+    ]
@@ -0,0 +1,101 @@
+"""
+Kinesis forecaster tests
+"""
+from typing import Iterator
+import pytest
+from kinesis_autoscaler.forecaster import KinesisForecaster
+from kinesis_autoscaler.kinesis_downscaler import KinesisDownscaler
+from kinesis_autoscaler.usage_forecast import SeasonalProfile, get_hour_of_week
+from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+from tests.aws_fakes import FakeAWS, VirtualClock
+
+MB = 1024 * 1024
+HOUR = 3600
+DAY = 24 * HOUR
+
+
+@pytest.fixture
+def fake_aws() -> Iterator[FakeAWS]:
+    """
+    Serves the autoscaler AWS clients from fake services driven by a virtual clock
+    """
+    with FakeAWS(VirtualClock(), resharding_seconds=60).install() as aws:
+        yield aws
+
+
+def test_seasonal_profile_fits_complete_hours() -> None:
+    """
+    Ensures only complete hours are fitted, each hour once, and hours of
+    the week without samples fall back to their hour of the day.
+    """
+    # Monday 2021-11-15 00:00 UTC
+    monday = 1636934400
+    assert get_hour_of_week(monday + 10 * HOUR) == 10
+
+    profile = SeasonalProfile.empty()
+    data_points = [
+        (monday + 10 * HOUR, 2.0),
+        (monday + 10 * HOUR + 300, 3.0),
+        (monday + 11 * HOUR, 1.0),
+    ]
+    profile.fit(data_points, monday + 11 * HOUR + 600)
+    profile.fit(data_points, monday + 11 * HOUR + 900)
+
+    assert profile.fitted_timestamp == monday + 11 * HOUR
+    assert profile.predict(monday + 10 * HOUR) == 3.0
+    assert profile.predict(monday + 11 * HOUR) is None
+    # Tuesday 10:00 has no weekly samples yet
+    assert profile.predict(monday + DAY + 10 * HOUR) == 3.0
+
+    profile.fit([(monday + 7 * DAY + 10 * HOUR, 1.0)], monday + 7 * DAY + 11 * HOUR)
+    assert profile.predict(monday + 10 * HOUR) == pytest.approx(2.0)
+    assert profile.peak(monday + 9 * HOUR, monday + 11 * HOUR) == pytest.approx(2.0)
+
+
+def test_forecast_prescales_ahead_of_daily_peak(fake_aws: FakeAWS) -> None:
+    """
+    Ensures streams with a daily peak at the current hour are pre-scaled,
+    and the profiles are refitted only once the hour ends.
+    """
+    fake_aws.create_stream("peaky", shard_count=2, incoming_bytes_per_second=0.4 * MB)
+    fake_aws.create_stream("steady", shard_count=2, incoming_bytes_per_second=MB)
+    now = fake_aws.clock.time()
+    hour_start = now - now % HOUR
+    for days in range(1, 8):
+        peak_start = hour_start - days * DAY
+        fake_aws.cloudwatch.set_stream_load(
+            "peaky", start_time=peak_start, incoming_bytes_per_second=1.8 * MB
+        )
+        fake_aws.cloudwatch.set_stream_load(
+            "peaky", start_time=peak_start + HOUR, incoming_bytes_per_second=0.4 * MB
+        )
+
+    report = KinesisForecaster().forecast()
+
+    assert report == [
+        {
+            "stream_name": "peaky",
+            "scaling_type": "FORECAST_SCALE_UP",
+            "target_shard_count": 4,
+            "status": "SUCCEEDED",
+        }
+    ]
+    assert fake_aws.kinesis.call_counts["UpdateShardCount"] == 1
+    assert [log.scaling_type for log in KinesisAutoscalerLog.scan()] == [
+        "FORECAST_SCALE_UP"
+    ]
+
+    metric_data_calls = fake_aws.cloudwatch.call_counts["GetMetricData"]
+    assert KinesisForecaster().forecast() == []
+    assert fake_aws.cloudwatch.call_counts["GetMetricData"] == metric_data_calls
+
+
+def test_scale_down_holds_off_forecast_peak() -> None:
+    """
+    Ensures the scale-down target keeps the forecast peak within the
+    hysteresis band.
+    """
+    calculate_target_shard_count = KinesisDownscaler.calculate_target_shard_count
+    assert calculate_target_shard_count(8, 0.1) == 2
+    assert calculate_target_shard_count(8, 0.1, forecast_used_shard_count=3.0) == 6
+    assert calculate_target_shard_count(8, 0.1, forecast_used_shard_count=6.0) == 8
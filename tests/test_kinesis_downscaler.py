@@ -5,13 +5,11 @@ from unittest.mock import call
 from datetime import datetime, timedelta, timezone
 from freezegun import freeze_time
 from pytest_mock import MockerFixture
+from kinesis_autoscaler.alarm_event import AlarmEvent
 from kinesis_autoscaler.kinesis_downscaler import KinesisDownscaler
 from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
-from kinesis_autoscaler.kinesis_autoscaler import (
-    CW_CLIENT,
-    KINESIS_CLIENT,
-    LOGS_RETENTION_DAYS,
-)
+from kinesis_autoscaler.kinesis_autoscaler import LOGS_RETENTION_DAYS
+from kinesis_autoscaler.aws_clients import get_client
 from tests.aws_client_mockers.cw_client_mocker import CloudWatchClientMocker
 from tests.aws_client_mockers.kinesis_client_mocker import KinesisClientMocker
 
@@ -28,8 +26,8 @@ def test_downscale_operation(mocker: MockerFixture) -> None:
     current_shard_count = 10
     expected_target_shard_count = 8
 
-    cw_client_mock = CloudWatchClientMocker(CW_CLIENT, mocker)
-    kinesis_client_mock = KinesisClientMocker(KINESIS_CLIENT, mocker)
+    cw_client_mock = CloudWatchClientMocker(get_client("cloudwatch"), mocker)
+    kinesis_client_mock = KinesisClientMocker(get_client("kinesis"), mocker)
 
     kinesis_client_mock.describe_stream_summary(current_shard_count)
     update_shard_count_mock = kinesis_client_mock.update_shard_count(
@@ -54,7 +52,9 @@ def test_downscale_operation(mocker: MockerFixture) -> None:
                     "Id": "incomingBytes",
                     "MetricStat": {
                         "Metric": {
-                            "Dimensions": [{"value": stream_name}],
+                            "Dimensions": [
+                                {"name": "StreamName", "value": stream_name}
+                            ],
                         },
                     },
                 },
@@ -62,7 +62,7 @@ def test_downscale_operation(mocker: MockerFixture) -> None:
         },
     }
 
-    KinesisDownscaler(event_message).scale()
+    KinesisDownscaler(AlarmEvent.parse(event_message)).scale()
 
     update_shard_count_mock.assert_called_once_with(
         StreamName=stream_name,
@@ -85,7 +85,8 @@ def test_downscale_operation(mocker: MockerFixture) -> None:
                 ],
                 ActionsEnabled=True,
             ),
-        ]
+        ],
+        any_order=True,
     )
     set_alarm_state_mock.assert_has_calls(
         [
@@ -99,7 +100,8 @@ def test_downscale_operation(mocker: MockerFixture) -> None:
                 StateValue="INSUFFICIENT_DATA",
                 StateReason="Shard count metric updated",
             ),
-        ]
+        ],
+        any_order=True,
     )
 
     logs = list(KinesisAutoscalerLog.scan())
@@ -116,3 +118,36 @@ def test_downscale_operation(mocker: MockerFixture) -> None:
     assert log.expiration_datetime == frozen_datetime + timedelta(
         days=LOGS_RETENTION_DAYS
     )
+
+
+def test_downscale_blocked_by_lagging_consumers(mocker: MockerFixture) -> None:
+    """
+    Ensures the scale-down is blocked while the stream consumers are behind.
+    """
+    kinesis_client_mock = KinesisClientMocker(get_client("kinesis"), mocker)
+    kinesis_client_mock.describe_stream_summary(10)
+    update_shard_count_mock = kinesis_client_mock.update_shard_count("stream", 10, 8)
+    CloudWatchClientMocker(get_client("cloudwatch"), mocker).get_metric_data(
+        metric_data_results=[1000.0, 120000.0]
+    )
+
+    event_message = {
+        "AlarmName": "stream-scale-down",
+        "Trigger": {
+            "Metrics": [
+                {"Id": "shardCount", "Expression": "10"},
+                {
+                    "Id": "incomingBytes",
+                    "MetricStat": {
+                        "Metric": {
+                            "Dimensions": [{"name": "StreamName", "value": "stream"}]
+                        }
+                    },
+                },
+            ],
+        },
+    }
+
+    KinesisDownscaler(AlarmEvent.parse(event_message)).scale()
+
+    update_shard_count_mock.assert_not_called()
@@ -0,0 +1,103 @@
+"""
+Kinesis emergency upscaler tests
+"""
+from datetime import datetime, timedelta, timezone
+from pytest_mock import MockerFixture
+from kinesis_autoscaler.alarm_event import AlarmEvent
+from kinesis_autoscaler.kinesis_emergency_upscaler import KinesisEmergencyUpscaler
+from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+from kinesis_autoscaler.aws_clients import get_client
+from tests.aws_client_mockers.cw_client_mocker import CloudWatchClientMocker
+from tests.aws_client_mockers.kinesis_client_mocker import KinesisClientMocker
+
+
+def test_emergency_upscale_operation(mocker: MockerFixture) -> None:
+    """
+    Ensures a write throttling alarm doubles the stream shard count without
+    querying its usage, and then syncs the stream scaling alarms and resets
+    the emergency alarm, so it triggers again if the stream is still throttled.
+    """
+    stream_name = "subscribed-stream"
+    cw_client_mock = CloudWatchClientMocker(get_client("cloudwatch"), mocker)
+    kinesis_client_mock = KinesisClientMocker(get_client("kinesis"), mocker)
+
+    kinesis_client_mock.describe_stream_summary(6)
+    kinesis_client_mock.describe_limits()
+    update_shard_count_mock = kinesis_client_mock.update_shard_count(stream_name, 6, 12)
+    describe_alarms_mock = cw_client_mock.describe_alarms(
+        alarm_names=[f"{stream_name}-scale-up", f"{stream_name}-scale-down"]
+    )
+    put_metric_alarm_mock = cw_client_mock.put_metric_alarm()
+    set_alarm_state_mock = cw_client_mock.set_alarm_state()
+    get_metric_data_mock = cw_client_mock.get_metric_data(metric_data_results=[])
+
+    event_message = {
+        "AlarmName": f"{stream_name}-emergency-scale-up",
+        "StateChangeTime": "2021-11-16T00:00:00.000+0000",
+        "Trigger": {
+            "MetricName": "WriteProvisionedThroughputExceeded",
+            "Namespace": "AWS/Kinesis",
+            "Dimensions": [{"value": stream_name, "name": "StreamName"}],
+        },
+    }
+
+    KinesisEmergencyUpscaler(AlarmEvent.parse(event_message)).scale()
+    KinesisEmergencyUpscaler(AlarmEvent.parse(event_message)).scale()
+
+    update_shard_count_mock.assert_called_once_with(
+        StreamName=stream_name,
+        ScalingType="UNIFORM_SCALING",
+        TargetShardCount=12,
+    )
+    get_metric_data_mock.assert_not_called()
+    describe_alarms_mock.assert_called_once_with(
+        AlarmNames=[f"{stream_name}-scale-up", f"{stream_name}-scale-down"]
+    )
+    assert put_metric_alarm_mock.call_count == 2
+    set_alarm_state_mock.assert_any_call(
+        AlarmName=f"{stream_name}-emergency-scale-up",
+        StateValue="INSUFFICIENT_DATA",
+        StateReason="Shard count metric updated",
+    )
+
+    logs = list(KinesisAutoscalerLog.scan())
+    assert [(log.scaling_type, log.target_shard_count) for log in logs] == [
+        ("EMERGENCY_SCALE_UP", 12)
+    ]
+
+
+def test_emergency_upscale_limits(mocker: MockerFixture) -> None:
+    """
+    Ensures the emergency scale-up waits for the short emergency cooldown
+    after a previous scale-up, and doesn't exceed the daily operations limit.
+    """
+    stream_name = "subscribed-stream"
+    kinesis_client_mock = KinesisClientMocker(get_client("kinesis"), mocker)
+    describe_stream_summary_mock = kinesis_client_mock.describe_stream_summary(6)
+    kinesis_client_mock.describe_limits()
+    update_shard_count_mock = kinesis_client_mock.update_shard_count(stream_name, 6, 12)
+
+    now = datetime.now(timezone.utc)
+    for minutes_ago in range(1, 600, 60):
+        KinesisAutoscalerLog(
+            stream_name=stream_name,
+            scaling_datetime=now - timedelta(minutes=minutes_ago),
+            shard_count=6,
+            target_shard_count=6,
+            scaling_type="SCALE_UP",
+            expiration_datetime=timedelta(days=1),
+        ).save()
+    alarm_event = AlarmEvent(
+        f"{stream_name}-emergency-scale-up", stream_name, None, "2021-11-16T00:00"
+    )
+
+    KinesisEmergencyUpscaler(alarm_event).scale()
+    describe_stream_summary_mock.assert_not_called()
+
+    # out of the emergency cooldown, but the daily limit was reached
+    mocker.patch.object(KinesisEmergencyUpscaler, "cooldown_period", timedelta(0))
+    KinesisEmergencyUpscaler(
+        AlarmEvent(alarm_event.alarm_name, stream_name, None, "2021-11-16T00:05")
+    ).scale()
+    describe_stream_summary_mock.assert_called_once()
+    update_shard_count_mock.assert_not_called()
@@ -3,15 +3,14 @@ Kinesis upscaler tests
 """
 from unittest.mock import call
 from datetime import datetime, timedelta, timezone
+import pytest
 from freezegun import freeze_time
 from pytest_mock import MockerFixture
+from kinesis_autoscaler.alarm_event import AlarmEvent
 from kinesis_autoscaler.kinesis_upscaler import KinesisUpscaler
 from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
-from kinesis_autoscaler.kinesis_autoscaler import (
-    CW_CLIENT,
-    KINESIS_CLIENT,
-    LOGS_RETENTION_DAYS,
-)
+from kinesis_autoscaler.kinesis_autoscaler import LOGS_RETENTION_DAYS
+from kinesis_autoscaler.aws_clients import get_client
 from tests.aws_client_mockers.cw_client_mocker import CloudWatchClientMocker
 from tests.aws_client_mockers.kinesis_client_mocker import KinesisClientMocker
 
@@ -28,10 +27,11 @@ def test_upscale_operation(mocker: MockerFixture) -> None:
     current_shard_count = 2
     expected_target_shard_count = 4
 
-    cw_client_mock = CloudWatchClientMocker(CW_CLIENT, mocker)
-    kinesis_client_mock = KinesisClientMocker(KINESIS_CLIENT, mocker)
+    cw_client_mock = CloudWatchClientMocker(get_client("cloudwatch"), mocker)
+    kinesis_client_mock = KinesisClientMocker(get_client("kinesis"), mocker)
 
     kinesis_client_mock.describe_stream_summary(current_shard_count)
+    kinesis_client_mock.describe_limits()
     update_shard_count_mock = kinesis_client_mock.update_shard_count(
         stream_name, current_shard_count, expected_target_shard_count
     )
@@ -53,7 +53,9 @@ def test_upscale_operation(mocker: MockerFixture) -> None:
                     "Id": "incomingBytes",
                     "MetricStat": {
                         "Metric": {
-                            "Dimensions": [{"value": stream_name}],
+                            "Dimensions": [
+                                {"name": "StreamName", "value": stream_name}
+                            ],
                         },
                     },
                 },
@@ -61,7 +63,7 @@ def test_upscale_operation(mocker: MockerFixture) -> None:
         },
     }
 
-    KinesisUpscaler(event_message).scale()
+    KinesisUpscaler(AlarmEvent.parse(event_message)).scale()
 
     update_shard_count_mock.assert_called_once_with(
         StreamName=stream_name,
@@ -84,7 +86,8 @@ def test_upscale_operation(mocker: MockerFixture) -> None:
                 ],
                 ActionsEnabled=True,
             ),
-        ]
+        ],
+        any_order=True,
     )
     set_alarm_state_mock.assert_has_calls(
         [
@@ -98,7 +101,8 @@ def test_upscale_operation(mocker: MockerFixture) -> None:
                 StateValue="INSUFFICIENT_DATA",
                 StateReason="Shard count metric updated",
             ),
-        ]
+        ],
+        any_order=True,
     )
 
     logs = list(KinesisAutoscalerLog.scan())
@@ -115,3 +119,181 @@ def test_upscale_operation(mocker: MockerFixture) -> None:
     assert log.expiration_datetime == frozen_datetime + timedelta(
         days=LOGS_RETENTION_DAYS
     )
+
+
+def test_proportional_upscale_target(mocker: MockerFixture) -> None:
+    """
+    Ensures the proportional upscale mode scales straight to the target
+    usage factor, limited by the max increase of a single scaling operation.
+    """
+    mocker.patch("kinesis_autoscaler.kinesis_upscaler.UPSCALE_MODE", "PROPORTIONAL")
+    cw_client_mock = CloudWatchClientMocker(get_client("cloudwatch"), mocker)
+    upscaler = KinesisUpscaler(
+        AlarmEvent("subscribed-stream-scale-up", "subscribed-stream")
+    )
+    upscaler.stream_name = "subscribed-stream"
+
+    with freeze_time("2021-11-16 12:07:30"):
+        get_metric_data_mock = cw_client_mock.get_metric_data(
+            metric_data_results=[0.9, 0.4]
+        )
+        assert upscaler.get_target_shard_count(10) == 18
+        # the current partial period is left out
+        assert get_metric_data_mock.call_args.kwargs["EndTime"] == datetime(
+            2021, 11, 16, 12, 5
+        )
+
+    cw_client_mock.get_metric_data(metric_data_results=[4.0])
+    assert upscaler.get_target_shard_count(10) == 20
+
+    cw_client_mock.get_metric_data(metric_data_results=[0.6])
+    assert upscaler.get_target_shard_count(10) == 15
+
+    cw_client_mock.get_metric_data(metric_data_results=[])
+    assert upscaler.get_target_shard_count(100) == 125
+
+
+def test_alarms_sync_skips_synced_alarms(mocker: MockerFixture) -> None:
+    """
+    Ensures an out of sync alarm triggers an alarms sync without scaling,
+    and that alarms already in sync aren't updated.
+    """
+    stream_name = "subscribed-stream"
+    scale_up_alarm_name = f"{stream_name}-scale-up"
+    scale_down_alarm_name = f"{stream_name}-scale-down"
+
+    kinesis_client_mock = KinesisClientMocker(get_client("kinesis"), mocker)
+    kinesis_client_mock.describe_stream_summary(4)
+    kinesis_client_mock.describe_limits()
+    update_shard_count_mock = kinesis_client_mock.update_shard_count(stream_name, 4, 8)
+    mocker.patch.object(
+        get_client("cloudwatch"),
+        "describe_alarms",
+        return_value={
+            "MetricAlarms": [
+                {
+                    "AlarmName": scale_up_alarm_name,
+                    "ActionsEnabled": True,
+                    "Metrics": [{"Id": "shardCount", "Expression": "2"}],
+                },
+                {
+                    "AlarmName": scale_down_alarm_name,
+                    "ActionsEnabled": True,
+                    "Metrics": [{"Id": "shardCount", "Expression": "4"}],
+                },
+            ]
+        },
+    )
+    cw_client_mock = CloudWatchClientMocker(get_client("cloudwatch"), mocker)
+    put_metric_alarm_mock = cw_client_mock.put_metric_alarm()
+    set_alarm_state_mock = cw_client_mock.set_alarm_state()
+
+    event_message = {
+        "AlarmName": scale_up_alarm_name,
+        "Trigger": {
+            "Metrics": [
+                {"Id": "shardCount", "Expression": "2"},
+                {
+                    "Id": "incomingBytes",
+                    "MetricStat": {
+                        "Metric": {
+                            "Dimensions": [{"name": "StreamName", "value": stream_name}]
+                        }
+                    },
+                },
+            ],
+        },
+    }
+
+    KinesisUpscaler(AlarmEvent.parse(event_message)).scale()
+
+    update_shard_count_mock.assert_not_called()
+    put_metric_alarm_mock.assert_called_once_with(
+        AlarmName=scale_up_alarm_name,
+        ActionsEnabled=True,
+        Metrics=[{"Id": "shardCount", "Expression": "4"}],
+    )
+    set_alarm_state_mock.assert_called_once_with(
+        AlarmName=scale_up_alarm_name,
+        StateValue="INSUFFICIENT_DATA",
+        StateReason="Shard count metric updated",
+    )
+
+
+def test_upscale_skips_updating_stream(mocker: MockerFixture) -> None:
+    """
+    Ensures a stream that is still resharding isn't scaled or synced.
+    """
+    kinesis_client_mock = KinesisClientMocker(get_client("kinesis"), mocker)
+    kinesis_client_mock.describe_stream_summary(3, stream_status="UPDATING")
+    update_shard_count_mock = kinesis_client_mock.update_shard_count("stream", 2, 4)
+    describe_alarms_mock = CloudWatchClientMocker(
+        get_client("cloudwatch"), mocker
+    ).describe_alarms(alarm_names=[])
+
+    event_message = {
+        "AlarmName": "stream-scale-up",
+        "Trigger": {
+            "Metrics": [
+                {"Id": "shardCount", "Expression": "2"},
+                {
+                    "Id": "incomingBytes",
+                    "MetricStat": {
+                        "Metric": {
+                            "Dimensions": [{"name": "StreamName", "value": "stream"}]
+                        }
+                    },
+                },
+            ],
+        },
+    }
+
+    KinesisUpscaler(AlarmEvent.parse(event_message)).scale()
+
+    update_shard_count_mock.assert_not_called()
+    describe_alarms_mock.assert_not_called()
+
+
+def test_duplicate_alarm_events_are_skipped(mocker: MockerFixture) -> None:
+    """
+    Ensures each alarm event is processed once, and that an event that failed
+    before resharding the stream can be processed by its redelivery.
+    """
+    kinesis_client_mock = KinesisClientMocker(get_client("kinesis"), mocker)
+    describe_stream_summary_mock = kinesis_client_mock.describe_stream_summary(
+        3, stream_status="UPDATING"
+    )
+    describe_stream_summary_mock.side_effect = [RuntimeError("failed"), None]
+
+    event_message = {
+        "AlarmName": "stream-scale-up",
+        "StateChangeTime": "2021-11-16T00:00:00.000+0000",
+        "Trigger": {
+            "Metrics": [
+                {"Id": "shardCount", "Expression": "2"},
+                {
+                    "Id": "incomingBytes",
+                    "MetricStat": {
+                        "Metric": {
+                            "Dimensions": [{"name": "StreamName", "value": "stream"}]
+                        }
+                    },
+                },
+            ],
+        },
+    }
+
+    with pytest.raises(RuntimeError):
+        KinesisUpscaler(AlarmEvent.parse(event_message)).scale()
+
+    describe_stream_summary_mock.side_effect = None
+    KinesisUpscaler(AlarmEvent.parse(event_message)).scale()
+    KinesisUpscaler(AlarmEvent.parse(event_message)).scale()
+    assert describe_stream_summary_mock.call_count == 2
+
+    KinesisUpscaler(
+        AlarmEvent.parse(
+            dict(event_message, StateChangeTime="2021-11-16T00:05:00.000+0000")
+        )
+    ).scale()
+    assert describe_stream_summary_mock.call_count == 3
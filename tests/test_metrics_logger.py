@@ -0,0 +1,109 @@
+"""
+EMF metrics logger tests
+"""
+from typing import Iterator
+import pytest
+from botocore.stub import Stubber
+from pytest_mock import MockerFixture
+from kinesis_autoscaler import metrics_logger
+from kinesis_autoscaler.alarm_event import AlarmEvent
+from kinesis_autoscaler.aws_clients import get_client
+from kinesis_autoscaler.kinesis_upscaler import KinesisUpscaler
+from tests.aws_client_mockers.kinesis_client_mocker import KinesisClientMocker
+
+
+@pytest.fixture
+def metrics_sink() -> Iterator[metrics_logger.InMemoryMetricsSink]:
+    """
+    Captures the emitted EMF documents in memory
+    """
+    sink = metrics_logger.InMemoryMetricsSink()
+    metrics_logger.set_metrics_sink(sink)
+    yield sink
+    metrics_logger.set_metrics_sink(metrics_logger.StdoutMetricsSink())
+
+
+def test_metrics_scope_emits_emf_document(
+    metrics_sink: metrics_logger.InMemoryMetricsSink,
+) -> None:
+    """
+    Ensures a metrics scope emits a single valid EMF document, and that
+    metrics outside of a scope are ignored.
+    """
+    metrics_logger.put_metric("Ignored", 1)
+
+    with metrics_logger.metrics_scope({"ScalingType": "SCALE_UP"}):
+        with metrics_logger.timer("Update"):
+            pass
+        metrics_logger.put_metric("TargetShardCount", 4, "Count")
+        metrics_logger.put_metric("TargetShardCount", 8, "Count")
+        metrics_logger.set_property("StreamName", "stream")
+
+    assert len(metrics_sink.documents) == 1
+    document = metrics_sink.documents[0]
+    assert document["_aws"]["CloudWatchMetrics"][0]["Namespace"] == "KinesisAutoscaler"
+    assert document["_aws"]["CloudWatchMetrics"][0]["Dimensions"] == [["ScalingType"]]
+    assert document["_aws"]["CloudWatchMetrics"][0]["Metrics"] == [
+        {"Name": "UpdateDuration", "Unit": "Milliseconds"},
+        {"Name": "TargetShardCount", "Unit": "Count"},
+    ]
+    assert document["ScalingType"] == "SCALE_UP"
+    assert document["StreamName"] == "stream"
+    assert document["TargetShardCount"] == [4, 8]
+    assert document["UpdateDuration"] >= 0
+    assert "Ignored" not in document
+
+
+def test_aws_calls_are_recorded(
+    metrics_sink: metrics_logger.InMemoryMetricsSink,
+) -> None:
+    """
+    Ensures the AWS clients calls latency and retries are recorded.
+    """
+    kinesis_client = get_client("kinesis")
+    with Stubber(kinesis_client) as stubber:
+        stubber.add_response(
+            "list_streams",
+            {"StreamNames": [], "HasMoreStreams": False},
+        )
+        with metrics_logger.metrics_scope({"ScalingType": "SCALE_UP"}):
+            kinesis_client.list_streams()
+
+    document = metrics_sink.documents[0]
+    assert document["kinesis.ListStreams.Latency"] >= 0
+    assert document["kinesis.ListStreams.Retries"] == 0
+
+
+def test_scaling_process_phases_are_recorded(
+    mocker: MockerFixture, metrics_sink: metrics_logger.InMemoryMetricsSink
+) -> None:
+    """
+    Ensures the scaling process emits its phases durations and decision inputs.
+    """
+    KinesisClientMocker(get_client("kinesis"), mocker).describe_stream_summary(
+        3, stream_status="UPDATING"
+    )
+    event_message = {
+        "AlarmName": "stream-scale-up",
+        "Trigger": {
+            "Metrics": [
+                {"Id": "shardCount", "Expression": "2"},
+                {
+                    "Id": "incomingBytes",
+                    "MetricStat": {
+                        "Metric": {
+                            "Dimensions": [{"name": "StreamName", "value": "stream"}]
+                        }
+                    },
+                },
+            ],
+        },
+    }
+
+    KinesisUpscaler(AlarmEvent.parse(event_message)).scale()
+
+    document = metrics_sink.documents[0]
+    assert document["StreamName"] == "stream"
+    assert document["ScalingType"] == "SCALE_UP"
+    assert "ParseDuration" in document
+    assert "DescribeDuration" in document
@@ -0,0 +1,93 @@
+"""
+Scaling policy simulator tests
+"""
+import csv
+from pathlib import Path
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from simulator.policy_simulator import (  # noqa: E402
+    SimulationConfig,
+    StreamMetrics,
+    load_stream_metrics,
+    rolling_max,
+    simulate,
+)
+
+
+def test_rolling_max() -> None:
+    """
+    Ensures the rolling max matches the naive trailing window max.
+    """
+    values = np.random.default_rng(0).random((3, 50))
+    for window in (1, 2, 7, 50):
+        expected = np.empty_like(values)
+        for index in range(values.shape[1]):
+            window_start = max(index - window + 1, 0)
+            window_end = index + 1
+            expected[:, index] = values[:, window_start:window_end].max(axis=1)
+        assert np.array_equal(rolling_max(values, window), expected)
+
+
+def test_simulate_scales_streams_to_their_load() -> None:
+    """
+    Ensures a stream whose load spikes is scaled up, and an idle stream is
+    scaled down once its scale-down alarm evaluated a day of low usage.
+    """
+    step_count = 3 * 24 * 60
+    incoming_bytes = np.zeros((2, step_count), dtype=np.float32)
+    # spiky stream: 0.5 shards of usage for a day, then 3 shards of usage
+    day_steps = 24 * 60
+    incoming_bytes[0, :day_steps] = 0.5 * 1024 * 1024 * 60
+    incoming_bytes[0, day_steps:] = 3 * 1024 * 1024 * 60
+    # idle stream: 0.1 shards of usage
+    incoming_bytes[1, :] = 0.1 * 1024 * 1024 * 60
+    metrics = StreamMetrics(
+        ["spiky", "idle"],
+        60,
+        incoming_bytes,
+        np.zeros_like(incoming_bytes),
+        np.zeros_like(incoming_bytes),
+    )
+
+    report = simulate(
+        metrics,
+        SimulationConfig(reshard_delay_seconds=60),
+        initial_shard_counts=[1, 8],
+    )
+
+    spiky = report["streams"]["spiky"]
+    assert spiky["scale_up_operations"] == 3
+    assert spiky["final_shard_count"] == 6
+    assert 0 < spiky["overloaded_hours"] < 0.5
+
+    idle = report["streams"]["idle"]
+    assert idle["scale_up_operations"] == 0
+    assert idle["scale_down_operations"] >= 2
+    assert idle["final_shard_count"] == 1
+    assert report["total"]["shard_hours"] < 9 * 72
+
+
+def test_load_stream_metrics_from_csv(tmp_path: Path) -> None:
+    """
+    Ensures recorded metrics are loaded as [stream, step] arrays,
+    with missing data points as zeros.
+    """
+    path = tmp_path / "metrics.csv"
+    with open(path, "w", newline="") as csv_file:
+        writer = csv.writer(csv_file)
+        writer.writerow(
+            ["timestamp", "stream_name", "incoming_bytes", "incoming_records"]
+        )
+        writer.writerow(["2021-11-16T00:00:00Z", "a", 10, 1])
+        writer.writerow(["2021-11-16T00:01:00Z", "a", 20, 2])
+        writer.writerow(["2021-11-16T00:03:00Z", "b", 30, 3])
+
+    metrics = load_stream_metrics(str(path))
+
+    assert metrics.stream_names == ["a", "b"]
+    assert metrics.step_seconds == 60
+    assert metrics.incoming_bytes.tolist() == [[10, 20, 0, 0], [0, 0, 0, 30]]
+    assert metrics.incoming_records.tolist() == [[1, 2, 0, 0], [0, 0, 0, 3]]
+    assert not metrics.outgoing_bytes.any()
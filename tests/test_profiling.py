@@ -0,0 +1,106 @@
+"""
+Handlers profiling tests
+"""
+import sys
+import json
+import logging
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from pytest_mock import MockerFixture
+from kinesis_autoscaler import profiling
+
+
+payloads_cache = []
+
+
+def build_payload(size: int) -> list:
+    """
+    Allocates a cached payload in a worker thread.
+    """
+    payload = [str(index) for index in range(size)]
+    payloads_cache.append(payload)
+    return payload
+
+
+def invoke(event: dict, _context) -> int:
+    """
+    Handler scaling its work across worker threads.
+    """
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        payloads = list(executor.map(build_payload, [event["size"]] * 2))
+    return sum(len(payload) for payload in payloads)
+
+
+def get_profile_document(caplog: pytest.LogCaptureFixture) -> dict:
+    """
+    Returns the logged invocation profile.
+    """
+    (record,) = [
+        record for record in caplog.records if "Invocation profile" in record.message
+    ]
+    return json.loads(record.message)
+
+
+def test_sampled_invocation_is_profiled(
+    mocker: MockerFixture, caplog: pytest.LogCaptureFixture, tmp_path: Path
+) -> None:
+    """
+    Ensures a sampled invocation logs its top functions (including its worker
+    threads) and allocations, and writes its full profiles.
+    """
+    mocker.patch.object(profiling, "PROFILING_MODES", {"CPU", "MEMORY"})
+    mocker.patch.object(profiling, "PROFILING_SAMPLE_RATE", 1)
+    mocker.patch.object(profiling, "PROFILING_OUTPUT_PATH", str(tmp_path))
+    caplog.set_level(logging.INFO)
+
+    assert profiling.profiled(invoke)({"size": 10000}, None) == 20000
+
+    document = get_profile_document(caplog)
+    assert document["handler"] == "invoke"
+    functions = [entry["function"] for entry in document["top_functions"]]
+    assert any(function.endswith("(build_payload)") for function in functions)
+    assert document["peak_memory_kb"] > 0
+    assert any(
+        "test_profiling.py" in entry["location"]
+        for entry in document["top_allocations"]
+    )
+    assert sorted(Path(path).suffix for path in document["profile_files"]) == [
+        ".pstats",
+        ".tracemalloc",
+    ]
+    assert all(Path(path).exists() for path in document["profile_files"])
+
+
+def test_invocation_is_not_profiled_by_default(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """
+    Ensures invocations aren't profiled unless profiling is enabled.
+    """
+    caplog.set_level(logging.INFO)
+
+    assert profiling.profiled(invoke)({"size": 10}, None) == 20
+
+    assert not any("Invocation profile" in record.message for record in caplog.records)
+
+
+def test_profiling_modules_are_imported_lazily() -> None:
+    """
+    Ensures importing the handlers doesn't import the profiling modules,
+    which only profiled invocations use.
+    """
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, handler; "
+            "print(sorted({'cProfile', 'pstats', 'tracemalloc'} & set(sys.modules)))",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+
+    assert output.strip() == "[]"
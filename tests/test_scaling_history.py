@@ -0,0 +1,79 @@
+"""
+Scaling history and cooldown tests
+"""
+from datetime import datetime, timedelta, timezone
+from pytest_mock import MockerFixture
+from kinesis_autoscaler import scaling_history
+from kinesis_autoscaler.kinesis_upscaler import KinesisUpscaler
+from kinesis_autoscaler.kinesis_downscaler import KinesisDownscaler
+from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+
+
+def save_scaling_log(
+    stream_name: str, scaling_datetime: datetime, scaling_type: str
+) -> None:
+    """
+    Saves a stream scaling log.
+    :param stream_name: name of the scaled stream
+    :param scaling_datetime: the scaling operation datetime
+    :param scaling_type: the scaling type of the operation
+    """
+    KinesisAutoscalerLog(
+        stream_name=stream_name,
+        scaling_datetime=scaling_datetime,
+        shard_count=2,
+        target_shard_count=4,
+        scaling_type=scaling_type,
+        expiration_datetime=timedelta(days=1),
+    ).save()
+
+
+def test_latest_scaling_is_cached(mocker: MockerFixture) -> None:
+    """
+    Ensures the latest scaling log is queried once and then served from cache.
+    """
+    stream_name = "subscribed-stream"
+    now = datetime.utcnow().replace(tzinfo=timezone.utc)
+    save_scaling_log(stream_name, now - timedelta(hours=3), "SCALE_UP")
+    save_scaling_log(stream_name, now - timedelta(hours=1), "SCALE_DOWN")
+    query_spy = mocker.spy(KinesisAutoscalerLog, "query")
+
+    latest_scaling = scaling_history.get_latest_scaling(stream_name)
+    assert latest_scaling.scaling_type == "SCALE_DOWN"
+    assert latest_scaling.scaling_datetime == now - timedelta(hours=1)
+    assert scaling_history.get_latest_scaling(stream_name) == latest_scaling
+    assert scaling_history.get_latest_scaling("other-stream") is None
+    assert query_spy.call_count == 2
+
+
+def test_cooldown_per_scaling_direction() -> None:
+    """
+    Ensures scale-up waits only for a recent scale-up,
+    while scale-down waits for any recent scaling operation.
+    """
+    now = datetime.utcnow().replace(tzinfo=timezone.utc)
+    save_scaling_log("scaled-up-stream", now - timedelta(minutes=10), "SCALE_UP")
+    save_scaling_log("scaled-down-stream", now - timedelta(minutes=1), "SCALE_DOWN")
+    save_scaling_log("stable-stream", now - timedelta(hours=2), "SCALE_UP")
+
+    def is_in_cooldown(scaler_class, stream_name: str) -> bool:
+        scaler = scaler_class({})
+        scaler.stream_name = stream_name
+        return scaler.is_in_cooldown()
+
+    assert not is_in_cooldown(KinesisUpscaler, "scaled-up-stream")
+    assert is_in_cooldown(KinesisDownscaler, "scaled-up-stream")
+    assert not is_in_cooldown(KinesisUpscaler, "scaled-down-stream")
+    assert is_in_cooldown(KinesisDownscaler, "scaled-down-stream")
+    assert not is_in_cooldown(KinesisDownscaler, "stable-stream")
+    assert not is_in_cooldown(KinesisDownscaler, "unscaled-stream")
+
+
+def test_downscale_target_keeps_hysteresis_band() -> None:
+    """
+    Ensures the scale-down target keeps the projected usage factor below
+    the scale-up threshold minus the hysteresis margin.
+    """
+    assert KinesisDownscaler.calculate_target_shard_count(10, 0.2) == 4
+    assert KinesisDownscaler.calculate_target_shard_count(10, 0.01) == 1
+    assert KinesisDownscaler.calculate_target_shard_count(10, 0.6) == 10
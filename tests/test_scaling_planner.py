@@ -0,0 +1,78 @@
+"""
+Kinesis scaling planner tests
+"""
+from datetime import datetime, timedelta, timezone
+from freezegun import freeze_time
+from kinesis_autoscaler.scaling_planner import KinesisScalingPlanner
+from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+
+
+def test_plan_uses_shortest_operations_sequence() -> None:
+    """
+    Ensures each planned operation at most doubles or halves the shard count.
+    """
+    assert KinesisScalingPlanner.plan(3, 20, 10) == [6, 12, 20]
+    assert KinesisScalingPlanner.plan(20, 3, 10) == [10, 5, 3]
+    assert KinesisScalingPlanner.plan(10, 8, 10) == [8]
+
+
+def test_plan_reserves_scale_up_operations() -> None:
+    """
+    Ensures scale-down operations don't use the reserved scale-up operations.
+    """
+    assert KinesisScalingPlanner.plan(3, 20, 2) == [6, 12]
+    assert KinesisScalingPlanner.plan(20, 3, 3) == [10]
+    assert KinesisScalingPlanner.plan(20, 3, 2) == []
+
+
+@freeze_time("2021-11-16")
+def test_next_target_shard_count_respects_daily_limit() -> None:
+    """
+    Ensures the scaling logs of the last 24 hours count towards the daily limit.
+    """
+    stream_name = "subscribed-stream"
+    now = datetime.utcnow().replace(tzinfo=timezone.utc)
+    for hours_ago in range(2, 30, 3):
+        KinesisAutoscalerLog(
+            stream_name=stream_name,
+            scaling_datetime=now - timedelta(hours=hours_ago),
+            shard_count=1,
+            target_shard_count=2,
+            scaling_type="SCALE_UP",
+            expiration_datetime=timedelta(days=1),
+        ).save()
+
+    planner = KinesisScalingPlanner(stream_name)
+
+    assert planner.get_remaining_operations() == 2
+    assert planner.get_next_target_shard_count(4, 16) == 8
+    assert planner.get_next_target_shard_count(16, 4) == 16
+
+
+@freeze_time("2021-11-16")
+def test_only_update_shard_count_operations_are_counted() -> None:
+    """
+    Ensures capacity mode switches and targeted split/merge resharding don't
+    count towards the UpdateShardCount daily limit.
+    """
+    stream_name = "subscribed-stream"
+    now = datetime.utcnow().replace(tzinfo=timezone.utc)
+    for hours_ago, scaling_type, resharding_strategy in (
+        (1, "SCALE_UP", "UNIFORM"),
+        (2, "SCALE_DOWN", None),
+        (3, "SCALE_UP", "TARGETED"),
+        (4, "SCALE_DOWN", "TARGETED"),
+        (5, "CAPACITY_MODE_SWITCH", None),
+        (6, "EMERGENCY_SCALE_UP", "UNIFORM"),
+    ):
+        KinesisAutoscalerLog(
+            stream_name=stream_name,
+            scaling_datetime=now - timedelta(hours=hours_ago),
+            shard_count=1,
+            target_shard_count=2,
+            scaling_type=scaling_type,
+            resharding_strategy=resharding_strategy,
+            expiration_datetime=timedelta(days=1),
+        ).save()
+
+    assert KinesisScalingPlanner(stream_name).get_remaining_operations() == 7
@@ -0,0 +1,52 @@
+"""
+Scaling policies registry tests
+"""
+from pytest_mock import MockerFixture
+from kinesis_autoscaler.scaling_policies import (
+    DEFAULT_SCALING_POLICY,
+    ScalingPolicy,
+    get_scaling_policy,
+)
+from kinesis_autoscaler.kinesis_upscaler import KinesisUpscaler
+from kinesis_autoscaler.kinesis_downscaler import KinesisDownscaler
+from kinesis_autoscaler.models.scaling_policy import KinesisScalingPolicy
+
+
+def test_policies_are_loaded_in_bulk_and_cached(mocker: MockerFixture) -> None:
+    """
+    Ensures all the policies are loaded with a single scan, and that missing
+    policy attributes fall back to the defaults.
+    """
+    KinesisScalingPolicy(
+        stream_name="latency-sensitive-stream",
+        max_shard_count=64,
+        target_usage_factor=0.3,
+    ).save()
+    KinesisScalingPolicy(
+        stream_name="cheap-stream", usage_percentile=90, scale_up_pct=20
+    ).save()
+    scan_spy = mocker.spy(KinesisScalingPolicy, "scan")
+
+    policy = get_scaling_policy("latency-sensitive-stream")
+    assert policy == ScalingPolicy(max_shard_count=64, target_usage_factor=0.3)
+    assert isinstance(policy.max_shard_count, int)
+    assert get_scaling_policy("cheap-stream") == ScalingPolicy(
+        usage_percentile=90, scale_up_pct=20
+    )
+    assert get_scaling_policy("other-stream") == DEFAULT_SCALING_POLICY
+    assert scan_spy.call_count == 1
+
+
+def test_scalers_apply_policies() -> None:
+    """
+    Ensures the scale-up/scale-down targets follow the stream's policy.
+    """
+    policy = ScalingPolicy(
+        min_shard_count=4, max_shard_count=12, target_usage_factor=0.7, scale_up_pct=20
+    )
+
+    assert KinesisUpscaler.calculate_target_shard_count(5, policy=policy) == 6
+    assert KinesisUpscaler.calculate_target_shard_count(10, 1.0, policy) == 12
+    assert KinesisUpscaler.calculate_target_shard_count(20, policy=policy) == 20
+    assert KinesisDownscaler.calculate_target_shard_count(10, 0.35, policy) == 6
+    assert KinesisDownscaler.calculate_target_shard_count(10, 0.01, policy) == 4
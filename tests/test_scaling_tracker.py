@@ -0,0 +1,95 @@
+"""
+Kinesis scaling tracker tests
+"""
+from datetime import datetime, timedelta, timezone
+from botocore.exceptions import ClientError
+from freezegun import freeze_time
+from pytest_mock import MockerFixture
+from kinesis_autoscaler.aws_clients import get_client
+from kinesis_autoscaler.scaling_tracker import KinesisScalingTracker
+from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+from tests.aws_client_mockers.kinesis_client_mocker import KinesisClientMocker
+
+
+@freeze_time("2021-11-16 12:00:00")
+def test_tracker_completes_active_streams_logs(mocker: MockerFixture) -> None:
+    """
+    Ensures the scaling logs of ACTIVE streams are completed with the measured
+    resharding duration and final shard count, and that updating streams
+    remain in progress.
+    """
+    now = datetime.utcnow().replace(tzinfo=timezone.utc)
+    for stream_name, minutes_ago in (("active", 7), ("updating", 2)):
+        KinesisAutoscalerLog(
+            stream_name=stream_name,
+            scaling_datetime=now - timedelta(minutes=minutes_ago),
+            shard_count=2,
+            target_shard_count=4,
+            scaling_type="SCALE_UP",
+            expiration_datetime=timedelta(days=1),
+            resharding_status="IN_PROGRESS",
+        ).save()
+
+    kinesis_client_mock = KinesisClientMocker(get_client("kinesis"), mocker)
+    describe_stream_summary_mock = kinesis_client_mock.describe_stream_summary(4)
+    describe_stream_summary_mock.side_effect = lambda StreamName: {
+        "StreamDescriptionSummary": {
+            "OpenShardCount": 4 if StreamName == "active" else 3,
+            "StreamStatus": "ACTIVE" if StreamName == "active" else "UPDATING",
+        }
+    }
+
+    report = KinesisScalingTracker().track()
+
+    assert report == [
+        {
+            "stream_name": "active",
+            "resharding_status": "COMPLETED",
+            "resharding_duration_seconds": 420,
+            "final_shard_count": 4,
+        }
+    ]
+    active_log = list(KinesisAutoscalerLog.query("active"))[0]
+    assert active_log.resharding_status == "COMPLETED"
+    assert active_log.resharding_duration_seconds == 420
+    assert active_log.final_shard_count == 4
+
+    updating_log = list(KinesisAutoscalerLog.query("updating"))[0]
+    assert updating_log.resharding_status == "IN_PROGRESS"
+    assert updating_log.final_shard_count is None
+
+
+@freeze_time("2021-11-16 12:00:00")
+def test_tracker_ends_deleted_and_timed_out_streams_logs(
+    mocker: MockerFixture,
+) -> None:
+    """
+    Ensures the scaling logs of deleted streams, and of operations exceeding
+    the max resharding duration, don't remain in progress.
+    """
+    now = datetime.utcnow().replace(tzinfo=timezone.utc)
+    for stream_name, minutes_ago in (("deleted", 7), ("stuck", 7 * 60)):
+        KinesisAutoscalerLog(
+            stream_name=stream_name,
+            scaling_datetime=now - timedelta(minutes=minutes_ago),
+            shard_count=2,
+            target_shard_count=4,
+            scaling_type="SCALE_UP",
+            expiration_datetime=timedelta(days=1),
+            resharding_status="IN_PROGRESS",
+        ).save()
+
+    kinesis_client_mock = KinesisClientMocker(get_client("kinesis"), mocker)
+    describe_stream_summary_mock = kinesis_client_mock.describe_stream_summary(4)
+    describe_stream_summary_mock.side_effect = ClientError(
+        {"Error": {"Code": "ResourceNotFoundException", "Message": "not found"}},
+        "DescribeStreamSummary",
+    )
+
+    report = KinesisScalingTracker().track()
+
+    assert sorted(
+        (entry["stream_name"], entry["resharding_status"]) for entry in report
+    ) == [("deleted", "STREAM_DELETED"), ("stuck", "TIMED_OUT")]
+    describe_stream_summary_mock.assert_called_once_with(StreamName="deleted")
+    assert not list(KinesisAutoscalerLog.resharding_status_index.query("IN_PROGRESS"))
@@ -0,0 +1,130 @@
+"""
+Account shard quota tests
+"""
+from typing import Iterator
+from datetime import datetime, timedelta, timezone
+import pytest
+import handler
+from kinesis_autoscaler import shard_quota
+from kinesis_autoscaler.fleet_sweeper import KinesisFleetSweeper
+from kinesis_autoscaler.scaling_tracker import KinesisScalingTracker
+from kinesis_autoscaler.models.autoscaler_log import KinesisAutoscalerLog
+from kinesis_autoscaler.models.scaling_policy import KinesisScalingPolicy
+from tests.aws_fakes import FakeAWS, VirtualClock, SCALE_UP_TOPIC_ARN
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def fake_aws() -> Iterator[FakeAWS]:
+    """
+    Serves the autoscaler AWS clients from fake services with a small
+    account shard limit
+    """
+    with FakeAWS(
+        VirtualClock(), resharding_seconds=60, shard_limit=27
+    ).install() as aws:
+        yield aws
+
+
+def get_open_shard_count(fake_aws: FakeAWS, stream_name: str) -> int:
+    """
+    Returns the open shard count of a fake stream.
+    """
+    return len(fake_aws.kinesis.get_open_shard_ids(stream_name))
+
+
+def test_in_flight_scale_ups_stay_reserved(fake_aws: FakeAWS) -> None:
+    """
+    Ensures the shards of a scale-up stay reserved after the limits are
+    described again, until the scaling tracker completes the scale-up.
+    """
+    fake_aws.create_stream("stream", shard_count=8)
+    assert shard_quota.get_shard_headroom(critical=True) == 19
+    # 5% of the limit is reserved for critical streams
+    assert shard_quota.get_shard_headroom() == 17
+
+    assert shard_quota.reserve_shards(20) == 17
+    shard_quota.release_shards(17)
+    assert shard_quota.reserve_shards(8) == 8
+    fake_aws.kinesis.update_shard_count(
+        StreamName="stream", TargetShardCount=16, ScalingType="UNIFORM_SCALING"
+    )
+    shard_quota.commit_shards(8)
+    KinesisAutoscalerLog(
+        stream_name="stream",
+        scaling_datetime=datetime.now(timezone.utc),
+        shard_count=8,
+        target_shard_count=16,
+        scaling_type="SCALE_UP",
+        expiration_datetime=timedelta(days=1),
+        resharding_status="IN_PROGRESS",
+    ).save()
+    assert shard_quota.get_shard_headroom(critical=True) == 11
+
+    # the open shard count doesn't include the in progress scale-up
+    shard_quota.reset_cache()
+    assert fake_aws.kinesis.describe_limits()["OpenShardCount"] == 8
+    assert shard_quota.get_shard_headroom(critical=True) == 11
+
+    fake_aws.clock.advance(60)
+    KinesisScalingTracker().track()
+    shard_quota.reset_cache()
+    assert shard_quota.get_shard_headroom(critical=True) == 11
+    assert fake_aws.kinesis.describe_limits()["OpenShardCount"] == 16
+
+
+def test_critical_shard_reserve(fake_aws: FakeAWS) -> None:
+    """
+    Ensures only critical streams scale up into the critical shard reserve.
+    """
+    fake_aws.subscribe_handler(SCALE_UP_TOPIC_ARN, handler.scale_up)
+    KinesisScalingPolicy(stream_name="critical", priority=10).save()
+    fake_aws.create_stream("normal", shard_count=12, incoming_bytes_per_second=0)
+    fake_aws.create_stream("critical", shard_count=13, incoming_bytes_per_second=0)
+    for stream_name, shard_count in (("normal", 12), ("critical", 13)):
+        fake_aws.cloudwatch.set_stream_load(
+            stream_name, incoming_bytes_per_second=0.9 * shard_count * MB
+        )
+
+    fake_aws.clock.advance(300)
+    fake_aws.cloudwatch.evaluate_alarms()
+    fake_aws.clock.advance(60)
+
+    assert get_open_shard_count(fake_aws, "normal") == 12
+    assert get_open_shard_count(fake_aws, "critical") == 15
+    assert [log.stream_name for log in KinesisAutoscalerLog.scan()] == ["critical"]
+
+
+def test_sweep_allocates_shards_by_priority(fake_aws: FakeAWS) -> None:
+    """
+    Ensures the sweep shares the shard headroom by priority and usage,
+    and trims a lower priority stream for the streams missing shards.
+    """
+    KinesisScalingPolicy(stream_name="critical", priority=10).save()
+    KinesisScalingPolicy(stream_name="important", priority=5).save()
+    fake_aws.create_stream(
+        "critical", shard_count=4, incoming_bytes_per_second=3.2 * MB
+    )
+    fake_aws.create_stream(
+        "important", shard_count=4, incoming_bytes_per_second=3.4 * MB
+    )
+    fake_aws.create_stream("hot", shard_count=4, incoming_bytes_per_second=3.8 * MB)
+    fake_aws.create_stream("idle", shard_count=10, incoming_bytes_per_second=3 * MB)
+
+    report = KinesisFleetSweeper().sweep()
+
+    assert sorted(
+        (
+            entry["stream_name"],
+            entry["scaling_type"],
+            entry["target_shard_count"],
+            entry["status"],
+        )
+        for entry in report
+    ) == [
+        ("critical", "SCALE_UP", 6, "SUCCEEDED"),
+        ("hot", "SCALE_UP", 6, "QUOTA_LIMITED"),
+        ("idle", "SCALE_DOWN", 6, "SUCCEEDED"),
+        ("important", "SCALE_UP", 5, "SUCCEEDED"),
+    ]
@@ -0,0 +1,146 @@
+"""
+Kinesis shard resharder tests
+"""
+from typing import Dict
+from types import SimpleNamespace
+from datetime import datetime
+from freezegun import freeze_time
+from pytest_mock import MockerFixture
+from kinesis_autoscaler.aws_clients import get_client
+from kinesis_autoscaler.shard_resharder import KinesisShardResharder
+from kinesis_autoscaler.invocation_deadline import set_invocation_deadline
+
+MAX_HASH_KEY = 2 ** 128 - 1
+
+
+def mock_stream_shards(mocker: MockerFixture, shard_usage: Dict[str, float]) -> None:
+    """
+    Mocks an active stream with even shard hash key ranges and
+    shard-level incoming bytes metrics matching the given usage factors.
+    """
+    shard_range = (MAX_HASH_KEY + 1) // len(shard_usage)
+    shards = [
+        {
+            "ShardId": shard_id,
+            "HashKeyRange": {
+                "StartingHashKey": str(index * shard_range),
+                "EndingHashKey": str((index + 1) * shard_range - 1),
+            },
+        }
+        for index, shard_id in enumerate(shard_usage)
+    ]
+    mocker.patch.object(
+        get_client("kinesis"), "list_shards", return_value={"Shards": shards}
+    )
+    mocker.patch.object(
+        get_client("kinesis"),
+        "describe_stream_summary",
+        return_value={"StreamDescriptionSummary": {"StreamStatus": "ACTIVE"}},
+    )
+
+    def get_metric_data(MetricDataQueries: list, EndTime: datetime, **_kwargs) -> dict:
+        results = []
+        for query in MetricDataQueries:
+            dimensions = query["MetricStat"]["Metric"]["Dimensions"]
+            usage_factor = shard_usage[dimensions[1]["Value"]]
+            values = [usage_factor * 1024 * 1024 * 300]
+            # like CloudWatch, the current period has the sums of its elapsed part
+            partial_seconds = EndTime.timestamp() % 300
+            if partial_seconds:
+                values.insert(0, usage_factor * 1024 * 1024 * partial_seconds)
+            if query["MetricStat"]["Metric"]["MetricName"] == "IncomingRecords":
+                values = []
+            results.append({"Id": query["Id"], "Values": values})
+        return {"MetricDataResults": results}
+
+    mocker.patch.object(
+        get_client("cloudwatch"), "get_metric_data", side_effect=get_metric_data
+    )
+
+
+def test_reshard_splits_only_hot_shards(mocker: MockerFixture) -> None:
+    """
+    Ensures only the hot shards are split, at the middle of their hash key range.
+    """
+    mock_stream_shards(
+        mocker, {"shard-0": 0.2, "shard-1": 0.9, "shard-2": 0.3, "shard-3": 0.8}
+    )
+    split_shard_mock = mocker.patch.object(
+        get_client("kinesis", mutating=True), "split_shard"
+    )
+
+    resharded_shard_count = KinesisShardResharder("stream").reshard(4, 8)
+
+    assert resharded_shard_count == 6
+    assert [
+        call.kwargs["ShardToSplit"] for call in split_shard_mock.call_args_list
+    ] == [
+        "shard-1",
+        "shard-3",
+    ]
+    shard_range = (MAX_HASH_KEY + 1) // 4
+    assert split_shard_mock.call_args_list[0].kwargs["NewStartingHashKey"] == str(
+        shard_range + shard_range // 2
+    )
+
+
+def test_reshard_merges_adjacent_cold_shards(mocker: MockerFixture) -> None:
+    """
+    Ensures only adjacent cold shards are merged, coldest pairs first.
+    """
+    mock_stream_shards(
+        mocker,
+        {"shard-0": 0.3, "shard-1": 0.1, "shard-2": 0.05, "shard-3": 0.4},
+    )
+    merge_shards_mock = mocker.patch.object(
+        get_client("kinesis", mutating=True), "merge_shards"
+    )
+
+    resharded_shard_count = KinesisShardResharder("stream").reshard(4, 2)
+
+    assert resharded_shard_count == 3
+    merge_shards_mock.assert_called_once_with(
+        StreamName="stream", ShardToMerge="shard-1", AdjacentShardToMerge="shard-2"
+    )
+
+
+@freeze_time("2021-11-16 12:00:30")
+def test_reshard_ignores_partial_period(mocker: MockerFixture) -> None:
+    """
+    Ensures the shards usage is based on the newest complete period, rather
+    than the current period which has only 30 seconds of data.
+    """
+    mock_stream_shards(mocker, {"shard-0": 0.2, "shard-1": 0.9})
+    split_shard_mock = mocker.patch.object(
+        get_client("kinesis", mutating=True), "split_shard"
+    )
+
+    assert KinesisShardResharder("stream").reshard(2, 4) == 3
+    assert split_shard_mock.call_args.kwargs["ShardToSplit"] == "shard-1"
+
+
+def test_reshard_leaves_time_for_the_invocation(mocker: MockerFixture) -> None:
+    """
+    Ensures the operations which can't be done without eating into the time
+    the invocation needs after resharding are postponed without waiting.
+    """
+    mock_stream_shards(
+        mocker, {"shard-0": 0.2, "shard-1": 0.9, "shard-2": 0.3, "shard-3": 0.8}
+    )
+    split_shard_mock = mocker.patch.object(
+        get_client("kinesis", mutating=True), "split_shard"
+    )
+    set_invocation_deadline(SimpleNamespace(get_remaining_time_in_millis=lambda: 9000))
+
+    assert KinesisShardResharder("stream").reshard(4, 8) == 5
+    assert split_shard_mock.call_count == 1
+    get_client("kinesis").describe_stream_summary.assert_not_called()
+
+
+def test_reshard_falls_back_for_uniform_load(mocker: MockerFixture) -> None:
+    """
+    Ensures targeted resharding isn't used when most of the shards are hot.
+    """
+    mock_stream_shards(mocker, {"shard-0": 0.9, "shard-1": 0.8})
+
+    assert KinesisShardResharder("stream").reshard(2, 4) is None
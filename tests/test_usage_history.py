@@ -0,0 +1,96 @@
+"""
+Stream usage history tests
+"""
+from datetime import datetime, timedelta, timezone
+from freezegun import freeze_time
+from pytest_mock import MockerFixture
+from kinesis_autoscaler import usage_history
+from kinesis_autoscaler.aws_clients import get_client
+from kinesis_autoscaler.models.usage_history import KinesisUsageHistory
+from kinesis_autoscaler.models.scaling_policy import KinesisScalingPolicy
+from tests.aws_client_mockers.cw_client_mocker import CloudWatchClientMocker
+
+
+def test_usage_history_fetches_only_new_data_points(mocker: MockerFixture) -> None:
+    """
+    Ensures the full window is queried only once, and following calls query only
+    the data points since the newest known one, across shard count changes.
+    """
+    stream_name = "subscribed-stream"
+    cw_client_mock = CloudWatchClientMocker(get_client("cloudwatch"), mocker)
+
+    with freeze_time("2021-11-16 12:00:00"):
+        get_metric_data_mock = cw_client_mock.get_metric_data([0.5, 0.2, 0.4])
+        used_shard_count = usage_history.get_used_shard_count(stream_name, 10)
+
+        assert used_shard_count == 5
+        assert get_metric_data_mock.call_args.kwargs["StartTime"] == datetime(
+            2021, 11, 15, 12, tzinfo=timezone.utc
+        )
+
+    with freeze_time("2021-11-16 12:10:00"):
+        get_metric_data_mock = cw_client_mock.get_metric_data([0.1, 0.3, 0.2])
+        used_shard_count = usage_history.get_used_shard_count(stream_name, 20)
+
+        assert used_shard_count == 6
+        assert get_metric_data_mock.call_args.kwargs["StartTime"] == datetime(
+            2021, 11, 16, 12, tzinfo=timezone.utc
+        )
+
+    item = KinesisUsageHistory.get(stream_name)
+    assert item.used_shard_counts == [4.0, 2.0, 4.0, 6.0, 2.0]
+
+    usage_history.reset_cache()
+    with freeze_time("2021-11-17 12:05:00"):
+        get_metric_data_mock = cw_client_mock.get_metric_data([0.1])
+        used_shard_count = usage_history.get_used_shard_count(
+            stream_name, 20, window=timedelta(days=1)
+        )
+
+        assert used_shard_count == 6
+        assert get_metric_data_mock.call_args.kwargs["StartTime"] == datetime(
+            2021, 11, 16, 12, 10, tzinfo=timezone.utc
+        )
+
+
+def test_usage_history_keeps_largest_window(mocker: MockerFixture) -> None:
+    """
+    Ensures the history is kept for the largest configured usage window,
+    and each caller gets the data points of its own window.
+    """
+    stream_name = "subscribed-stream"
+    cw_client_mock = CloudWatchClientMocker(get_client("cloudwatch"), mocker)
+    KinesisScalingPolicy(stream_name="other-stream", usage_window_hours=48).save()
+
+    with freeze_time("2021-11-16 12:00:00"):
+        get_metric_data_mock = cw_client_mock.get_metric_data([0.5])
+        assert usage_history.get_used_shard_count(stream_name, 10) == 5
+        assert get_metric_data_mock.call_args.kwargs["StartTime"] == datetime(
+            2021, 11, 14, 12, tzinfo=timezone.utc
+        )
+
+    with freeze_time("2021-11-17 12:05:00"):
+        cw_client_mock.get_metric_data([0.1])
+        assert usage_history.get_used_shard_count(stream_name, 10) == 1
+        assert (
+            usage_history.get_used_shard_count(
+                stream_name, 10, window=timedelta(hours=48)
+            )
+            == 5
+        )
+
+    assert len(KinesisUsageHistory.get(stream_name).timestamps) == 2
+
+
+def test_usage_history_percentile() -> None:
+    """
+    Ensures the usage history percentiles use the nearest rank method.
+    """
+    history = usage_history.UsageHistory(list(range(10)), list(range(1, 11)))
+
+    assert history.percentile() == 10
+    assert history.percentile(90) == 9
+    assert history.percentile(50) == 5
+
+    history.trim(8)
+    assert history.used_shard_counts == [9, 10]